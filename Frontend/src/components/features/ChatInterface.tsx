@@ -14,12 +14,32 @@ import { ChatHeader } from "../chat/ChatHeader"
 import { ChatInput } from "../chat/ChatInput"
 
 // Zod schemas for API validation
-const DocumentUploadResponseSchema = z.object({
+const JobStatusSchema = z.enum(["pending", "running", "completed", "failed", "skipped"])
+
+// Uploads are processed as background jobs: the POST returns 202 with a job id to poll
+const DocumentUploadJobResponseSchema = z.object({
+  job_id: z.string(),
   document_id: z.string(),
-  page_count: z.number(),
+  status: JobStatusSchema,
   message: z.string(),
 })
 
+const VideoJobResponseSchema = z.object({
+  job_id: z.string(),
+  status: JobStatusSchema,
+  message: z.string(),
+})
+
+const IngestionJobSchema = z.object({
+  job_id: z.string(),
+  document_id: z.string(),
+  status: JobStatusSchema,
+  page_count: z.number().nullish(),
+  chunk_count: z.number().nullish(),
+  result: z.record(z.any()).nullish(),
+  error: z.string().nullish(),
+})
+
 const DocumentQAResponseSchema = z.object({
   answer: z.string(),
   context: z.array(z.string()).optional(),
@@ -38,7 +58,7 @@ const YouTubeResponseSchema = z.object({
   timestamps: z.array(TimestampEmbedSchema).default([]),
 })
 
-type DocumentUploadResponse = z.infer<typeof DocumentUploadResponseSchema>
+type IngestionJob = z.infer<typeof IngestionJobSchema>
 type DocumentQAResponse = z.infer<typeof DocumentQAResponseSchema>
 type TimestampEmbed = z.infer<typeof TimestampEmbedSchema>
 type YouTubeResponse = z.infer<typeof YouTubeResponseSchema>
@@ -94,6 +114,22 @@ function tsToSeconds(ts: string): number {
   return 0
 }
 
+const JOB_POLL_INTERVAL_MS = 2000
+const JOB_POLL_TIMEOUT_MS = 15 * 60 * 1000
+
+// Poll a job status endpoint until the job completes; throws with the job's error if it fails
+async function pollJob(url: string, token: string | undefined): Promise<IngestionJob> {
+  const deadline = Date.now() + JOB_POLL_TIMEOUT_MS
+  while (Date.now() < deadline) {
+    const res = await axios.get(url, { headers: { Authorization: `Bearer ${token}` } })
+    const job = IngestionJobSchema.parse(res.data)
+    if (job.status === "completed") return job
+    if (job.status === "failed") throw new Error(job.error || "Processing failed")
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS))
+  }
+  throw new Error("Processing is taking longer than expected, please check back later")
+}
+
 function buildEmbedUrl(youtubeUrl: string, timestamp: string): string {
   const videoId = extractVideoId(youtubeUrl)
   if (!videoId) throw new Error("Invalid YouTube URL")
@@ -189,14 +225,24 @@ export const ChatInterface = ({ mode }: { mode: string }) => {
         },
       })
 
-      const validatedData = DocumentUploadResponseSchema.parse(response.data)
+      const accepted = DocumentUploadJobResponseSchema.parse(response.data)
+      setMessages((prev) => [
+        ...prev,
+        {
+          id: Date.now().toString(),
+          content: `Document received, processing ${file.name}...`,
+          sender: "assistant",
+        },
+      ])
 
-      setDocumentId(validatedData.document_id)
+      const job = await pollJob(`http://localhost:8000/api/v1/upload/${accepted.job_id}`, token)
+
+      setDocumentId(job.document_id)
       setMessages((prev) => [
         ...prev,
         {
           id: Date.now().toString(),
-          content: `Document uploaded successfully! ${validatedData.page_count} pages processed. You can now ask questions about this document.`,
+          content: `Document uploaded successfully! ${job.page_count ?? 0} pages processed. You can now ask questions about this document.`,
           sender: "assistant",
         },
       ])
@@ -279,6 +325,8 @@ export const ChatInterface = ({ mode }: { mode: string }) => {
     } else if (err instanceof z.ZodError) {
       errorMessage = "Invalid response format from server"
       console.error("Validation errors:", err.errors)
+    } else if (err instanceof Error) {
+      errorMessage = err.message
     }
 
     setError(errorMessage)
@@ -390,12 +438,20 @@ export const ChatInterface = ({ mode }: { mode: string }) => {
         },
       })
 
-      setVideoResponse(res.data.response_text)
-      setVideoMessage(res.data.message)
+      const accepted = VideoJobResponseSchema.parse(res.data)
+      setVideoMessage(accepted.message)
+
+      const job = await pollJob(`http://127.0.0.1:8000/video-qa/jobs/${accepted.job_id}`, token)
+      setVideoResponse(job.result?.response_text ?? "")
+      setVideoMessage(job.result?.message ?? "Video file processed successfully")
     } catch (err: any) {
       console.error("Video upload error:", err)
       setVideoMessage(
-        axios.isAxiosError(err) ? err.response?.data?.detail || "Error uploading video" : "Error uploading video",
+        axios.isAxiosError(err)
+          ? err.response?.data?.detail || "Error uploading video"
+          : err instanceof Error
+            ? err.message
+            : "Error uploading video",
       )
     } finally {
       setVideoFileIsUploading(false)
@@ -0,0 +1,233 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+from loguru import logger
+
+
+def _encode(vector: List[float]) -> bytes:
+    return array("f", vector).tobytes()
+
+
+def _decode(data: bytes) -> List[float]:
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class FileEmbeddingStore:
+    """Persistent embedding store backed by a local SQLite file."""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def mget(self, keys: List[str]) -> List[Optional[List[float]]]:
+        if not keys:
+            return []
+        found = {}
+        with self._lock:
+            # Stay under SQLite's bound-parameter limit for large batches
+            for start in range(0, len(keys), 500):
+                part = keys[start:start + 500]
+                placeholders = ",".join("?" for _ in part)
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", part
+                ).fetchall()
+                found.update((key, _decode(blob)) for key, blob in rows)
+        return [found.get(key) for key in keys]
+
+    def mset(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, _encode(vector)) for key, vector in items.items()],
+            )
+            self._conn.commit()
+
+
+class RedisEmbeddingStore:
+    """Persistent embedding store backed by Redis, with an optional TTL per entry."""
+
+    def __init__(self, redis_url: str, ttl: Optional[int] = None):
+        import redis
+
+        self._client = redis.Redis.from_url(redis_url)
+        self.ttl = ttl
+
+    def mget(self, keys: List[str]) -> List[Optional[List[float]]]:
+        if not keys:
+            return []
+        return [_decode(value) if value is not None else None for value in self._client.mget(keys)]
+
+    def mset(self, items: Dict[str, List[float]]) -> None:
+        if not items:
+            return
+        pipe = self._client.pipeline(transaction=False)
+        for key, vector in items.items():
+            pipe.set(key, _encode(vector), ex=self.ttl)
+        pipe.execute()
+
+
+def build_embedding_store():
+    """
+    Build the persistent store configured through the environment.
+
+    EMBEDDING_CACHE_BACKEND selects ``file`` (default), ``redis`` or ``none``.
+    """
+    backend = os.getenv("EMBEDDING_CACHE_BACKEND", "file").lower()
+    if backend == "none":
+        return None
+    try:
+        if backend == "redis":
+            ttl = os.getenv("EMBEDDING_CACHE_TTL")
+            return RedisEmbeddingStore(
+                os.getenv("REDIS_URL", "redis://localhost:6379"),
+                ttl=int(ttl) if ttl else None,
+            )
+        return FileEmbeddingStore(os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite3"))
+    except Exception as e:
+        logger.warning(f"Embedding cache store '{backend}' unavailable, using in-process LRU only: {e}")
+        return None
+
+
+@lru_cache()
+def get_embedding_store():
+    """Process-wide persistent store shared by every cached embedder."""
+    return build_embedding_store()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache around any LangChain ``Embeddings``.
+
+    Vectors are keyed on (model name, normalization flag, sha256 of the text).
+    Lookups go to an in-process LRU first, then to the persistent ``store``;
+    only texts missing from both are sent to the wrapped embedder.
+    """
+
+    def __init__(
+        self,
+        underlying: Embeddings,
+        model_name: str,
+        normalize: bool = False,
+        store=None,
+        max_entries: int = 10_000,
+        namespace: str = "emb:",
+    ):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.normalize = normalize
+        self.store = store
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._lru: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.lru_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+    def cache_key(self, text: str, kind: str = "doc") -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.namespace}{self.model_name}:{int(self.normalize)}:{kind}:{digest}"
+
+    def _lru_get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key: str, vector: List[float]) -> None:
+        with self._lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        for key in keys:
+            vector = self._lru_get(key)
+            if vector is not None:
+                found[key] = vector
+        lru_hits = len(found)
+
+        pending = [key for key in keys if key not in found]
+        store_hits = 0
+        if pending and self.store is not None:
+            try:
+                for key, vector in zip(pending, self.store.mget(pending)):
+                    if vector is not None:
+                        found[key] = vector
+                        self._lru_put(key, vector)
+                        store_hits += 1
+            except Exception as e:
+                logger.warning(f"Embedding cache store read failed: {e}")
+
+        with self._lock:
+            self.lru_hits += lru_hits
+            self.store_hits += store_hits
+            self.misses += len(keys) - len(found)
+        return found
+
+    def _save(self, items: Dict[str, List[float]]) -> None:
+        for key, vector in items.items():
+            self._lru_put(key, vector)
+        if self.store is not None:
+            try:
+                self.store.mset(items)
+            except Exception as e:
+                logger.warning(f"Embedding cache store write failed: {e}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self.cache_key(text) for text in texts]
+        # Identical texts in one call share a key, so each is looked up and embedded once
+        unique_keys = list(dict.fromkeys(keys))
+        found = self._lookup(unique_keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            computed = dict(zip(missing.keys(), vectors))
+            self._save(computed)
+            found.update(computed)
+
+        return [found[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self.cache_key(text, kind="query")
+        found = self._lookup([key])
+        if key in found:
+            return found[key]
+        vector = self.underlying.embed_query(text)
+        self._save({key: vector})
+        return vector
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.lru_hits + self.store_hits + self.misses
+            return {
+                "model": self.model_name,
+                "lru_hits": self.lru_hits,
+                "store_hits": self.store_hits,
+                "misses": self.misses,
+                "hit_rate": (self.lru_hits + self.store_hits) / total if total else 0.0,
+                "lru_size": len(self._lru),
+            }
@@ -1,15 +1,122 @@
-from langchain_huggingface import HuggingFaceEmbeddings
-import os
+import asyncio
+import hashlib
+from typing import List, Optional, Sequence, Tuple
 
+import numpy as np
+from langchain.schema import Document
+from loguru import logger
 
+from Models.Embedding_model.embedding_cache import get_embedding_store
+from Models.model_registry import COLBERT, model_registry
+from services.cache import BoundedTTLCache
 
-model_name = "colbert-ir/colbertv2.0"
-model_kwargs = {'device': 'cpu'}
-encode_kwargs = {'normalize_embeddings': False}
-colBERT = HuggingFaceEmbeddings(
-    model_name=model_name,
-    model_kwargs=model_kwargs,
-    encode_kwargs=encode_kwargs
-)
-embeds = colBERT.embed_query("hey what is up")
-print(len(embeds))
\ No newline at end of file
+
+def maxsim_scores(query: np.ndarray, docs: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Late-interaction scores: for every document, sum over query tokens of the
+    best-matching document token similarity.
+
+    Documents are padded into one [n_docs, max_len, dim] tensor with a mask,
+    so all candidates are scored with a single batched matmul.
+    """
+    if not docs:
+        return np.zeros(0, dtype=np.float32)
+    max_len = max(doc.shape[0] for doc in docs)
+    dim = query.shape[1]
+    batch = np.zeros((len(docs), max_len, dim), dtype=np.float32)
+    mask = np.zeros((len(docs), max_len), dtype=bool)
+    for i, doc in enumerate(docs):
+        batch[i, : doc.shape[0]] = doc
+        mask[i, : doc.shape[0]] = True
+
+    sim = batch @ query.T.astype(np.float32)  # [n_docs, max_len, n_query_tokens]
+    sim = np.where(mask[:, :, None], sim, -np.inf)
+    return sim.max(axis=1).sum(axis=1)
+
+
+class ColBERTReranker:
+    """
+    ColBERT (PyLate) reranker with token-level MaxSim scoring.
+
+    Document token embeddings are cached by content hash, in process (bounded
+    by bytes) and in the shared embedding store, so ``precompute`` at
+    ingestion time leaves only the query to encode per request.
+    """
+
+    def __init__(self, model_name: str = COLBERT, max_cache_bytes: int = 256 * 1024 * 1024, batch_size: int = 32):
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache = BoundedTTLCache(max_entries=1_000_000, max_size=max_cache_bytes, sizeof=lambda arr: arr.nbytes)
+        self._dim: Optional[int] = None
+
+    @property
+    def model(self):
+        return model_registry.get(self.model_name)
+
+    def _key(self, text: str) -> str:
+        return f"colbert_tok:{self.model_name}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def encode_query(self, query: str) -> np.ndarray:
+        query_embeddings = np.asarray(self.model.encode([query], is_query=True)[0], dtype=np.float32)
+        self._dim = query_embeddings.shape[1]
+        return query_embeddings
+
+    def _encode_documents(self, texts: List[str]) -> List[np.ndarray]:
+        encoded = self.model.encode(texts, is_query=False, batch_size=self.batch_size)
+        return [np.asarray(tokens, dtype=np.float32) for tokens in encoded]
+
+    def document_embeddings(self, texts: List[str]) -> List[np.ndarray]:
+        """Token embeddings for each text, encoding only those missing from both cache tiers."""
+        keys = [self._key(text) for text in texts]
+        found = {key: self.cache.get(key) for key in keys}
+
+        pending = [key for key in keys if found[key] is None]
+        store = get_embedding_store()
+        if pending and store is not None and self._dim is not None:
+            try:
+                for key, flat in zip(pending, store.mget(pending)):
+                    if flat is not None:
+                        tokens = np.asarray(flat, dtype=np.float32).reshape(-1, self._dim)
+                        found[key] = tokens
+                        self.cache.set(key, tokens)
+            except Exception as e:
+                logger.warning(f"ColBERT token cache read failed: {e}")
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if found[key] is None and key not in missing:
+                missing[key] = text
+        if missing:
+            encoded = self._encode_documents(list(missing.values()))
+            self._dim = encoded[0].shape[1]
+            for key, tokens in zip(missing, encoded):
+                found[key] = tokens
+                self.cache.set(key, tokens)
+            if store is not None:
+                try:
+                    store.mset({key: tokens.ravel().tolist() for key, tokens in zip(missing, encoded)})
+                except Exception as e:
+                    logger.warning(f"ColBERT token cache write failed: {e}")
+
+        return [found[key] for key in keys]
+
+    def precompute(self, texts: List[str]) -> int:
+        """Encode and cache document token embeddings ahead of query time."""
+        if self._dim is None:
+            self.encode_query("warmup")
+        return len(self.document_embeddings(texts))
+
+    def rerank(self, query: str, docs: List[Document], k: int) -> List[Tuple[Document, float]]:
+        if not docs:
+            return []
+        query_embeddings = self.encode_query(query)
+        doc_embeddings = self.document_embeddings([doc.page_content for doc in docs])
+        scores = maxsim_scores(query_embeddings, doc_embeddings)
+        order = np.argsort(-scores)[:k]
+        return [(docs[i], float(scores[i])) for i in order]
+
+    async def arerank(self, query: str, docs: List[Document], k: int) -> List[Tuple[Document, float]]:
+        return await asyncio.to_thread(self.rerank, query, docs, k)
+
+
+colbert_reranker = ColBERTReranker()
@@ -1,21 +1,51 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
 from langchain.embeddings.base import Embeddings
 from typing import List
 from pydantic import SecretStr
 from langchain_core.utils.utils import secret_from_env
 import google.generativeai as genai
-from langchain_huggingface import HuggingFaceEmbeddings
+from tenacity import Retrying, stop_after_attempt, wait_exponential
 import os
 
+from Models.Embedding_model.embedding_cache import CachedEmbeddings, get_embedding_store
+from Models.model_registry import ROBERTA_NLI, model_registry
+
 from dotenv import load_dotenv
 load_dotenv()
 
 class GeminiEmbeddings(Embeddings):
     """
     Google Gemini Embeddings using the Generative AI SDK.
+
+    Documents are packed into batches bounded by ``batch_size`` texts and
+    ``max_batch_chars`` characters, and the batches are embedded concurrently
+    with at most ``max_concurrency`` requests in flight. Each batch is retried
+    with exponential backoff on failure.
     """
 
-    def __init__(self, model: str = "models/embedding-001", api_key: SecretStr = None):
+    def __init__(
+        self,
+        model: str = "models/embedding-001",
+        api_key: SecretStr = None,
+        batch_size: int = 100,
+        max_batch_chars: int = 200_000,
+        max_concurrency: int = 4,
+        max_retries: int = 3,
+        client=None,
+    ):
         self.model = model
+        self.batch_size = batch_size
+        self.max_batch_chars = max_batch_chars
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+
+        if client is not None:
+            # Injected client (e.g. a local fake), no API key required
+            self.client = client
+            return
+
         self.api_key = api_key or SecretStr(os.getenv("GOOGLE_API_KEY")
         )
         if not self.api_key:
@@ -24,19 +54,64 @@ class GeminiEmbeddings(Embeddings):
         genai.configure(api_key=self.api_key.get_secret_value())
         self.client = genai
 
+    def _make_batches(self, texts: List[str]) -> List[List[str]]:
+        """Pack texts into batches limited by count and total characters, preserving order."""
+        batches, current, current_chars = [], [], 0
+        for text in texts:
+            if current and (len(current) >= self.batch_size or current_chars + len(text) > self.max_batch_chars):
+                batches.append(current)
+                current, current_chars = [], 0
+            current.append(text)
+            current_chars += len(text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in Retrying(
+            stop=stop_after_attempt(self.max_retries),
+            wait=wait_exponential(multiplier=1, min=1, max=10),
+            reraise=True,
+        ):
+            with attempt:
+                res = self.client.embed_content(
+                    model=self.model,
+                    content=batch,
+                    task_type="retrieval_document"
+                )
+        embeddings = res["embedding"]
+        if len(embeddings) != len(batch):
+            raise ValueError(f"Expected {len(batch)} embeddings from Gemini, got {len(embeddings)}")
+        return embeddings
+
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
         """
         Embed a list of texts/documents.
         """
-        embeddings = []
-        for text in texts:
-            res = self.client.embed_content(
-                model=self.model,
-                content=text,
-                task_type="retrieval_document"
-            )
-            embeddings.append(res["embedding"])
-        return embeddings
+        if not texts:
+            return []
+        batches = self._make_batches(texts)
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as executor:
+            results = executor.map(self._embed_batch, batches)
+            return [embedding for batch in results for embedding in batch]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed a list of texts/documents without blocking the event loop.
+        """
+        if not texts:
+            return []
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def _run(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await asyncio.to_thread(self._embed_batch, batch)
+
+        results = await asyncio.gather(*(_run(batch) for batch in self._make_batches(texts)))
+        return [embedding for batch in results for embedding in batch]
 
     def embed_query(self, text: str) -> List[float]:
         """
@@ -49,9 +124,13 @@ class GeminiEmbeddings(Embeddings):
         )
         return res["embedding"]
 
-gemini_embed = GeminiEmbeddings()
-bi_embed = HuggingFaceEmbeddings(   
-    model_name="roberta-base-nli-stsb-mean-tokens",
-    model_kwargs={"device": "cpu"}
+    async def aembed_query(self, text: str) -> List[float]:
+        return await asyncio.to_thread(self.embed_query, text)
+
+gemini_embed = CachedEmbeddings(
+    GeminiEmbeddings(),
+    model_name="models/embedding-001",
+    store=get_embedding_store(),
 )
+bi_embed = model_registry.embeddings(ROBERTA_NLI)
 
@@ -0,0 +1,170 @@
+import os
+import resource
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+from langchain_huggingface import HuggingFaceEmbeddings
+from loguru import logger
+
+from Models.Embedding_model.embedding_cache import CachedEmbeddings, get_embedding_store
+
+ROBERTA_NLI = "roberta-base-nli-stsb-mean-tokens"
+MPNET = "sentence-transformers/all-mpnet-base-v2"
+COLBERT = "colbert-ir/colbertv2.0"
+
+
+def resident_memory_mb() -> float:
+    """Current resident set size of this process in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # ru_maxrss is KB on Linux and bytes on macOS; report the Linux unit
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ModelRegistry:
+    """
+    Process-wide registry that loads each model once, on first use.
+
+    Factories are registered by name and only executed when ``get`` is first
+    called for that name; concurrent callers wait on a per-model lock and
+    receive the same instance. Load time and the change in resident memory
+    are recorded for every model.
+
+    Every process holds its own copy: with several uvicorn workers, each
+    worker loads the models it uses. ``preload`` in the app lifespan runs
+    after the workers are forked, so it only moves the load before the first
+    request. With ``mmap=True`` (or MODEL_REGISTRY_MMAP=1) weights are loaded
+    with ``low_cpu_mem_usage``, which avoids materialising a randomly
+    initialised copy first and so lowers the peak memory of a load, not the
+    steady-state footprint.
+    """
+
+    def __init__(self, mmap: Optional[bool] = None):
+        self.mmap = mmap if mmap is not None else os.getenv("MODEL_REGISTRY_MMAP", "0") == "1"
+        self._factories: Dict[str, Callable[[], Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._embeddings: Dict[tuple, CachedEmbeddings] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> None:
+        with self._lock:
+            self._factories[name] = factory
+            self._locks.setdefault(name, threading.Lock())
+
+    def register_sentence_transformer(self, model_name: str) -> None:
+        def _factory() -> HuggingFaceEmbeddings:
+            model_kwargs: Dict[str, Any] = {"device": "cpu"}
+            if self.mmap:
+                model_kwargs["model_kwargs"] = {"low_cpu_mem_usage": True}
+            return HuggingFaceEmbeddings(model_name=model_name, model_kwargs=model_kwargs)
+
+        self.register(model_name, _factory)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._models
+
+    def get(self, name: str) -> Any:
+        model = self._models.get(name)
+        if model is not None:
+            return model
+
+        if name not in self._factories:
+            raise KeyError(f"Model '{name}' is not registered")
+
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            model = self._models.get(name)
+            if model is not None:
+                return model
+
+            logger.info(f"Loading model '{name}'")
+            rss_before = resident_memory_mb()
+            started = time.perf_counter()
+            model = self._factories[name]()
+            load_seconds = time.perf_counter() - started
+            rss_after = resident_memory_mb()
+
+            self._stats[name] = {
+                "load_seconds": round(load_seconds, 3),
+                "rss_delta_mb": round(rss_after - rss_before, 1),
+            }
+            self._models[name] = model
+            logger.success(f"Loaded model '{name}' in {load_seconds:.2f}s (+{rss_after - rss_before:.1f} MB RSS)")
+            return model
+
+    def embeddings(self, model_name: str, normalize: bool = False) -> CachedEmbeddings:
+        """
+        Cached embedder for a registered sentence-transformer, loaded lazily.
+
+        Normalized and raw variants share the same loaded weights.
+        """
+        key = (model_name, normalize)
+        with self._lock:
+            if key not in self._embeddings:
+                self._embeddings[key] = CachedEmbeddings(
+                    _RegistryEmbeddings(self, model_name, normalize),
+                    model_name=model_name,
+                    normalize=normalize,
+                    store=get_embedding_store(),
+                )
+            return self._embeddings[key]
+
+    def preload(self, names: Optional[List[str]] = None) -> None:
+        """Load models eagerly in this process, so the first request does not pay for the load."""
+        for name in names or list(self._factories):
+            self.get(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "resident_memory_mb": round(resident_memory_mb(), 1),
+            "mmap": self.mmap,
+            "models": {
+                name: {"loaded": name in self._models, **self._stats.get(name, {})}
+                for name in self._factories
+            },
+        }
+
+
+class _RegistryEmbeddings(Embeddings):
+    """Embeddings proxy that resolves the shared model from the registry on first use."""
+
+    def __init__(self, registry: ModelRegistry, model_name: str, normalize: bool):
+        self.registry = registry
+        self.model_name = model_name
+        self.normalize = normalize
+        self._model: Optional[HuggingFaceEmbeddings] = None
+
+    def _resolve(self) -> HuggingFaceEmbeddings:
+        if self._model is None:
+            base = self.registry.get(self.model_name)
+            # model_copy keeps the loaded SentenceTransformer client, only encode options differ
+            self._model = base.model_copy(
+                update={"encode_kwargs": {**base.encode_kwargs, "normalize_embeddings": self.normalize}}
+            )
+        return self._model
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._resolve().embed_documents(texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._resolve().embed_query(text)
+
+
+def _load_colbert():
+    # PyLate keeps per-token embeddings; HuggingFaceEmbeddings would mean-pool them away
+    from pylate import models
+
+    return models.ColBERT(model_name_or_path=COLBERT, device="cpu")
+
+
+model_registry = ModelRegistry()
+for _model_name in (ROBERTA_NLI, MPNET):
+    model_registry.register_sentence_transformer(_model_name)
+model_registry.register(COLBERT, _load_colbert)
@@ -0,0 +1,167 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+import jwt
+from fastapi import HTTPException, Request
+from loguru import logger
+from pydantic import BaseModel
+from supabase import AuthApiError, AuthRetryableError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+
+from databases.supabase.supabase_client import SUPABASE_URL, supabase
+from services.cache import BoundedTTLCache
+
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET")
+SUPABASE_JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+# Upper bound on how long a verified token is trusted without re-checking
+AUTH_CACHE_MAX_TTL = int(os.getenv("AUTH_CACHE_MAX_TTL", "3600"))
+# Algorithms are pinned per key type; the token header only selects which path applies
+SECRET_ALGORITHMS = ["HS256"]
+JWKS_ALGORITHMS = ["RS256", "ES256"]
+
+
+class AuthenticatedUser(BaseModel):
+    id: str
+    email: Optional[str] = None
+    role: Optional[str] = None
+    claims: Dict[str, Any] = {}
+
+
+class SupabaseJWTVerifier:
+    """
+    Verifies Supabase access tokens locally and caches the result until expiry.
+
+    Tokens signed with HS256 are checked against SUPABASE_JWT_SECRET; tokens
+    signed with asymmetric keys are checked against the project's JWKS. Only
+    when neither is possible (no secret configured, JWKS unreachable) does it
+    fall back to ``supabase.auth.get_user`` over the network. Validated users
+    are cached in a bounded LRU keyed on the token hash, each entry expiring
+    with its token.
+    """
+
+    def __init__(self, secret: Optional[str] = None, supabase_url: Optional[str] = None, audience: str = "authenticated"):
+        self.secret = secret
+        self.audience = audience
+        self.issuer = f"{supabase_url.rstrip('/')}/auth/v1" if supabase_url else None
+        self.jwks_client = jwt.PyJWKClient(f"{self.issuer}/.well-known/jwks.json", cache_keys=True) if self.issuer else None
+        self.cache: BoundedTTLCache[AuthenticatedUser] = BoundedTTLCache(max_entries=AUTH_CACHE_MAX_ENTRIES)
+        self.local_verifications = 0
+        self.remote_verifications = 0
+
+    @staticmethod
+    def _cache_key(token: str) -> str:
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def _decode_local(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Return verified claims, or None when the token cannot be checked locally.
+
+        The accepted algorithms never come from the token: HS256 for the
+        shared secret, and the JWK's own algorithm (RS256/ES256 only) for
+        JWKS keys. Any other ``alg`` is rejected as an invalid token.
+        """
+        algorithm = jwt.get_unverified_header(token).get("alg")
+        if algorithm in SECRET_ALGORITHMS:
+            if not self.secret:
+                return None
+            key = self.secret
+            algorithms = SECRET_ALGORITHMS
+        elif algorithm in JWKS_ALGORITHMS:
+            if self.jwks_client is None:
+                return None
+            try:
+                signing_key = self.jwks_client.get_signing_key_from_jwt(token)
+            except jwt.PyJWKClientError as e:
+                logger.warning(f"JWKS lookup failed, falling back to remote verification: {e}")
+                return None
+            if signing_key.algorithm_name not in JWKS_ALGORITHMS:
+                raise jwt.InvalidAlgorithmError(f"Unsupported signing key algorithm {signing_key.algorithm_name}")
+            key = signing_key.key
+            algorithms = [signing_key.algorithm_name]
+        else:
+            raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm {algorithm}")
+
+        try:
+            return jwt.decode(
+                token,
+                key,
+                algorithms=algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                options={"require": ["exp", "sub"]},
+            )
+        except (TypeError, ValueError) as e:
+            # A key that does not fit the token (e.g. a mangled signature for an EC key) is an invalid token
+            raise jwt.InvalidSignatureError(str(e)) from e
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=4),
+        # Only transport failures are retried; a rejected token is final
+        retry=retry_if_exception_type((httpx.TransportError, AuthRetryableError)),
+        reraise=True,
+    )
+    def _verify_remote(self, token: str) -> AuthenticatedUser:
+        try:
+            user_response = supabase.get().auth.get_user(token)
+        except AuthApiError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid or expired token: {e.message}")
+        if user_response is None or user_response.user is None:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        user = user_response.user
+        return AuthenticatedUser(id=user.id, email=user.email, role=user.role)
+
+    def lookup(self, token: str) -> Optional[AuthenticatedUser]:
+        """Cached user for a previously verified, unexpired token."""
+        return self.cache.get(self._cache_key(token))
+
+    def verify(self, token: str) -> AuthenticatedUser:
+        return self.lookup(token) or self.verify_uncached(token)
+
+    def verify_uncached(self, token: str) -> AuthenticatedUser:
+        try:
+            claims = self._decode_local(token)
+        except jwt.PyJWTError as e:
+            raise HTTPException(status_code=401, detail=f"Invalid or expired token: {e}")
+
+        if claims is not None:
+            self.local_verifications += 1
+            user = AuthenticatedUser(id=claims["sub"], email=claims.get("email"), role=claims.get("role"), claims=claims)
+            expires_at = claims["exp"]
+        else:
+            self.remote_verifications += 1
+            user = self._verify_remote(token)
+            expires_at = jwt.decode(token, options={"verify_signature": False}).get("exp", 0)
+
+        ttl = min(expires_at - time.time(), AUTH_CACHE_MAX_TTL)
+        if ttl > 0:
+            self.cache.set(self._cache_key(token), user, ttl=ttl)
+        return user
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.cache.stats(),
+            "local_verifications": self.local_verifications,
+            "remote_verifications": self.remote_verifications,
+        }
+
+
+jwt_verifier = SupabaseJWTVerifier(secret=SUPABASE_JWT_SECRET, supabase_url=SUPABASE_URL, audience=SUPABASE_JWT_AUDIENCE)
+
+
+async def get_current_user(request: Request) -> AuthenticatedUser:
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
+    jwt_token = auth_header.split(" ")[1]
+
+    # Cache hits return without leaving the loop; verification may hit the network, so use a thread
+    user = jwt_verifier.lookup(jwt_token)
+    if user is not None:
+        return user
+    return await asyncio.to_thread(jwt_verifier.verify_uncached, jwt_token)
@@ -1,7 +1,7 @@
 # === Standard Library Imports ===
 import os
 import sys
-import tempfile
+import asyncio
 import traceback
 from typing import Optional, List
 from uuid import uuid4
@@ -17,10 +17,8 @@ from loguru import logger
 
 # Langchain-related
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_community.vectorstores import FAISS
 from langchain_community.docstore import InMemoryDocstore
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain.prompts import ChatPromptTemplate
 from langchain_cerebras import ChatCerebras
 from langchain.schema import StrOutputParser
@@ -33,7 +31,9 @@ from supabase import create_client, Client
 
 # === Local Imports ===
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import config  # noqa
+from config.settings import app_settings
+from Models.model_registry import MPNET, model_registry
+from services.pdf_extraction import pdf_extractor
 
 # === Load environment variables ===
 load_dotenv()
@@ -51,12 +51,8 @@ supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
 logger.info(f"Supabase initialized with URL: {SUPABASE_URL}")
 
 # === Embedding Model Initialization ===
-EMBEDDING_MODEL = "sentence-transformers/all-mpnet-base-v2"
-embeddings = HuggingFaceEmbeddings(
-    model_name=EMBEDDING_MODEL,
-    model_kwargs={"device": "cpu"},
-    encode_kwargs={"normalize_embeddings": True}
-)
+EMBEDDING_MODEL = MPNET
+embeddings = model_registry.embeddings(EMBEDDING_MODEL, normalize=True)
 logger.info(f"Using embedding model: {EMBEDDING_MODEL}")
 app=FastAPI()
 # === Chat Model Initialization ===
@@ -110,8 +106,13 @@ async def upload_document(
         if not is_pdf_file(file):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
 
-        # Read file content
-        file_content = await file.read()
+        # Read at most one byte past the limit so oversized uploads are rejected without buffering them
+        file_content = await file.read(app_settings.MAX_UPLOAD_SIZE + 1)
+        if len(file_content) > app_settings.MAX_UPLOAD_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"PDF exceeds the {app_settings.MAX_UPLOAD_SIZE // (1024 * 1024)} MB upload limit"
+            )
         
         # Generate unique filename
         file_extension = os.path.splitext(file.filename)[1]
@@ -139,22 +140,8 @@ async def upload_document(
         # Get public URL (optional)
         file_url = supabase.storage.from_("user-pdf").get_public_url(f"{user.id}/{unique_filename}")
 
-        # Process the document
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            temp_file.write(file_content)
-            temp_path = temp_file.name
-
-        loader = PyMuPDFLoader(temp_path)
-        documents = loader.load()
-        os.remove(temp_path)
-
-        if not documents:
-            raise HTTPException(status_code=400, detail="Could not extract any text from the PDF")
-
         # Create vector store
         text_splitter = RecursiveCharacterTextSplitter(separators=["\n\n"], chunk_size=1200, chunk_overlap=200)
-        chunks = text_splitter.split_documents(documents)
-
         embedding_dim = len(embeddings.embed_query("test"))
         index = faiss.IndexFlatL2(embedding_dim)
         vector_store = FAISS(
@@ -164,19 +151,30 @@ async def upload_document(
             index_to_docstore_id={}
         )
 
-        doc_id = str(uuid4())
-        ids = [str(uuid4()) for _ in chunks]
-        vector_store.add_documents(chunks, ids=ids)
-        for idx, chunk_id in enumerate(ids):
-            vector_store.index_to_docstore_id[idx] = chunk_id
+        # Pages arrive from the extraction pool as they finish; split and embed each batch
+        # while the remaining pages are still being extracted
+        page_count = 0
+        chunk_count = 0
+        async for pages in pdf_extractor.aiter_pages(file_content, source=file.filename):
+            if not pages:
+                continue
+            page_count = pages[0].metadata["total_pages"]
+            chunks = text_splitter.split_documents(pages)
+            await asyncio.to_thread(vector_store.add_documents, chunks, ids=[str(uuid4()) for _ in chunks])
+            chunk_count += len(chunks)
+
+        if chunk_count == 0:
+            raise HTTPException(status_code=400, detail="Could not extract any text from the PDF")
+        logger.info(f"Indexed {chunk_count} chunks from {page_count} pages of {file.filename}")
 
+        doc_id = str(uuid4())
         document_stores[doc_id] = vector_store
 
         # Store metadata in documents table
         doc_data = {
             "id": doc_id,
             "user_id": user.id,
-            "page_count": len(documents),
+            "page_count": page_count,
             "uploaded_at": datetime.now().isoformat(),
             "file_path": f"user-pdf/{user.id}/{unique_filename}",  # Storage path
             "file_url": file_url,  # Public URL if needed
@@ -192,7 +190,7 @@ async def upload_document(
 
         return DocumentUploadResponse(
             document_id=doc_id,
-            page_count=len(documents),
+            page_count=page_count,
             message="Document processed and stored successfully"
         )
 
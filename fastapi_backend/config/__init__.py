@@ -47,8 +47,5 @@ class Settings:
         if missing:
             raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
 
-# Create settings instance
+# Create settings instance; validation runs at app startup (see main.py lifespan)
 settings = Settings()
-
-# Validate settings on import
-settings.validate() 
\ No newline at end of file
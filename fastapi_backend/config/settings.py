@@ -24,7 +24,27 @@ class BaseConfig(BaseSettings):
     # Cache Settings
     CACHE_TTL: int = 3600  # 1 hour in seconds
     CACHE_PREFIX: str = "rag_cache:"
+
+    # Semantic answer cache (cosine distance on the normalized question embedding)
+    ANSWER_CACHE_DISTANCE_THRESHOLD: float = 0.1
+    ANSWER_CACHE_MAX_ENTRIES: int = 500
+
+    # Generated YouTube summaries, keyed by video id and prompt version
+    YOUTUBE_SUMMARY_CACHE_TTL: int = 7 * 24 * 3600
+
+    # Image descriptions, reused per user for exact copies and verified near-duplicates
+    # (Hamming distance on a 64-bit dHash to find candidates, on a 256-bit dHash to accept them)
+    IMAGE_DESCRIPTION_CACHE_TTL: int = 30 * 24 * 3600
+    IMAGE_DEDUP_MAX_DISTANCE: int = 3
+    IMAGE_DEDUP_MAX_FINE_DISTANCE: int = 8
+    IMAGE_DEDUP_MAX_BAND_MEMBERS: int = 64
     
+    # Chat history: per (user, document) window, token budget and rolling summary
+    HISTORY_WINDOW_TURNS: int = 6
+    HISTORY_MAX_TOKENS: int = 2000
+    HISTORY_SUMMARY_BATCH: int = 6
+    HISTORY_CACHE_TTL: int = 300
+
     # Model Settings
     MAX_TOKENS: int = 4096
     TEMPERATURE: float = 0.7
@@ -33,10 +53,24 @@ class BaseConfig(BaseSettings):
     # Vector Store Settings
     VECTOR_DIM: int = 1536
     COLLECTION_NAME: str = "document_store"
+
+    # Hybrid Retrieval Settings (dense + BM25, fused with reciprocal rank fusion)
+    RETRIEVAL_K: int = 2
+    RETRIEVAL_CANDIDATES: int = 20
+    RETRIEVAL_DENSE_WEIGHT: float = 1.0
+    RETRIEVAL_SPARSE_WEIGHT: float = 1.0
+    RETRIEVAL_RRF_K: int = 60
+
+    # ColBERT late-interaction reranking over the fused candidates
+    RERANK_ENABLED: bool = True
+    RERANK_CANDIDATES: int = 12
     
     # File Upload Settings
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
-    ALLOWED_EXTENSIONS: set[str] = {"pdf", "txt", "jpg", "jpeg", "png", "mp4"}
+    MAX_VIDEO_UPLOAD_SIZE: int = 200 * 1024 * 1024  # 200MB
+    # Images up to this size are sent inline with the request (20MB request cap after base64)
+    IMAGE_INLINE_MAX_BYTES: int = 15 * 1024 * 1024
+    ALLOWED_EXTENSIONS: set[str] = {"pdf", "txt", "jpg", "jpeg", "png", "mp4", "mov", "avi", "mkv"}
     
     # Logging
     LOG_LEVEL: str = "INFO"
@@ -149,6 +183,5 @@ class Settings:
         if missing:
             raise ValueError(f"Missing required environment variables: {', '.join(missing)}")
 
-# Create settings instance and validate
+# Create settings instance; validation runs at app startup (see main.py lifespan)
 settings = Settings()
-settings.validate() 
\ No newline at end of file
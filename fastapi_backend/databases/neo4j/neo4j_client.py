@@ -1,5 +1,10 @@
 from langchain_neo4j import GraphCypherQAChain, Neo4jGraph
 
-graph = Neo4jGraph(url="bolt://localhost:7687", username="neo4j", password="password")
-print(graph)
+from services.resources import resources
 
+graph = resources.register(
+    "neo4j",
+    lambda: Neo4jGraph(url="bolt://localhost:7687", username="neo4j", password="password"),
+    check=lambda g: g.query("RETURN 1"),
+    close=lambda g: g.close(),
+)
@@ -0,0 +1,160 @@
+import os
+from typing import List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from langchain.schema import Document
+from langchain.embeddings.base import Embeddings
+from langchain_community.vectorstores import FAISS
+from loguru import logger
+from qdrant_client.http.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    VectorParams,
+)
+
+from databases.qdrant.qdrant_store import qdrant
+from services.cache import BoundedTTLCache
+
+IMAGE_COLLECTION = os.getenv("IMAGE_COLLECTION", "image_descriptions")
+CONTENT_KEY = "page_content"
+METADATA_KEY = "metadata"
+
+
+class ImageVectorStore:
+    """
+    Image description vectors kept in one shared Qdrant collection.
+
+    Every point carries ``metadata.image_id``; searches are filtered on it,
+    so any replica can answer for any image. Recently used images are kept
+    as FAISS indices in a bounded LRU (entry count, total chunks, TTL) to
+    skip the network hop for follow-up questions on the same image.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        collection_name: str = IMAGE_COLLECTION,
+        max_hot_images: int = 256,
+        max_hot_chunks: int = 20_000,
+        hot_ttl: float = 1800,
+    ):
+        self.embeddings = embeddings
+        self.collection_name = collection_name
+        self.hot = BoundedTTLCache(
+            max_entries=max_hot_images,
+            ttl=hot_ttl,
+            max_size=max_hot_chunks,
+            sizeof=lambda store: store.index.ntotal,
+        )
+        self._collection_ready = False
+
+    def _ensure_collection(self) -> None:
+        if self._collection_ready:
+            return
+        client = qdrant.get()
+        if not client.collection_exists(self.collection_name):
+            dim = len(self.embeddings.embed_query("hello world"))
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=dim, distance=Distance.EUCLID),
+            )
+            logger.info(f"Created Qdrant collection '{self.collection_name}' ({dim} dims)")
+        client.create_payload_index(
+            collection_name=self.collection_name,
+            field_name=f"{METADATA_KEY}.image_id",
+            field_schema=PayloadSchemaType.KEYWORD,
+        )
+        self._collection_ready = True
+
+    @staticmethod
+    def _image_filter(image_id: str) -> Filter:
+        return Filter(must=[FieldCondition(key=f"{METADATA_KEY}.image_id", match=MatchValue(value=image_id))])
+
+    def add(self, image_id: str, chunks: List[Document], user_id: Optional[str] = None) -> int:
+        """Embed and persist the description chunks of one image."""
+        return self.add_many([(image_id, chunks, user_id)])
+
+    def add_many(self, images: Sequence[Tuple[str, List[Document], Optional[str]]]) -> int:
+        """
+        Embed and persist the description chunks of several images at once.
+
+        ``images`` holds ``(image_id, chunks, user_id)`` tuples. All chunks
+        go through one ``embed_documents`` call and one upsert, so a batch of
+        slides costs a single embedding pass instead of one per image.
+        """
+        self._ensure_collection()
+        texts, metadatas, spans = [], [], []
+        for image_id, chunks, user_id in images:
+            start = len(texts)
+            for chunk in chunks:
+                texts.append(chunk.page_content)
+                metadatas.append({**chunk.metadata, "image_id": image_id, "user_id": user_id})
+            spans.append((image_id, start, len(texts)))
+        if not texts:
+            return 0
+        vectors = self.embeddings.embed_documents(texts)
+
+        points = [
+            PointStruct(id=str(uuid4()), vector=vector, payload={CONTENT_KEY: text, METADATA_KEY: metadata})
+            for text, vector, metadata in zip(texts, vectors, metadatas)
+        ]
+        qdrant.get().upsert(collection_name=self.collection_name, points=points)
+
+        for image_id, start, end in spans:
+            if end > start:
+                self.hot.set(image_id, self._build_index(texts[start:end], vectors[start:end], metadatas[start:end]))
+        logger.info(f"Stored {len(points)} description chunks for {len(images)} images")
+        return len(points)
+
+    def _build_index(self, texts: List[str], vectors: List[List[float]], metadatas: List[dict]) -> FAISS:
+        return FAISS.from_embeddings(
+            text_embeddings=list(zip(texts, vectors)),
+            embedding=self.embeddings,
+            metadatas=metadatas,
+        )
+
+    def _load(self, image_id: str) -> Optional[FAISS]:
+        """Fetch all chunks of an image from Qdrant and rebuild its hot index."""
+        self._ensure_collection()
+        texts, vectors, metadatas = [], [], []
+        offset = None
+        while True:
+            points, offset = qdrant.get().scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._image_filter(image_id),
+                with_payload=True,
+                with_vectors=True,
+                limit=256,
+                offset=offset,
+            )
+            for point in points:
+                texts.append(point.payload[CONTENT_KEY])
+                vectors.append(point.vector)
+                metadatas.append(point.payload.get(METADATA_KEY, {}))
+            if offset is None:
+                break
+
+        if not texts:
+            return None
+        store = self._build_index(texts, vectors, metadatas)
+        self.hot.set(image_id, store)
+        logger.debug(f"Loaded {len(texts)} chunks for image {image_id} into the hot cache")
+        return store
+
+    def get(self, image_id: str) -> Optional[FAISS]:
+        store = self.hot.get(image_id)
+        if store is None:
+            store = self._load(image_id)
+        return store
+
+    def exists(self, image_id: str) -> bool:
+        return self.get(image_id) is not None
+
+    def delete(self, image_id: str) -> None:
+        self._ensure_collection()
+        qdrant.get().delete(collection_name=self.collection_name, points_selector=self._image_filter(image_id))
+        self.hot.pop(image_id)
@@ -1,4 +1,14 @@
+import os
+
 from qdrant_client import QdrantClient
 
-client = QdrantClient(url="http://localhost:6333")
-print(client)
\ No newline at end of file
+from services.resources import resources
+
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+
+qdrant = resources.register(
+    "qdrant",
+    lambda: QdrantClient(url=QDRANT_URL),
+    check=lambda client: client.get_collections(),
+    close=lambda client: client.close(),
+)
@@ -0,0 +1,131 @@
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from loguru import logger
+from qdrant_client.http.models import (
+    Filter,
+    Modifier,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    SparseVector,
+    SparseVectorParams,
+)
+
+from databases.qdrant.qdrant_store import qdrant
+
+SPARSE_VECTOR_NAME = "bm25"
+# Keeps identifiers like "mmap", "sys_open", "3.2" or "O(n)" intact as single terms
+TOKEN_PATTERN = re.compile(r"[a-z0-9_]+(?:[.\-][a-z0-9_]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def term_id(token: str) -> int:
+    """Stable 32-bit id for a term, identical across processes and restarts."""
+    return zlib.crc32(token.encode("utf-8"))
+
+
+class BM25SparseIndex:
+    """
+    BM25 index stored as Qdrant sparse vectors next to the dense collection.
+
+    Documents are encoded with the BM25 term-frequency component
+    (``k1``/``b`` saturation against ``avg_doc_len``); the collection uses
+    Qdrant's IDF modifier, so inverse document frequency is maintained by
+    the server as chunks are added and never needs a rebuild. Points share
+    ids with the dense collection so results can be fused by id.
+    """
+
+    def __init__(
+        self,
+        collection_name: str,
+        k1: float = 1.2,
+        b: float = 0.75,
+        avg_doc_len: float = 180.0,
+        payload_indexes: Optional[Dict[str, PayloadSchemaType]] = None,
+    ):
+        self.collection_name = collection_name
+        self.k1 = k1
+        self.b = b
+        self.avg_doc_len = avg_doc_len
+        self.payload_indexes = payload_indexes or {}
+        self._collection_ready = False
+
+    def _ensure_collection(self) -> None:
+        if self._collection_ready:
+            return
+        client = qdrant.get()
+        if not client.collection_exists(self.collection_name):
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config={},
+                sparse_vectors_config={SPARSE_VECTOR_NAME: SparseVectorParams(modifier=Modifier.IDF)},
+            )
+            logger.info(f"Created sparse collection '{self.collection_name}'")
+        for field_name, schema in self.payload_indexes.items():
+            client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=f"metadata.{field_name}",
+                field_schema=schema,
+            )
+        self._collection_ready = True
+
+    def encode_document(self, text: str) -> SparseVector:
+        counts = Counter(term_id(token) for token in tokenize(text))
+        doc_len = sum(counts.values())
+        norm = self.k1 * (1 - self.b + self.b * doc_len / self.avg_doc_len)
+        indices = list(counts)
+        values = [tf * (self.k1 + 1) / (tf + norm) for tf in counts.values()]
+        return SparseVector(indices=indices, values=values)
+
+    def encode_query(self, text: str) -> SparseVector:
+        indices = sorted({term_id(token) for token in tokenize(text)})
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
+
+    def add(self, docs: List[Document], ids: List[str]) -> None:
+        self._ensure_collection()
+        points = [
+            PointStruct(
+                id=point_id,
+                vector={SPARSE_VECTOR_NAME: self.encode_document(doc.page_content)},
+                payload={"page_content": doc.page_content, "metadata": doc.metadata},
+            )
+            for doc, point_id in zip(docs, ids)
+        ]
+        qdrant.get().upsert(collection_name=self.collection_name, points=points)
+
+    def delete(self, ids: List[str]) -> None:
+        if not ids:
+            return
+        self._ensure_collection()
+        qdrant.get().delete(collection_name=self.collection_name, points_selector=PointIdsList(points=ids))
+
+    def search(self, query: str, k: int, query_filter: Optional[Filter] = None) -> List[Tuple[Document, float]]:
+        self._ensure_collection()
+        sparse_query = self.encode_query(query)
+        if not sparse_query.indices:
+            return []
+        response = qdrant.get().query_points(
+            collection_name=self.collection_name,
+            query=sparse_query,
+            using=SPARSE_VECTOR_NAME,
+            query_filter=query_filter,
+            limit=k,
+            with_payload=True,
+        )
+        return [
+            (
+                Document(
+                    page_content=point.payload["page_content"],
+                    metadata={**point.payload.get("metadata", {}), "_id": str(point.id)},
+                ),
+                point.score,
+            )
+            for point in response.points
+        ]
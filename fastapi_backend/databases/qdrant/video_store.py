@@ -0,0 +1,147 @@
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+from langchain.embeddings.base import Embeddings
+from loguru import logger
+from qdrant_client.http.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+    VectorParams,
+)
+
+from databases.qdrant.qdrant_store import qdrant
+
+VIDEO_CHAPTER_COLLECTION = os.getenv("VIDEO_CHAPTER_COLLECTION", "video_chapters")
+CONTENT_KEY = "page_content"
+METADATA_KEY = "metadata"
+CHAPTER_NAMESPACE = uuid.UUID("0b8e6f0e-5a43-4c1e-9f7d-3c2a9e41d5b7")
+
+
+def chapter_text(chapter: Dict[str, Any]) -> str:
+    return f"{chapter['title']}\n{chapter['summary']}"
+
+
+class VideoChapterStore:
+    """
+    Segment index of videos kept in one shared Qdrant collection.
+
+    Each segment (start/end second, title, summary) is one point carrying
+    ``metadata.video_id`` and ``metadata.kind``: ``chapter`` for the chapter
+    index, ``transcript`` for transcript windows. Searches are filtered on
+    the video id, so a follow-up question about a video only ever sees that
+    video's segments. Indexing a kind again replaces that kind's segments.
+    """
+
+    def __init__(self, embeddings: Embeddings, collection_name: str = VIDEO_CHAPTER_COLLECTION):
+        self.embeddings = embeddings
+        self.collection_name = collection_name
+        self._collection_ready = False
+
+    def _ensure_collection(self) -> None:
+        if self._collection_ready:
+            return
+        client = qdrant.get()
+        if not client.collection_exists(self.collection_name):
+            dim = len(self.embeddings.embed_query("hello world"))
+            client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+            )
+            logger.info(f"Created Qdrant collection '{self.collection_name}' ({dim} dims)")
+        for field_name in ("video_id", "kind"):
+            client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=f"{METADATA_KEY}.{field_name}",
+                field_schema=PayloadSchemaType.KEYWORD,
+            )
+        self._collection_ready = True
+
+    @staticmethod
+    def _video_filter(video_id: str, kind: Optional[str] = None) -> Filter:
+        conditions = [FieldCondition(key=f"{METADATA_KEY}.video_id", match=MatchValue(value=video_id))]
+        if kind is not None:
+            conditions.append(FieldCondition(key=f"{METADATA_KEY}.kind", match=MatchValue(value=kind)))
+        return Filter(must=conditions)
+
+    def add(
+        self,
+        video_id: str,
+        chapters: List[Dict[str, Any]],
+        source_url: Optional[str] = None,
+        user_id: Optional[str] = None,
+        kind: str = "chapter",
+    ) -> int:
+        """Embed and persist one kind of segments of a video, replacing any earlier ones of that kind."""
+        self._ensure_collection()
+        client = qdrant.get()
+        client.delete(collection_name=self.collection_name, points_selector=self._video_filter(video_id, kind))
+        if not chapters:
+            return 0
+
+        texts = [chapter_text(chapter) for chapter in chapters]
+        vectors = self.embeddings.embed_documents(texts)
+        points = [
+            PointStruct(
+                id=str(uuid.uuid5(CHAPTER_NAMESPACE, f"{video_id}:{kind}:{position}")),
+                vector=vector,
+                payload={
+                    CONTENT_KEY: text,
+                    METADATA_KEY: {
+                        **chapter,
+                        "video_id": video_id,
+                        "kind": kind,
+                        "position": position,
+                        "source_url": source_url,
+                        "user_id": user_id,
+                    },
+                },
+            )
+            for position, (chapter, text, vector) in enumerate(zip(chapters, texts, vectors))
+        ]
+        client.upsert(collection_name=self.collection_name, points=points)
+        logger.info(f"Indexed {len(points)} {kind} segments for video {video_id}")
+        return len(points)
+
+    def chapters(self, video_id: str, kind: str = "chapter") -> List[Dict[str, Any]]:
+        """Every segment of one kind for a video, in playback order."""
+        self._ensure_collection()
+        chapters = []
+        offset = None
+        while True:
+            points, offset = qdrant.get().scroll(
+                collection_name=self.collection_name,
+                scroll_filter=self._video_filter(video_id, kind),
+                with_payload=True,
+                with_vectors=False,
+                limit=256,
+                offset=offset,
+            )
+            chapters.extend(point.payload[METADATA_KEY] for point in points)
+            if offset is None:
+                break
+        return sorted(chapters, key=lambda chapter: chapter.get("start_seconds", 0))
+
+    def exists(self, video_id: str, kind: Optional[str] = None) -> bool:
+        self._ensure_collection()
+        return qdrant.get().count(
+            collection_name=self.collection_name,
+            count_filter=self._video_filter(video_id, kind),
+            exact=False,
+        ).count > 0
+
+    def search(self, video_id: str, question: str, k: int = 4, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """The ``k`` segments of a video closest to the question (any kind by default), each with its ``score``."""
+        self._ensure_collection()
+        response = qdrant.get().query_points(
+            collection_name=self.collection_name,
+            query=self.embeddings.embed_query(question),
+            query_filter=self._video_filter(video_id, kind),
+            limit=k,
+            with_payload=True,
+        )
+        return [{**point.payload[METADATA_KEY], "score": point.score} for point in response.points]
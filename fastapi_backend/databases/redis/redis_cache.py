@@ -1,26 +1,407 @@
-import redis
-from langchain_redis import RedisSemanticCache
+import hashlib
+import json
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from uuid import uuid4
+
+import numpy as np
+from loguru import logger
 
 from langchain.embeddings.base import Embeddings
-from typing import List
-from pydantic import SecretStr
-from langchain_core.utils.utils import secret_from_env
-import google.generativeai as genai
-from langchain_huggingface import HuggingFaceEmbeddings
 import os
 
+from config.settings import app_settings
+from databases.redis.redis_client import r
+from Models.model_registry import ROBERTA_NLI, model_registry
+from services.image_hash import ImageFingerprint, hamming_distance, hash_bands
+
 from dotenv import load_dotenv
 load_dotenv()
 
-r = redis.Redis(host='localhost', port=6379, db=0)
-print(r)
+bi_embed = model_registry.embeddings(ROBERTA_NLI)
 
-bi_embed = HuggingFaceEmbeddings(   
-    model_name="roberta-base-nli-stsb-mean-tokens",
-    model_kwargs={"device": "cpu"}
-)
+
+def normalize_question(question: str) -> str:
+    question = re.sub(r"\s+", " ", question.strip().lower())
+    return question.rstrip(" ?!.")
+
+
+def context_fingerprint(contexts: List[str]) -> str:
+    digest = hashlib.sha256()
+    for context in contexts:
+        digest.update(hashlib.sha256(context.encode("utf-8")).digest())
+    return digest.hexdigest()[:32]
+
+
+class SemanticAnswerCache:
+    """
+    Redis-backed semantic cache for QA answers.
+
+    Entries are scoped by (scope id, retrieved-context fingerprint), where the
+    scope is a document or image id, and matched on the cosine distance of the
+    normalized question embedding. Only entries with an identical retrieved
+    context are compared, so a hit never answers from different material.
+
+    Each entry expires after ``ttl`` seconds; a scope/context bucket keeps at
+    most ``max_entries`` entries, oldest evicted first. ``invalidate`` drops
+    every entry of a scope, e.g. when a document is re-ingested. Any Redis
+    failure is treated as a miss.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        distance_threshold: float = 0.1,
+        ttl: int = 3600,
+        max_entries: int = 500,
+        prefix: str = "rag_cache:",
+    ):
+        self.embeddings = embeddings
+        self.distance_threshold = distance_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.invalidations = 0
+
+    def _entry_key(self, scope: str, fingerprint: str, entry_id: str) -> str:
+        return f"{self.prefix}answer:{scope}:{fingerprint}:{entry_id}"
+
+    def _index_key(self, scope: str, fingerprint: str) -> str:
+        return f"{self.prefix}answer_idx:{scope}:{fingerprint}"
+
+    def _scope_key(self, scope: str) -> str:
+        return f"{self.prefix}answer_scope:{scope}"
+
+    def _embed(self, question: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(normalize_question(question)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def lookup(self, scope: str, question: str, contexts: List[str]) -> Optional[Dict[str, Any]]:
+        """Return the cached entry closest to ``question`` within the distance threshold, if any."""
+        if self.ttl <= 0:
+            return None
+        fingerprint = context_fingerprint(contexts)
+        try:
+            client = r.get()
+            entry_ids = [entry_id.decode() for entry_id in client.zrange(self._index_key(scope, fingerprint), 0, -1)]
+            if not entry_ids:
+                self._count(False)
+                return None
+
+            pipe = client.pipeline(transaction=False)
+            for entry_id in entry_ids:
+                pipe.hmget(self._entry_key(scope, fingerprint, entry_id), "embedding", "answer", "question")
+            rows = pipe.execute()
+
+            live_ids, vectors, answers, questions, expired = [], [], [], [], []
+            for entry_id, (embedding, answer, cached_question) in zip(entry_ids, rows):
+                if embedding is None:
+                    expired.append(entry_id)
+                    continue
+                live_ids.append(entry_id)
+                vectors.append(np.frombuffer(embedding, dtype=np.float32))
+                answers.append(answer.decode())
+                questions.append(cached_question.decode())
+            if expired:
+                client.zrem(self._index_key(scope, fingerprint), *expired)
+            if not vectors:
+                self._count(False)
+                return None
+
+            distances = 1.0 - np.stack(vectors) @ self._embed(question)
+            best = int(np.argmin(distances))
+            if distances[best] > self.distance_threshold:
+                self._count(False)
+                return None
+        except Exception as e:
+            logger.warning(f"Semantic answer cache lookup failed: {e}")
+            self._count(False)
+            return None
+
+        self._count(True)
+        logger.info(f"Semantic answer cache hit for scope {scope} (distance {distances[best]:.3f})")
+        return {"answer": answers[best], "question": questions[best], "distance": float(distances[best])}
+
+    def store(self, scope: str, question: str, contexts: List[str], answer: str) -> None:
+        if self.ttl <= 0:
+            return
+        fingerprint = context_fingerprint(contexts)
+        entry_id = uuid4().hex
+        index_key = self._index_key(scope, fingerprint)
+        try:
+            client = r.get()
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(self._entry_key(scope, fingerprint, entry_id), mapping={
+                "embedding": self._embed(question).tobytes(),
+                "answer": answer,
+                "question": question,
+            })
+            pipe.expire(self._entry_key(scope, fingerprint, entry_id), self.ttl)
+            pipe.zadd(index_key, {entry_id: time.time()})
+            pipe.expire(index_key, self.ttl)
+            pipe.sadd(self._scope_key(scope), fingerprint)
+            pipe.expire(self._scope_key(scope), self.ttl)
+            pipe.zcard(index_key)
+            size = pipe.execute()[-1]
+
+            if size > self.max_entries:
+                evicted = client.zpopmin(index_key, size - self.max_entries)
+                if evicted:
+                    client.delete(*(self._entry_key(scope, fingerprint, member.decode()) for member, _score in evicted))
+        except Exception as e:
+            logger.warning(f"Semantic answer cache store failed: {e}")
+            return
+        with self._lock:
+            self.stores += 1
+
+    def invalidate(self, scope: str) -> int:
+        """Drop every cached answer for a document or image."""
+        removed = 0
+        try:
+            client = r.get()
+            for fingerprint in client.smembers(self._scope_key(scope)):
+                fingerprint = fingerprint.decode()
+                index_key = self._index_key(scope, fingerprint)
+                entry_keys = [self._entry_key(scope, fingerprint, entry_id.decode()) for entry_id in client.zrange(index_key, 0, -1)]
+                removed += client.delete(index_key, *entry_keys)
+            client.delete(self._scope_key(scope))
+        except Exception as e:
+            logger.warning(f"Semantic answer cache invalidation failed for {scope}: {e}")
+            return removed
+        with self._lock:
+            self.invalidations += 1
+        logger.info(f"Invalidated semantic answer cache for scope {scope}")
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / total if total else 0.0,
+                "distance_threshold": self.distance_threshold,
+            }
 
 
-semantic_cache = RedisSemanticCache(
-    redis_url="redis://localhost:6379", embeddings=bi_embed, distance_threshold=0.2
+semantic_cache = SemanticAnswerCache(
+    bi_embed,
+    distance_threshold=app_settings.ANSWER_CACHE_DISTANCE_THRESHOLD,
+    ttl=app_settings.CACHE_TTL,
+    max_entries=app_settings.ANSWER_CACHE_MAX_ENTRIES,
+    prefix=app_settings.CACHE_PREFIX,
 )
+
+
+class JSONResultCache:
+    """
+    Redis cache for JSON-serializable results of expensive generations, with a TTL.
+
+    Keys are namespaced under ``prefix``; any Redis failure is treated as a
+    miss (on read) or ignored (on write) so callers fall back to generating.
+    """
+
+    def __init__(self, prefix: str, ttl: int):
+        self.prefix = prefix
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.ttl <= 0:
+            return None
+        try:
+            value = r.get().get(f"{self.prefix}{key}")
+        except Exception as e:
+            logger.warning(f"Result cache lookup failed for {key}: {e}")
+            value = None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            r.get().set(f"{self.prefix}{key}", json.dumps(value), ex=self.ttl)
+        except Exception as e:
+            logger.warning(f"Result cache store failed for {key}: {e}")
+            return
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+
+youtube_summary_cache = JSONResultCache(
+    prefix=f"{app_settings.CACHE_PREFIX}youtube:",
+    ttl=app_settings.YOUTUBE_SUMMARY_CACHE_TTL,
+)
+
+
+class ImageDescriptionCache:
+    """
+    Redis cache of image descriptions, scoped per user.
+
+    An image with the same sha256 as one the user described before reuses
+    that description outright. Otherwise stored images whose 64-bit dHash is
+    within ``max_distance`` bits are candidates, and one is reused only when
+    its 256-bit dHash is also within ``max_fine_distance`` bits; the finer
+    check keeps slides that share a template (background, header bar) but
+    differ in content from being taken for copies.
+
+    Candidates are found through band keys: the 64-bit hash is split into
+    ``max_distance + 1`` bands (rounded up to a divisor of the hash length),
+    each an exact-match sorted set that keeps only its ``max_band_members``
+    newest images, so a common band such as a blank page stays small. Redis
+    failures are treated as misses.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        ttl: int,
+        max_distance: int = 3,
+        max_fine_distance: int = 8,
+        max_band_members: int = 64,
+    ):
+        if not 0 <= max_distance <= 15:
+            logger.warning(f"Image dedup distance {max_distance} outside 0-15, clamping")
+            max_distance = min(max(max_distance, 0), 15)
+        self.prefix = prefix
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_fine_distance = max_fine_distance
+        self.max_band_members = max_band_members
+        self.bands = next(bands for bands in (1, 2, 4, 8, 16) if bands > max_distance)
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _image_key(self, user_id: str, sha256: str) -> str:
+        return f"{self.prefix}{user_id}:img:{sha256}"
+
+    def _band_keys(self, user_id: str, image_hash: str) -> List[str]:
+        return [f"{self.prefix}{user_id}:band:{i}:{band}" for i, band in enumerate(hash_bands(image_hash, self.bands))]
+
+    def _near_duplicate(self, client, user_id: str, fingerprint: ImageFingerprint) -> Optional[str]:
+        pipe = client.pipeline()
+        for key in self._band_keys(user_id, fingerprint.dhash):
+            pipe.zrange(key, 0, -1)
+        candidates = {member.decode() for members in pipe.execute() for member in members}
+        candidates.discard(fingerprint.sha256)
+        if not candidates:
+            return None
+
+        pipe = client.pipeline()
+        for sha256 in candidates:
+            pipe.hmget(self._image_key(user_id, sha256), "dhash", "fine_dhash", "description")
+        best = None
+        for dhash, fine_dhash, description in pipe.execute():
+            if dhash is None or fine_dhash is None or description is None:
+                continue
+            if hamming_distance(fingerprint.dhash, dhash.decode()) > self.max_distance:
+                continue
+            fine_distance = hamming_distance(fingerprint.fine_dhash, fine_dhash.decode())
+            if fine_distance <= self.max_fine_distance and (best is None or fine_distance < best[0]):
+                best = (fine_distance, description.decode())
+        return best[1] if best is not None else None
+
+    def lookup(self, user_id: str, fingerprint: ImageFingerprint) -> Optional[str]:
+        if self.ttl <= 0:
+            return None
+        description, exact = None, False
+        try:
+            client = r.get()
+            value = client.hget(self._image_key(user_id, fingerprint.sha256), "description")
+            if value is not None:
+                description, exact = value.decode(), True
+            elif fingerprint.dhash and fingerprint.fine_dhash:
+                description = self._near_duplicate(client, user_id, fingerprint)
+        except Exception as e:
+            logger.warning(f"Image description cache lookup failed: {e}")
+        with self._lock:
+            if description is None:
+                self.misses += 1
+            elif exact:
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+        return description
+
+    def store(self, user_id: str, fingerprint: ImageFingerprint, description: str) -> None:
+        if self.ttl <= 0:
+            return
+        try:
+            pipe = r.get().pipeline()
+            image_key = self._image_key(user_id, fingerprint.sha256)
+            mapping = {"description": description}
+            if fingerprint.dhash and fingerprint.fine_dhash:
+                mapping.update(dhash=fingerprint.dhash, fine_dhash=fingerprint.fine_dhash)
+            pipe.hset(image_key, mapping=mapping)
+            pipe.expire(image_key, self.ttl)
+            if fingerprint.dhash and fingerprint.fine_dhash:
+                now = time.time()
+                for key in self._band_keys(user_id, fingerprint.dhash):
+                    pipe.zadd(key, {fingerprint.sha256: now})
+                    pipe.zremrangebyrank(key, 0, -self.max_band_members - 1)
+                    pipe.expire(key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.warning(f"Image description cache store failed: {e}")
+            return
+        with self._lock:
+            self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.exact_hits + self.near_hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": (self.exact_hits + self.near_hits) / total if total else 0.0,
+                "max_distance": self.max_distance,
+                "max_fine_distance": self.max_fine_distance,
+            }
+
+
+image_description_cache = ImageDescriptionCache(
+    prefix=f"{app_settings.CACHE_PREFIX}image:",
+    ttl=app_settings.IMAGE_DESCRIPTION_CACHE_TTL,
+    max_distance=app_settings.IMAGE_DEDUP_MAX_DISTANCE,
+    max_fine_distance=app_settings.IMAGE_DEDUP_MAX_FINE_DISTANCE,
+    max_band_members=app_settings.IMAGE_DEDUP_MAX_BAND_MEMBERS,
+)
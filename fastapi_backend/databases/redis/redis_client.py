@@ -0,0 +1,11 @@
+import redis
+
+from services.resources import resources
+
+r = resources.register(
+    "redis",
+    lambda: redis.Redis(host='localhost', port=6379, db=0),
+    check=lambda client: client.ping(),
+    close=lambda client: client.close(),
+    critical=False,
+)
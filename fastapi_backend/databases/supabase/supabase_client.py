@@ -0,0 +1,21 @@
+import os
+
+from dotenv import load_dotenv
+from supabase import Client, create_client
+
+from services.resources import resources
+
+load_dotenv()
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_PRIVATE")
+
+
+def _create_supabase() -> Client:
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+supabase = resources.register(
+    "supabase",
+    _create_supabase,
+    check=lambda client: client.table("documents").select("id").limit(1).execute(),
+)
@@ -1,12 +1,62 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 from routes.document_qa_route import document_router
 from routes.visual_qa_route import image_router
-from routes.video_qa_route import video_router
+from routes.video_qa_route import video_jobs, video_router, video_spool_executor
+from routes.health_route import health_router
+from config.settings import app_settings, settings
+from Models.model_registry import model_registry
+from services.audit_log import qa_audit_log
+from services.chain_registry import chain_registry
+from services.ingestion_jobs import ingestion_jobs
+from services.resources import resources
+from services.uploads import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+
+resources.metrics["import_seconds"] = round(time.perf_counter() - _import_started, 3)
+logger.info(f"Application modules imported in {resources.metrics['import_seconds']}s")
+
+resources.register("config", lambda: settings.validate(), critical=False)
+
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Clients are built lazily on first use; warming them here (concurrently,
+    # off the loop) only moves that cost before the first request. A backend
+    # that is down is reported by /health/ready instead of failing startup.
+    if os.getenv("STARTUP_WARMUP", "1") == "1":
+        await resources.warmup()
+        await asyncio.to_thread(chain_registry.compile_all)
+    # Runs in each worker after uvicorn forks, so every worker loads its own copy
+    if os.getenv("PRELOAD_MODELS", "0") == "1":
+        await asyncio.to_thread(model_registry.preload)
+    qa_audit_log.start()
+    yield
+    ingestion_jobs.shutdown(wait=False)
+    video_jobs.shutdown(wait=False)
+    video_spool_executor.shutdown(wait=False)
+    # Flush queued QA records while the Supabase client is still open
+    await qa_audit_log.stop()
+    resources.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Refuse oversized bodies from their Content-Length before the multipart parser spools them;
+# only the video routes accept bodies past the document/image limit
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    max_body_size=app_settings.MAX_UPLOAD_SIZE + MULTIPART_OVERHEAD,
+    path_limits={video_router.prefix: app_settings.MAX_VIDEO_UPLOAD_SIZE + MULTIPART_OVERHEAD},
+)
 
 
 app.add_middleware(
@@ -21,6 +71,7 @@ app.add_middleware(
 app.include_router(document_router)
 app.include_router(image_router)
 app.include_router(video_router)
+app.include_router(health_router)
 
 
 if __name__ == "__main__":
@@ -1,50 +1,65 @@
+import asyncio
 import os
 import json
 from uuid import uuid4
 from datetime import datetime
 
 
-from fastapi import APIRouter, UploadFile, File, Request, Depends, HTTPException, status
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, status
 
 # ==================== FastAPI ====================
 
-from fastapi import APIRouter, File, UploadFile, HTTPException, Form,Request,Depends
+from fastapi import APIRouter, File, UploadFile, HTTPException, Form,Depends
 from fastapi.security import HTTPBearer
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
-from tenacity import retry, wait_exponential, stop_after_attempt, stop_after_delay
+import httpx
+from tenacity import retry, retry_if_exception_type, wait_exponential, stop_after_attempt, stop_after_delay
 from loguru import logger
 
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import VectorParams, Distance
+from qdrant_client.http.models import (
+    Distance,
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    VectorParams,
+)
 
 from langchain_qdrant import QdrantVectorStore
-from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_huggingface import HuggingFaceEmbeddings
-from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.runnables.history import RunnableWithMessageHistory
-from langchain.globals import set_llm_cache
-from langchain.schema import StrOutputParser
-from langchain_neo4j import Neo4jChatMessageHistory
 
 from mistralai import DocumentURLChunk, Mistral
-from supabase import create_client, Client
 
-from databases.neo4j.neo4j_client import graph
+from auth.jwt_auth import get_current_user
+from databases.qdrant.qdrant_store import qdrant
+from databases.qdrant.sparse_index import BM25SparseIndex
+from databases.supabase.supabase_client import supabase
 from Models.Embedding_model.text_embedding import bi_embed
-from databases.redis.redis_cache import RedisSemanticCache
+from Models.Embedding_model.reranking_model import colbert_reranker
+from databases.redis.redis_cache import semantic_cache
+from config.settings import app_settings
+from services.audit_log import qa_audit_log
+from services.chain_registry import DOCUMENT_QA_PROMPT, chain_registry
+from services.chunk_diff import assign_chunk_ids, diff_chunks
+from services.document_ocr import content_hash, get_ocr_cache, merge_pages, ocr_cache_key, scan_text_layer
+from services.chat_history import chat_history
+from services.genai_client import document_chat_model
+from services.hybrid_retriever import HybridRetriever
+from services.ingestion_jobs import IngestionJob, StageStatus, ingestion_jobs
+from services.resources import resources
+from services.streaming import sse_event, sse_response
+from services.uploads import receive_upload
 
 # === Load environment variables ===
 load_dotenv()
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_PRIVATE")
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-mistral_client = Mistral(api_key=MISTRAL_API_KEY)
+mistral = resources.register("mistral", lambda: Mistral(api_key=MISTRAL_API_KEY))
 
 document_router = APIRouter(prefix="/api/v1", tags=["Document QA"])
 
@@ -58,187 +73,497 @@ class DocumentUploadResponse(BaseModel):
     page_count: int
     message: str
 
+class DocumentUploadJobResponse(BaseModel):
+    job_id: str
+    document_id: str
+    status: StageStatus
+    message: str
+    revision: bool = False
+
 class DocumentQAResponse(BaseModel):
     answer: str
     context: Optional[List[str]] = None
-
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-async def get_supabase_user(supabase_client: Client, jwt_token: str) -> dict:
-    """Authenticates user with Supabase JWT and returns user data with retry."""
-    user_response = supabase_client.auth.get_user(jwt_token)
-    logger.info(f"Supabase user response: {user_response}")
-    if user_response.user is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token") # Do not retry on invalid token
-    return user_response.user
-
-async def get_current_user(request: Request) -> dict:
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    jwt_token = auth_header.split(" ")[1]
-    # Use the retriable helper function
-    return await get_supabase_user(supabase, jwt_token)
+    cached: bool = False
 
 
 # === Vector Store & LLM Setup ===
 
-qdrant_client =  QdrantClient(host="localhost", port=6333)
 collection_name = "demo_collection"
-existing_collections = qdrant_client.get_collections().collections
-existing_names = [col.name for col in existing_collections]
-if collection_name not in existing_names:
-    qdrant_client.create_collection(
+CHUNK_PAYLOAD_INDEXES = {
+    "document_id": PayloadSchemaType.KEYWORD,
+    "user_id": PayloadSchemaType.KEYWORD,
+    "page": PayloadSchemaType.INTEGER,
+}
+
+
+def _build_vector_store() -> QdrantVectorStore:
+    qdrant_client = qdrant.get()
+    existing_collections = qdrant_client.get_collections().collections
+    existing_names = [col.name for col in existing_collections]
+    if collection_name not in existing_names:
+        qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+        )
+    else:
+        logger.info(f"Collection '{collection_name}' already exists.")
+
+    # Payload indexes keep per-document filtered searches inside the HNSW graph
+    # instead of post-filtering the whole collection; creation is idempotent.
+    for field_name, schema in CHUNK_PAYLOAD_INDEXES.items():
+        qdrant_client.create_payload_index(
+            collection_name=collection_name,
+            field_name=f"metadata.{field_name}",
+            field_schema=schema,
+        )
+    return QdrantVectorStore(
+        client=qdrant_client,
         collection_name=collection_name,
-        vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+        embedding=bi_embed,
     )
-else:
-    print(f"Collection '{collection_name}' already exists.")
-vector_store = QdrantVectorStore(
-    client=qdrant_client,
-    collection_name="demo_collection",
-    embedding=bi_embed,
-)
-retriever = vector_store.as_retriever(search_kwargs={"k": 2})
 
 
-chat_model = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    api_key=GOOGLE_API_KEY,
-    temperature=0.4
+document_vector_store = resources.register("document_vector_store", _build_vector_store)
+document_sparse_index = BM25SparseIndex(f"{collection_name}_bm25", payload_indexes=CHUNK_PAYLOAD_INDEXES)
+
+document_retriever = resources.register(
+    "document_retriever",
+    lambda: HybridRetriever(
+        document_vector_store.get(),
+        document_sparse_index,
+        k=app_settings.RETRIEVAL_K,
+        candidates=app_settings.RETRIEVAL_CANDIDATES,
+        dense_weight=app_settings.RETRIEVAL_DENSE_WEIGHT,
+        sparse_weight=app_settings.RETRIEVAL_SPARSE_WEIGHT,
+        rrf_k=app_settings.RETRIEVAL_RRF_K,
+    ),
 )
+
+chain_registry.register(DOCUMENT_QA_PROMPT, document_chat_model.get)
+
 # === Routes ===
 
-@document_router.post("/upload", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...), user=Depends(get_current_user)):
-    document_id = str(uuid4())
-    content = await file.read()
+INGESTION_STAGES = [
+    "fingerprint", "text_layer", "upload", "signed_url", "ocr", "split", "diff",
+    "embed", "index", "sparse_index", "prune", "rerank_precompute", "persist",
+]
+EMBED_BATCH_SIZE = 64
 
-    # Upload file to Mistral
-    uploaded_file = mistral_client.files.upload(
-        file={"file_name": file.filename, "content": content}, purpose="ocr"
+
+def _upload_to_mistral(filename: str, content: bytes):
+    return mistral.get().files.upload(
+        file={"file_name": filename, "content": content}, purpose="ocr"
     )
 
-    signed_url = mistral_client.files.get_signed_url(file_id=uploaded_file.id, expiry=1)
 
-    # OCR processing
-    pdf_response = mistral_client.ocr.process(
-        document=DocumentURLChunk(document_url=signed_url.url),
+def _get_signed_url(file_id: str):
+    return mistral.get().files.get_signed_url(file_id=file_id, expiry=1)
+
+
+def _run_ocr(document_url: str, include_images: bool = False) -> list:
+    pdf_response = mistral.get().ocr.process(
+        document=DocumentURLChunk(document_url=document_url),
         model="mistral-ocr-latest",
-        include_image_base64=True
+        include_image_base64=include_images
     )
-
     response_dict = json.loads(pdf_response.json())
-    pages = response_dict.get("pages", [])
-    if not pages:
-        raise HTTPException(status_code=400, detail="No content extracted from PDF.")
+    return response_dict.get("pages", [])
 
-    chunks = "\n".join(page["markdown"] for page in pages)
 
-    # Text splitting and vector store
+def _split_pages(job: IngestionJob, pages: list) -> list:
+    # Split page by page so every chunk carries the page it came from
     splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    docs = splitter.create_documents([chunks])
-    ids = [str(uuid4()) for _ in range(len(docs))]
-    vector_store.add_documents(documents=docs, ids=ids)
+    metadatas = [
+        {"document_id": job.document_id, "user_id": job.user_id, "page": page.get("index", i)}
+        for i, page in enumerate(pages)
+    ]
+    return splitter.create_documents([page["markdown"] for page in pages], metadatas=metadatas)
+
+
+def document_filter(document_id: str, user_id: str) -> Filter:
+    return Filter(must=[
+        FieldCondition(key="metadata.document_id", match=MatchValue(value=document_id)),
+        FieldCondition(key="metadata.user_id", match=MatchValue(value=user_id)),
+    ])
+
+
+def _embed_chunks(job: IngestionJob, docs: list) -> List[List[float]]:
+    texts = [doc.page_content for doc in docs]
+    vectors = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        vectors.extend(bi_embed.embed_documents(texts[start:start + EMBED_BATCH_SIZE]))
+        ingestion_jobs.set_progress(job, "embed", len(vectors) / len(texts))
+    return vectors
+
+
+def _index_chunks(docs: list, vectors: List[List[float]], ids: List[str]) -> None:
+    vector_store = document_vector_store.get()
+    points = [
+        PointStruct(
+            id=point_id,
+            vector=vector,
+            payload={
+                vector_store.content_payload_key: doc.page_content,
+                vector_store.metadata_payload_key: doc.metadata,
+            },
+        )
+        for doc, vector, point_id in zip(docs, vectors, ids)
+    ]
+    vector_store.client.upsert(collection_name=collection_name, points=points)
+
+
+def _existing_chunk_pages(document_id: str, user_id: str) -> Dict[str, Optional[int]]:
+    """Point id -> page for every chunk already stored for the document."""
+    client = document_vector_store.get().client
+    pages = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=document_filter(document_id, user_id),
+            with_payload=["metadata.page"],
+            with_vectors=False,
+            limit=1024,
+            offset=offset,
+        )
+        for point in points:
+            pages[str(point.id)] = (point.payload.get("metadata") or {}).get("page")
+        if offset is None:
+            return pages
+
+
+def _prune_chunks(removed_ids: List[str], moved: Dict[str, int]) -> None:
+    client = document_vector_store.get().client
+    if removed_ids:
+        client.delete(collection_name=collection_name, points_selector=PointIdsList(points=removed_ids))
+        document_sparse_index.delete(removed_ids)
+
+    # Unchanged text on a different page keeps its vectors; only the page in the payload moves
+    by_page: Dict[int, List[str]] = {}
+    for point_id, page in moved.items():
+        by_page.setdefault(page, []).append(point_id)
+    for page, point_ids in by_page.items():
+        for target in (collection_name, document_sparse_index.collection_name):
+            client.set_payload(collection_name=target, payload={"page": page}, points=point_ids, key="metadata")
+
+
+def _precompute_rerank(docs: list) -> None:
+    # Reranking is an optimization; a failure here must not fail the ingestion
+    if not app_settings.RERANK_ENABLED:
+        return
+    try:
+        colbert_reranker.precompute([doc.page_content for doc in docs])
+    except Exception as e:
+        logger.warning(f"ColBERT precompute skipped: {e}")
+
+
+async def retrieve_context(question: str, document_id: str, user_id: str) -> list:
+    """Hybrid retrieval over a wider candidate set, narrowed to RETRIEVAL_K with ColBERT MaxSim."""
+    query_filter = document_filter(document_id, user_id)
+    if not app_settings.RERANK_ENABLED:
+        return await document_retriever.get().ainvoke(question, query_filter=query_filter)
+
+    candidates = await document_retriever.get().ainvoke(
+        question, query_filter=query_filter, k=app_settings.RERANK_CANDIDATES
+    )
+    try:
+        reranked = await colbert_reranker.arerank(question, candidates, k=app_settings.RETRIEVAL_K)
+        return [doc for doc, _score in reranked]
+    except Exception as e:
+        logger.warning(f"ColBERT rerank failed, using fused order: {e}")
+        return candidates[:app_settings.RETRIEVAL_K]
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
+def _insert_document_metadata(data: dict):
+    # Upsert: a revision keeps its document_id and replaces the previous row
+    return supabase.get().table("documents").upsert(data).execute()
+
+
+def _lookup_ocr_cache(content: bytes, include_images: bool, file_hash: Optional[str] = None):
+    file_hash = file_hash or content_hash(content)
+    cache = get_ocr_cache()
+    pages = None
+    if cache is not None:
+        try:
+            pages = cache.get(ocr_cache_key(file_hash, include_images))
+        except Exception as e:
+            logger.warning(f"OCR cache lookup failed: {e}")
+    return file_hash, pages
+
+
+def _store_ocr_cache(file_hash: str, include_images: bool, pages: list) -> None:
+    cache = get_ocr_cache()
+    if cache is None:
+        return
+    try:
+        cache.set(ocr_cache_key(file_hash, include_images), pages)
+    except Exception as e:
+        logger.warning(f"Could not cache OCR result for {file_hash}: {e}")
+
+
+async def _extract_pages(
+    job: IngestionJob, filename: str, content: bytes, include_images: bool, file_hash: Optional[str] = None
+) -> list:
+    """
+    Pages for a PDF, calling Mistral OCR only when it is actually needed.
+
+    Identical files reuse the cached pages of an earlier upload. Otherwise
+    pages with an embedded text layer are read locally and only the
+    image-only pages are sent to OCR, as a smaller PDF.
+    """
+    file_hash, pages = await ingestion_jobs.run_stage(
+        job, "fingerprint", _lookup_ocr_cache, content, include_images, file_hash
+    )
+    if pages is not None:
+        logger.info(f"Reusing extracted pages for {filename} (sha256 {file_hash[:12]})")
+        for stage_name in ("text_layer", "upload", "signed_url", "ocr"):
+            ingestion_jobs.skip_stage(job, stage_name)
+        return pages
+
+    scan = await ingestion_jobs.run_stage(job, "text_layer", scan_text_layer, content)
+    logger.info(
+        f"{filename}: {len(scan.text_pages)} of {scan.page_count} pages have a text layer, "
+        f"{len(scan.image_pages)} need OCR"
+    )
+
+    ocr_pages = []
+    if scan.image_pages:
+        uploaded_file = await ingestion_jobs.run_stage(job, "upload", _upload_to_mistral, filename, scan.ocr_pdf)
+        signed_url = await ingestion_jobs.run_stage(job, "signed_url", _get_signed_url, uploaded_file.id)
+        ocr_pages = await ingestion_jobs.run_stage(job, "ocr", _run_ocr, signed_url.url, include_images)
+    else:
+        for stage_name in ("upload", "signed_url", "ocr"):
+            ingestion_jobs.skip_stage(job, stage_name)
+
+    pages = merge_pages(scan, ocr_pages)
+    if pages:
+        await asyncio.to_thread(_store_ocr_cache, file_hash, include_images, pages)
+    return pages
+
+
+async def _run_ingestion(
+    job: IngestionJob, filename: str, content: bytes, include_images: bool = False, file_hash: Optional[str] = None
+) -> None:
+    pages = await _extract_pages(job, filename, content, include_images, file_hash)
+    if not pages:
+        raise ValueError("No content extracted from PDF.")
+    job.page_count = len(pages)
+
+    docs = await ingestion_jobs.run_stage(job, "split", _split_pages, job, pages)
+    job.chunk_count = len(docs)
+
+    # Dense and sparse points share deterministic ids, so retrieval results can be
+    # fused by id and a re-upload only touches the chunks that actually changed
+    ids = assign_chunk_ids(job.document_id, docs)
+    existing = await ingestion_jobs.run_stage(job, "diff", _existing_chunk_pages, job.document_id, job.user_id)
+    report, to_embed, removed_ids, moved = diff_chunks(existing, ids, docs)
+    job.diff = report.model_dump()
+    logger.info(f"Ingestion job {job.job_id} chunk diff: {job.diff}")
+
+    new_docs = [docs[i] for i in to_embed]
+    new_ids = [ids[i] for i in to_embed]
+    if new_docs:
+        vectors = await ingestion_jobs.run_stage(job, "embed", _embed_chunks, job, new_docs)
+        await ingestion_jobs.run_stage(job, "index", _index_chunks, new_docs, vectors, new_ids)
+        await ingestion_jobs.run_stage(job, "sparse_index", document_sparse_index.add, new_docs, new_ids)
+    else:
+        for stage_name in ("embed", "index", "sparse_index"):
+            ingestion_jobs.skip_stage(job, stage_name)
+    await ingestion_jobs.run_stage(job, "prune", _prune_chunks, removed_ids, moved)
+    await ingestion_jobs.run_stage(job, "rerank_precompute", _precompute_rerank, new_docs)
 
     # Metadata to store in Supabase
     doc_data = {
-        "id": document_id,
-        "user_id": user.id,
-        "page_count": len(docs),
+        "id": job.document_id,
+        "user_id": job.user_id,
+        "page_count": job.page_count,
         "uploaded_at": datetime.now().isoformat(),
-        "filename": file.filename,
+        "filename": filename,
     }
+    await ingestion_jobs.run_stage(job, "persist", _insert_document_metadata, doc_data)
+    # Answers cached against the previous chunks of this document are stale now
+    await asyncio.to_thread(semantic_cache.invalidate, job.document_id)
+
+
+@document_router.post("/upload", response_model=DocumentUploadJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_document(
+    file: UploadFile = File(...),
+    include_images: bool = False,
+    document_id: Optional[str] = None,
+    user=Depends(get_current_user)
+):
+    """
+    Accept a PDF for background ingestion.
+
+    Pass the ``document_id`` of an existing document to upload a new
+    revision of it: only new or changed chunks are embedded, removed ones
+    are deleted, and the job's ``diff`` reports what changed.
+    """
+    revision = document_id is not None
+    if revision:
+        await _verify_document_access(document_id, user.id)
+    else:
+        document_id = str(uuid4())
+
+    upload = await receive_upload(file, extensions={"pdf"})
+    # The job outlives this request and its spooled file, so it keeps one copy of the bytes
+    content = await asyncio.to_thread(upload.read_bytes)
+
+    job = ingestion_jobs.create_job(
+        document_id=document_id,
+        user_id=user.id,
+        stages=INGESTION_STAGES,
+        filename=upload.filename,
+    )
+    ingestion_jobs.submit(
+        job, lambda j: _run_ingestion(j, upload.filename, content, include_images, upload.sha256)
+    )
 
-    # Retry mechanism for insertion
-    @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-    def insert_document_metadata_with_retry(data):
-        return supabase.table("documents").insert(data).execute()
-
-    # Insert into Supabase
-    insert_document_metadata_with_retry(doc_data)
-
-    return DocumentUploadResponse(
+    return DocumentUploadJobResponse(
+        job_id=job.job_id,
         document_id=document_id,
-        page_count=len(pages),
-        message="Document uploaded and processed successfully."
+        status=job.status,
+        message="Revision accepted for processing." if revision else "Document accepted for processing.",
+        revision=revision
     )
 
-@document_router.post("/query", response_model=DocumentQAResponse)
-async def ask_question(request: DocumentQARequest, user=Depends(get_current_user)):
-    try:
-        # Retry fetching the document metadata to verify access
-        @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-        def get_document_with_retry(doc_id, user_id):
-            return supabase.table("documents") \
-                .select("*") \
-                .eq("id", doc_id) \
-                .eq("user_id", user_id) \
-                .single() \
-                .execute()
-
-        doc_response = get_document_with_retry(request.document_id, user.id)
-        if not doc_response or not doc_response.data:
-            raise HTTPException(
-                status_code=403,
-                detail="You don't have access to this document."
-            )
 
-        # Retrieve relevant chunks from the vector store based on question
-        context_docs = retriever.invoke(request.question)
-        context = "\n".join(doc.page_content for doc in context_docs)
-
-        # Helper to get chat history for the session
-        def get_session_history(session_id: str) -> Neo4jChatMessageHistory:
-            return Neo4jChatMessageHistory(session_id=session_id, graph=graph)
-
-        # Define prompt template for chat model
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "Answer the following question on the given context : {context} "
-                       "as well as from your base cut-off knowledge. "
-                       "While answering the queries, also provide URL links to the documentation wherever necessary."),
-            MessagesPlaceholder(variable_name="chat_history"),
-            ("human", "{question}")
-        ])
-
-        chat_chain = prompt | chat_model | StrOutputParser()
-
-        chat_with_history = RunnableWithMessageHistory(
-            chat_chain,
-            get_session_history,
-            input_messages_key="question",
-            history_messages_key="chat_history",
-        )
+@document_router.get("/upload/{job_id}", response_model=IngestionJob)
+async def get_upload_status(job_id: str, user=Depends(get_current_user)):
+    job = await asyncio.to_thread(ingestion_jobs.get_job, job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job
 
-        response = chat_with_history.invoke(
-            {
-                "question": request.question,
-                "context": context
-            },
-            config={"configurable": {"session_id": user.id}}
+# Only transport failures are worth retrying; a missing row is an answer, not an error
+@retry(
+    stop=stop_after_attempt(3),
+    wait=wait_exponential(multiplier=1, min=1, max=4),
+    retry=retry_if_exception_type(httpx.TransportError),
+    reraise=True,
+)
+def _get_document_owner(doc_id: str) -> Optional[Dict]:
+    response = supabase.get().table("documents") \
+        .select("id, user_id") \
+        .eq("id", doc_id) \
+        .limit(1) \
+        .execute()
+    return response.data[0] if response.data else None
+
+
+async def _verify_document_access(document_id: str, user_id: str) -> None:
+    document = await asyncio.to_thread(_get_document_owner, document_id)
+    if document is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+    if document.get("user_id") != user_id:
+        raise HTTPException(
+            status_code=403,
+            detail="You don't have access to this document."
         )
 
-        # Prepare data for logging into Supabase
-        qa_data = {
-            "id": str(uuid4()),
-            "user_id": user.id,
-            "document_id": request.document_id,
-            "question": request.question,
-            "answer": response,
-            "context": [context],
-            "created_at": datetime.now().isoformat()
-        }
 
-        @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10))
-        def insert_qa_data_with_retry(data):
-            supabase.table("document_qa").insert(data).execute()
+async def _cached_answer(request: DocumentQARequest, contexts: List[str]) -> Optional[str]:
+    cached = await asyncio.to_thread(semantic_cache.lookup, request.document_id, request.question, contexts)
+    return cached["answer"] if cached is not None else None
+
+
+def _qa_record(request: DocumentQARequest, user_id: str, answer: str, context: str) -> dict:
+    return {
+        "id": str(uuid4()),
+        "user_id": user_id,
+        "document_id": request.document_id,
+        "question": request.question,
+        "answer": answer,
+        "context": [context],
+        "created_at": datetime.now().isoformat()
+    }
+
+
+@document_router.post("/query", response_model=DocumentQAResponse)
+async def ask_question(request: DocumentQARequest, user=Depends(get_current_user)):
+    try:
+        await _verify_document_access(request.document_id, user.id)
+
+        # Retrieve relevant chunks from the vector store based on question
+        context_docs = await retrieve_context(request.question, request.document_id, user.id)
+        contexts = [doc.page_content for doc in context_docs]
+        context = "\n".join(contexts)
+
+        response = await _cached_answer(request, contexts)
+        cached = response is not None
+        if not cached:
+            history = await asyncio.to_thread(chat_history.messages, user.id, request.document_id)
+            response = await chain_registry.get("document_qa").ainvoke(
+                {
+                    "question": request.question,
+                    "context": context,
+                    "chat_history": history
+                }
+            )
+            await asyncio.to_thread(semantic_cache.store, request.document_id, request.question, contexts, response)
+        await chat_history.append(user.id, request.document_id, request.question, response)
 
-        insert_qa_data_with_retry(qa_data)
+        # Queue the exchange for the batched Supabase writer
+        await qa_audit_log.submit("document_qa", _qa_record(request, user.id, response, context))
 
         return DocumentQAResponse(
             answer=response,
-            context=[doc.page_content for doc in context_docs]
+            context=contexts,
+            cached=cached
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Query failed: {e}")
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+
+@document_router.post("/query/stream")
+async def ask_question_stream(request: DocumentQARequest, user=Depends(get_current_user)):
+    """
+    Server-Sent Events variant of /query.
+
+    Emits a ``context`` event, then one ``token`` event per chunk yielded by
+    the chain, then ``done``. The exchange is written to Supabase (and the
+    Neo4j history) only after the stream completes.
+    """
+    await _verify_document_access(request.document_id, user.id)
+    context_docs = await retrieve_context(request.question, request.document_id, user.id)
+    contexts = [doc.page_content for doc in context_docs]
+    context = "\n".join(contexts)
+    cached_answer = await _cached_answer(request, contexts)
+    history = [] if cached_answer is not None else await asyncio.to_thread(
+        chat_history.messages, user.id, request.document_id
+    )
+
+    async def event_stream():
+        yield sse_event({"type": "context", "context": contexts})
+        if cached_answer is not None:
+            answer = cached_answer
+            yield sse_event({"type": "token", "content": cached_answer})
+        else:
+            parts = []
+            try:
+                async for token in chain_registry.get("document_qa").astream(
+                    {"question": request.question, "context": context, "chat_history": history}
+                ):
+                    parts.append(token)
+                    yield sse_event({"type": "token", "content": token})
+            except Exception as e:
+                logger.error(f"Streaming query failed: {e}")
+                yield sse_event({"type": "error", "detail": f"Query failed: {str(e)}"})
+                return
+            answer = "".join(parts)
+            await asyncio.to_thread(semantic_cache.store, request.document_id, request.question, contexts, answer)
+
+        try:
+            await chat_history.append(user.id, request.document_id, request.question, answer)
+        except Exception as e:
+            logger.error(f"Failed to record streamed turn in chat history: {e}")
+        qa_data = _qa_record(request, user.id, answer, context)
+        await qa_audit_log.submit("document_qa", qa_data)
+        yield sse_event({"type": "done", "qa_id": qa_data["id"], "cached": cached_answer is not None})
+
+    return sse_response(event_stream())
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from auth.jwt_auth import jwt_verifier
+from databases.redis.redis_cache import image_description_cache, semantic_cache, youtube_summary_cache
+from Models.model_registry import model_registry
+from services.audit_log import qa_audit_log
+from services.chain_registry import chain_registry
+from services.chat_history import chat_history
+from services.resources import resources
+
+health_router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@health_router.get("/live")
+async def liveness():
+    """The process is up and serving; dependencies are not checked."""
+    return {"status": "alive"}
+
+
+@health_router.get("/ready")
+async def readiness():
+    """Probe every registered dependency; 503 while any critical one is unavailable."""
+    report = await resources.readiness()
+    report["models"] = model_registry.stats()
+    report["answer_cache"] = semantic_cache.stats()
+    report["youtube_cache"] = youtube_summary_cache.stats()
+    report["image_description_cache"] = image_description_cache.stats()
+    report["auth_cache"] = jwt_verifier.stats()
+    report["audit_log"] = qa_audit_log.stats()
+    report["chat_history"] = chat_history.stats()
+    report["chains"] = chain_registry.versions()
+    return JSONResponse(status_code=200 if report["ready"] else 503, content=report)
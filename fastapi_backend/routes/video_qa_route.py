@@ -1,158 +1,349 @@
 
 import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import re
 from urllib.parse import urlparse, parse_qs
 import asyncio
 import anyio
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status,Request
+from fastapi import APIRouter, UploadFile, File, HTTPException, status,Depends
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, HttpUrl
 from typing import Optional,List
 
-from supabase import create_client,Client
-
-from google import genai
 from google.genai import types
 from fastapi.responses import JSONResponse
+from langchain_google_genai import ChatGoogleGenerativeAI
 from loguru import logger
 
+from auth.jwt_auth import get_current_user
+from config.settings import app_settings
+from databases.qdrant.video_store import VideoChapterStore
+from databases.redis.redis_cache import semantic_cache, youtube_summary_cache
+from databases.redis.redis_client import r
+from Models.model_registry import MPNET, model_registry
+from services.chain_registry import VIDEO_QA_PROMPT, chain_registry
+from services.genai_client import genai_client
+from services.ingestion_jobs import IngestionJob, IngestionJobManager, StageStatus
+from services.resources import resources
+from services.single_flight import SingleFlight
+from services.uploads import UPLOAD_CHUNK_SIZE, ReceivedUpload, receive_upload
+
 logger.add("video_qa.log", rotation="10 MB", retention="10 days", level="DEBUG")
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_PRIVATE")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+video_router = APIRouter(prefix="/video-qa", tags=["Video Question Answering"])
 
-try:
-    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
-    logger.success("Google GenAI client initialized successfully")
-except Exception as e:
-    logger.error(f"Failed to initialize Google GenAI client: {str(e)}")
-    raise
+VIDEO_EXTENSIONS = {"mp4", "mov", "avi", "mkv"}
 
-video_router = APIRouter(prefix="/video-qa", tags=["Video Question Answering"])
+video_chapter_store = VideoChapterStore(model_registry.embeddings(MPNET, normalize=True))
+
+video_chat_model = resources.register(
+    "video_chat_model",
+    lambda: ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        temperature=0.3,
+        api_key=os.getenv("GOOGLE_API_KEY")
+    ),
+)
+chain_registry.register(VIDEO_QA_PROMPT, video_chat_model.get)
 
 class YouTubeVideoRequest(BaseModel):
     url: HttpUrl
+    # Also index a timestamped transcript, for follow-up questions through /ask
+    transcript: bool = False
 
 class VideoUploadResponse(BaseModel):
     response_text: str
     message: str
 
+class VideoJobResponse(BaseModel):
+    job_id: str
+    status: StageStatus
+    message: str
+
 class TimestampEmbed(BaseModel):
     timestamp: str
     start_seconds: int
     embed_url: str
 
+class VideoChapter(BaseModel):
+    start_seconds: int
+    end_seconds: Optional[int] = None
+    title: str
+    summary: str
+
+class VideoAnalysis(BaseModel):
+    """Schema the model is constrained to when analysing a video."""
+    summary: str
+    chapters: List[VideoChapter]
+
 class YouTubeResponse(BaseModel):
     response_text: str
     message: str
     timestamps: List[TimestampEmbed] = []
-async def get_current_user(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    jwt_token = auth_header.split(" ")[1]
-    user_response = supabase.auth.get_user(jwt_token)
-    logger.info(f"The user response is : {user_response}")
-    if user_response.user is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return user_response.user
- 
-
-def extract_timestamps(text: str) -> list[str]:
-    """Extract timestamps from text using regex pattern"""
-    pattern = r'(\d{1,2}:\d{2}(?::\d{2})?)'
-    timestamps = re.findall(pattern, text)
-    logger.debug(f"Extracted {len(timestamps)} timestamps from text")
-    return timestamps
-
-def ts_to_seconds(ts: str) -> int:
-    """Convert timestamp string to seconds"""
-    try:
-        parts = list(map(int, ts.split(':')))
-        if len(parts) == 3:
-            return parts[0]*3600 + parts[1]*60 + parts[2]
-        elif len(parts) == 2:
-            return parts[0]*60 + parts[1]
-        else:
-            return int(parts[0])
-    except Exception as e:
-        logger.warning(f"Failed to convert timestamp {ts}: {str(e)}")
-        raise ValueError(f"Invalid timestamp format: {ts}")
+    chapters: List[VideoChapter] = []
+    video_id: Optional[str] = None
+    cached: bool = False
+    transcript_segments: int = 0
+
+class VideoChapterSearchResponse(BaseModel):
+    video_id: str
+    chapters: List[VideoChapter]
+
+class TranscriptSegment(BaseModel):
+    start_seconds: int
+    end_seconds: int
+    text: str
+
+class VideoTranscript(BaseModel):
+    """Schema the model is constrained to when transcribing a video."""
+    segments: List[TranscriptSegment]
+
+class VideoQARequest(BaseModel):
+    video_id: str
+    question: str
+    k: int = 4
+
+class VideoSegmentMatch(BaseModel):
+    kind: str
+    start_seconds: int
+    end_seconds: Optional[int] = None
+    timestamp: str
+    title: str
+    summary: str
+    score: float
+    embed_url: Optional[str] = None
+
+class VideoQAResponse(BaseModel):
+    answer: str
+    video_id: str
+    segments: List[VideoSegmentMatch]
+    cached: bool = False
+
+
+CHAPTER_INSTRUCTIONS = (
+    " Also split the video into chapters that follow its structure. For each chapter give "
+    "the start time as whole seconds from the beginning of the video, a short title and "
+    "a two to three sentence summary of what it covers."
+)
+
 
-def build_embed_url(youtube_url: str, timestamp: str) -> tuple[str, int]:
-    """Build YouTube embed URL with timestamp"""
-    logger.debug(f"Building embed URL for {youtube_url} at {timestamp}")
+def format_timestamp(seconds: int) -> str:
+    """Seconds as m:ss, or h:mm:ss for videos over an hour"""
+    hours, remainder = divmod(int(seconds), 3600)
+    minutes, secs = divmod(remainder, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes}:{secs:02d}"
+
+YOUTUBE_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def youtube_video_id(youtube_url: str) -> str:
+    """Normalized 11-character video id for watch, youtu.be, shorts, embed and live URLs"""
     parsed_url = urlparse(youtube_url)
     video_id = None
 
     if 'youtu.be' in parsed_url.netloc:
-        video_id = parsed_url.path.lstrip('/')
+        video_id = parsed_url.path.lstrip('/').split('/')[0]
     elif 'youtube.com' in parsed_url.netloc:
         qs = parse_qs(parsed_url.query)
         video_id = qs.get('v', [None])[0]
+        path_parts = parsed_url.path.strip('/').split('/')
+        if not video_id and len(path_parts) >= 2 and path_parts[0] in ("shorts", "embed", "live", "v"):
+            video_id = path_parts[1]
 
-    if not video_id:
+    if not video_id or not YOUTUBE_ID_PATTERN.match(video_id):
         logger.error(f"Invalid YouTube URL format: {youtube_url}")
         raise ValueError("Invalid YouTube URL")
+    return video_id
 
-    start_seconds = ts_to_seconds(timestamp)
-    embed_url = f"https://www.youtube.com/embed/{video_id}?start={start_seconds}&autoplay=1"
-    logger.debug(f"Generated embed URL: {embed_url}")
-    return embed_url, start_seconds
 
-@video_router.post("/process-youtube", response_model=YouTubeResponse)
-async def process_youtube_video(request: YouTubeVideoRequest):
-    """Process YouTube video URL and generate summary"""
-    logger.info(f"Processing YouTube video request for URL: {request.url}")
-    logger.debug(f"Request details: {request.dict()}")
+def youtube_embed_url(video_id: str, start_seconds: int) -> str:
+    return f"https://www.youtube.com/embed/{video_id}?start={start_seconds}&autoplay=1"
 
-    try:
-        logger.debug("Initializing Google GenAI content generation")
-        response = client.models.generate_content(
-            model='models/gemini-2.5-flash-preview-04-17',
-            contents=types.Content(
-                parts=[
-                    types.Part(
-                        file_data=types.FileData(file_uri=str(request.url))
-                    ),
-                    types.Part(text="Help me summarize important details from this lecture video in detail and also provide examples of your own to make the student understand it better")
-                ]
-            )
-        )
-        
+
+def _analyze_video(video, prompt: str, model: str) -> VideoAnalysis:
+    """Summary and chapter index in one schema-constrained call; chapters come back sorted and bounded."""
+    response = genai_client.get().models.generate_content(
+        model=model,
+        contents=[video, prompt + CHAPTER_INSTRUCTIONS],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=VideoAnalysis,
+        ),
+    )
+    analysis = response.parsed if isinstance(response.parsed, VideoAnalysis) else None
+    if analysis is None:
         if not response.text:
             logger.error("Empty response received from GenAI model")
-            raise HTTPException(status_code=500, detail="No transcription text returned from model")
+            raise HTTPException(status_code=500, detail="No response text returned from model")
+        analysis = VideoAnalysis.model_validate_json(response.text)
+
+    chapters = sorted(
+        (chapter for chapter in analysis.chapters if chapter.start_seconds >= 0),
+        key=lambda chapter: chapter.start_seconds,
+    )
+    for chapter, following in zip(chapters, chapters[1:]):
+        chapter.end_seconds = following.start_seconds
+    analysis.chapters = chapters
+    logger.info(f"Video analysis returned {len(chapters)} chapters")
+    return analysis
+
+TRANSCRIPT_MODEL = "gemini-2.0-flash"
+TRANSCRIPT_WINDOW_SECONDS = int(os.getenv("VIDEO_TRANSCRIPT_WINDOW_SECONDS", "60"))
+TRANSCRIPT_PROMPT = (
+    "Transcribe the speech in this video. Return it as consecutive segments of a few "
+    "sentences each, giving every segment's start and end time as whole seconds from "
+    "the beginning of the video."
+)
+
+
+def transcript_windows(segments: List[TranscriptSegment], window_seconds: int = TRANSCRIPT_WINDOW_SECONDS) -> List[dict]:
+    """
+    Merge consecutive transcript segments into windows of about ``window_seconds``.
+
+    Windows have the chapter shape (start/end second, title, summary) so
+    they are indexed and searched next to the chapters.
+    """
+    windows = []
+    current: List[TranscriptSegment] = []
+    for segment in sorted(segments, key=lambda segment: segment.start_seconds):
+        if not segment.text.strip() or segment.start_seconds < 0:
+            continue
+        if current and segment.end_seconds - current[0].start_seconds > window_seconds:
+            windows.append(current)
+            current = []
+        current.append(segment)
+    if current:
+        windows.append(current)
+
+    return [
+        {
+            "start_seconds": window[0].start_seconds,
+            "end_seconds": max(segment.end_seconds for segment in window),
+            "title": f"Transcript {format_timestamp(window[0].start_seconds)}",
+            "summary": " ".join(segment.text.strip() for segment in window),
+        }
+        for window in windows
+    ]
+
+
+def _transcribe_video(video, model: str = TRANSCRIPT_MODEL) -> List[dict]:
+    """Timestamped transcript in one schema-constrained call, merged into search windows."""
+    response = genai_client.get().models.generate_content(
+        model=model,
+        contents=[video, TRANSCRIPT_PROMPT],
+        config=types.GenerateContentConfig(
+            response_mime_type="application/json",
+            response_schema=VideoTranscript,
+        ),
+    )
+    transcript = response.parsed if isinstance(response.parsed, VideoTranscript) else None
+    if transcript is None:
+        if not response.text:
+            raise RuntimeError("No transcript returned from model")
+        transcript = VideoTranscript.model_validate_json(response.text)
+    windows = transcript_windows(transcript.segments)
+    logger.info(f"Transcript of {len(transcript.segments)} segments merged into {len(windows)} windows")
+    return windows
+
+
+def _index_transcript(video, video_id: str, source_url: Optional[str] = None, user_id: Optional[str] = None) -> int:
+    return video_chapter_store.add(video_id, _transcribe_video(video), source_url, user_id, kind="transcript")
+
+YOUTUBE_SUMMARY_MODEL = "models/gemini-2.5-flash-preview-04-17"
+# Bump when the prompt or model changes so cached summaries from the old one are not served
+YOUTUBE_SUMMARY_PROMPT_VERSION = "v2"
+YOUTUBE_SUMMARY_PROMPT = (
+    "Help me summarize important details from this lecture video in detail "
+    "and also provide examples of your own to make the student understand it better"
+)
+
+_youtube_flights = SingleFlight()
+_transcript_flights = SingleFlight()
+
+
+async def _summarize_youtube(video_id: str, cache_key: str) -> dict:
+    # A request that lost the race to an earlier flight finds its result here
+    cached = await asyncio.to_thread(youtube_summary_cache.get, cache_key)
+    if cached is not None:
+        return cached
+
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    video_part = types.Part(file_data=types.FileData(file_uri=video_url))
+    analysis = await asyncio.to_thread(_analyze_video, video_part, YOUTUBE_SUMMARY_PROMPT, YOUTUBE_SUMMARY_MODEL)
+    logger.debug(f"Response text length: {len(analysis.summary)} characters")
+
+    chapter_video_id = f"youtube:{video_id}"
+    await asyncio.to_thread(
+        video_chapter_store.add,
+        chapter_video_id,
+        [chapter.model_dump() for chapter in analysis.chapters],
+        video_url,
+    )
+
+    result = YouTubeResponse(
+        response_text=analysis.summary,
+        message="YouTube video processed successfully",
+        timestamps=[
+            TimestampEmbed(
+                timestamp=format_timestamp(chapter.start_seconds),
+                start_seconds=chapter.start_seconds,
+                embed_url=youtube_embed_url(video_id, chapter.start_seconds),
+            )
+            for chapter in analysis.chapters
+        ],
+        chapters=analysis.chapters,
+        video_id=chapter_video_id,
+    ).model_dump()
+    await asyncio.to_thread(youtube_summary_cache.set, cache_key, result)
+    return result
 
-        logger.info(f"Successfully generated content for video: {request.url}")
-        logger.debug(f"Response text length: {len(response.text)} characters")
 
-        # Process timestamps
-        timestamps = extract_timestamps(response.text)
-        logger.info(f"Found {len(timestamps)} timestamps in response")
+async def _transcribe_youtube(video_id: str) -> int:
+    """Index the transcript of a YouTube video once; later requests reuse the stored windows."""
+    chapter_video_id = f"youtube:{video_id}"
+    if await asyncio.to_thread(video_chapter_store.exists, chapter_video_id, "transcript"):
+        return len(await asyncio.to_thread(video_chapter_store.chapters, chapter_video_id, "transcript"))
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    video_part = types.Part(file_data=types.FileData(file_uri=video_url))
+    return await asyncio.to_thread(_index_transcript, video_part, chapter_video_id, video_url)
 
-        timestamp_embeds = []
-        for ts in timestamps:
-            try:
-                embed_url, start_seconds = build_embed_url(str(request.url), ts)
-                timestamp_embeds.append(TimestampEmbed(
-                    timestamp=ts,
-                    start_seconds=start_seconds,
-                    embed_url=embed_url
-                ))
-                logger.debug(f"Processed timestamp {ts} -> {embed_url}")
-            except Exception as e:
-                logger.warning(f"Failed to process timestamp {ts}: {str(e)}")
+
+@video_router.post("/process-youtube", response_model=YouTubeResponse)
+async def process_youtube_video(request: YouTubeVideoRequest, user=Depends(get_current_user)):
+    """
+    Summarize a YouTube video, reusing the cached summary when one exists.
+
+    Results are cached per (video id, prompt version); concurrent requests
+    for the same video share a single generation. With ``transcript`` the
+    video's timestamped transcript is indexed too, once per video.
+    """
+    logger.info(f"Processing YouTube video request for URL: {request.url} from user {user.id}")
+
+    try:
+        video_id = youtube_video_id(str(request.url))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+    cache_key = f"{video_id}:{YOUTUBE_SUMMARY_PROMPT_VERSION}"
+
+    try:
+        result = await asyncio.to_thread(youtube_summary_cache.get, cache_key)
+        cached = result is not None
+        if cached:
+            logger.info(f"Serving cached summary for YouTube video {video_id}")
+        else:
+            result = await _youtube_flights.do(cache_key, lambda: _summarize_youtube(video_id, cache_key))
+
+        transcript_segments = 0
+        if request.transcript:
+            transcript_segments = await _transcript_flights.do(video_id, lambda: _transcribe_youtube(video_id))
 
         logger.success(f"Completed processing for YouTube video: {request.url}")
-        return YouTubeResponse(
-            response_text=response.text,
-            message="YouTube video processed successfully",
-            timestamps=timestamp_embeds
-        )
+        return YouTubeResponse(**{**result, "cached": cached, "transcript_segments": transcript_segments})
 
     except HTTPException:
         raise
@@ -160,67 +351,265 @@ async def process_youtube_video(request: YouTubeVideoRequest):
         logger.error(f"Error processing YouTube video: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Error processing YouTube video: {str(e)}")
 
-@video_router.post("/upload-video", response_model=VideoUploadResponse)
-async def upload_video(file: UploadFile = File(...)):
-    """Handle video file upload and processing"""
-    logger.info(f"Starting video upload processing for file: {file.filename}")
-    logger.debug(f"File details: {file.filename}, {file.content_type}")
+VIDEO_STAGES = ["spool", "upload", "processing", "generate", "index_chapters", "index_transcript"]
+VIDEO_MAX_CONCURRENT_JOBS = int(os.getenv("VIDEO_MAX_CONCURRENT_JOBS", "2"))
+VIDEO_MAX_QUEUED_JOBS = int(os.getenv("VIDEO_MAX_QUEUED_JOBS", "20"))
+VIDEO_PROCESSING_TIMEOUT = float(os.getenv("VIDEO_PROCESSING_TIMEOUT", "900"))
+VIDEO_SUMMARY_PROMPT = "Summarize this video. Then create a quiz with an answer key based on the information in this video."
+
+# One worker thread per concurrently running job; further jobs wait on the semaphore
+video_jobs = IngestionJobManager(max_workers=VIDEO_MAX_CONCURRENT_JOBS, store=r, prefix="video_job:")
+_video_slots = asyncio.Semaphore(VIDEO_MAX_CONCURRENT_JOBS)
+_video_jobs_in_flight = 0
+# Spooling runs inside the request, so it gets its own threads instead of queueing behind
+# job stages that can hold the job pool for minutes while a video is processed
+video_spool_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("VIDEO_SPOOL_WORKERS", "4")),
+    thread_name_prefix="video-spool",
+)
+
+
+def upload_video_id(user_id: str, sha256: str) -> str:
+    # The owner is part of the id: two users uploading the same file get separate indexes,
+    # so re-indexing one never replaces (or re-tags) the other's chapters
+    return f"upload:{user_id}:{sha256}"
+
+
+def _spool_to_disk(upload: ReceivedUpload) -> str:
+    """Copy the request's spooled upload to a private temp file that outlives the request."""
+    suffix = f".{upload.extension}" if upload.extension else ""
+    fd, temp_path = tempfile.mkstemp(prefix="video_", suffix=suffix, dir=os.getenv("VIDEO_TMP_DIR"))
+    try:
+        with os.fdopen(fd, "wb") as out:
+            upload.file.seek(0)
+            shutil.copyfileobj(upload.file, out, length=UPLOAD_CHUNK_SIZE)
+    except Exception:
+        _remove_temp_file(temp_path)
+        raise
+    return temp_path
 
-    # Validate file extension
-    allowed_ext = [".mp4", ".mov", ".avi", ".mkv"]
-    if not any(file.filename.lower().endswith(ext) for ext in allowed_ext):
-        logger.error(f"Invalid file extension for {file.filename}")
-        raise HTTPException(status_code=400, detail=f"Unsupported file format. Allowed: {allowed_ext}")
 
+def _remove_temp_file(temp_path: str) -> None:
     try:
-        # Save temporary file
-        temp_path = f"temp_{file.filename}"
-        logger.debug(f"Saving to temporary file: {temp_path}")
-        
-        contents = await file.read()
-        with open(temp_path, "wb") as f:
-            f.write(contents)
-        logger.info(f"Saved {len(contents)} bytes to temporary file")
-
-        # Upload to GenAI
-        logger.debug("Uploading file to Google GenAI")
-        myfile = client.files.upload(file=temp_path)
-        logger.info(f"File uploaded successfully, file ID: {myfile.id if hasattr(myfile, 'id') else 'N/A'}")
-
-        # Generate content
-        logger.debug("Generating video content summary")
-        response = client.models.generate_content(
-            model="gemini-2.0-flash",
-            contents=[
-                myfile,
-                "Summarize this video. Then create a quiz with an answer key based on the information in this video."
-            ]
-        )
-
-        # Clean up
         os.remove(temp_path)
         logger.debug(f"Removed temporary file: {temp_path}")
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Failed to remove temporary file {temp_path}: {e}")
+
+
+def _upload_video_file(temp_path: str, mime_type: str) -> types.File:
+    # The SDK sends files with the resumable upload protocol, in chunks
+    return genai_client.get().files.upload(file=temp_path, config={"mime_type": mime_type})
+
+
+def _wait_until_active(job: IngestionJob, video_file: types.File) -> types.File:
+    """Poll the Files API with exponential backoff until the video is ready to be used."""
+    client = genai_client.get()
+    delay = 1.0
+    started = time.monotonic()
+    while video_file.state == types.FileState.PROCESSING:
+        elapsed = time.monotonic() - started
+        if elapsed > VIDEO_PROCESSING_TIMEOUT:
+            raise TimeoutError(f"Video {video_file.name} still processing after {VIDEO_PROCESSING_TIMEOUT:.0f}s")
+        video_jobs.set_progress(job, "processing", elapsed / VIDEO_PROCESSING_TIMEOUT)
+        time.sleep(delay)
+        delay = min(delay * 1.5, 15.0)
+        video_file = client.files.get(name=video_file.name)
+
+    if video_file.state != types.FileState.ACTIVE:
+        raise RuntimeError(f"Video {video_file.name} processing ended in state {video_file.state}")
+    return video_file
 
-        if not response.text:
-            logger.error("Empty response from GenAI model")
-            raise HTTPException(status_code=500, detail="No response text returned from model")
 
-        logger.success(f"Successfully processed uploaded video: {file.filename}")
-        return VideoUploadResponse(
-            response_text=response.text,
-            message="Video file processed successfully"
+def _summarize_video(video_file: types.File) -> VideoAnalysis:
+    return _analyze_video(video_file, VIDEO_SUMMARY_PROMPT, "gemini-2.0-flash")
+
+
+async def _run_video_job(job: IngestionJob, temp_path: str, mime_type: str, transcript: bool = False) -> None:
+    global _video_jobs_in_flight
+    try:
+        async with _video_slots:
+            try:
+                video_file = await video_jobs.run_stage(job, "upload", _upload_video_file, temp_path, mime_type)
+            finally:
+                await asyncio.to_thread(_remove_temp_file, temp_path)
+            logger.info(f"Video job {job.job_id} uploaded {job.filename} as {video_file.name}")
+
+            video_file = await video_jobs.run_stage(job, "processing", _wait_until_active, job, video_file)
+            analysis = await video_jobs.run_stage(job, "generate", _summarize_video, video_file)
+
+            chapter_video_id = upload_video_id(job.user_id, job.document_id)
+            chapters = [chapter.model_dump() for chapter in analysis.chapters]
+            await video_jobs.run_stage(
+                job, "index_chapters", video_chapter_store.add, chapter_video_id, chapters, video_file.uri, job.user_id
+            )
+            transcript_segments = 0
+            if transcript:
+                transcript_segments = await video_jobs.run_stage(
+                    job, "index_transcript", _index_transcript, video_file, chapter_video_id, video_file.uri, job.user_id
+                )
+            else:
+                video_jobs.skip_stage(job, "index_transcript")
+            job.result = {
+                **VideoUploadResponse(response_text=analysis.summary, message="Video file processed successfully").model_dump(),
+                "video_id": chapter_video_id,
+                "chapters": chapters,
+                "transcript_segments": transcript_segments,
+                "file_name": video_file.name,
+                "file_uri": video_file.uri,
+            }
+    finally:
+        _video_jobs_in_flight -= 1
+
+
+@video_router.post("/upload-video", response_model=VideoJobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def upload_video(
+    file: UploadFile = File(...),
+    transcript: bool = False,
+    user=Depends(get_current_user)
+):
+    """
+    Accept a video for summarization as a background job.
+
+    The upload is copied to a private temp file, uploaded to GenAI, polled
+    until the Files API reports it ACTIVE and then summarized; poll
+    ``GET /video-qa/jobs/{job_id}`` for the result. With ``transcript`` the
+    job also indexes a timestamped transcript for ``/video-qa/ask``.
+    """
+    global _video_jobs_in_flight
+    logger.info(f"Starting video upload processing for file: {file.filename}")
+    logger.debug(f"File details: {file.filename}, {file.content_type}")
+
+    upload = await receive_upload(file, extensions=VIDEO_EXTENSIONS, max_size=app_settings.MAX_VIDEO_UPLOAD_SIZE)
+    logger.info(f"Received {upload.size} bytes for {upload.filename}")
+
+    if _video_jobs_in_flight >= VIDEO_MAX_CONCURRENT_JOBS + VIDEO_MAX_QUEUED_JOBS:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many videos are being processed, please retry shortly",
+            headers={"Retry-After": "30"},
         )
 
-    except HTTPException:
-        raise
+    job = video_jobs.create_job(
+        document_id=upload.sha256,
+        user_id=user.id,
+        stages=VIDEO_STAGES,
+        filename=upload.filename,
+    )
+    try:
+        temp_path = await video_jobs.run_stage(job, "spool", _spool_to_disk, upload, executor=video_spool_executor)
     except Exception as e:
-        logger.exception("Error processing uploaded video")
+        video_jobs.fail(job, e)
+        raise HTTPException(status_code=500, detail=f"Error storing uploaded video: {str(e)}")
+
+    _video_jobs_in_flight += 1
+    video_jobs.submit(job, lambda j: _run_video_job(j, temp_path, upload.content_type, transcript))
+
+    return VideoJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        message="Video accepted for processing."
+    )
+
+
+@video_router.get("/jobs/{job_id}", response_model=IngestionJob)
+async def get_video_job(job_id: str, user=Depends(get_current_user)):
+    job = await asyncio.to_thread(video_jobs.get_job, job_id)
+    if job is None or job.user_id != user.id:
+        raise HTTPException(status_code=404, detail="Video job not found")
+    return job
+
+
+
+def _chapter_owner_check(chapters: List[dict], user_id: str) -> None:
+    # Uploaded videos are private to their uploader; YouTube chapters are shared
+    if any(chapter.get("user_id") not in (None, user_id) for chapter in chapters):
+        raise HTTPException(status_code=404, detail="Video not found")
+
+
+@video_router.get("/videos/{video_id}/chapters", response_model=VideoChapterSearchResponse)
+async def get_video_chapters(
+    video_id: str,
+    q: Optional[str] = None,
+    k: int = 4,
+    user=Depends(get_current_user)
+):
+    """The chapter index of a processed video; with ``q``, only the ``k`` chapters most relevant to it."""
+    if q:
+        chapters = await asyncio.to_thread(video_chapter_store.search, video_id, q, k)
+    else:
+        chapters = await asyncio.to_thread(video_chapter_store.chapters, video_id)
+    if not chapters:
+        raise HTTPException(status_code=404, detail="No chapter index for this video")
+    _chapter_owner_check(chapters, user.id)
+    return VideoChapterSearchResponse(
+        video_id=video_id,
+        chapters=[VideoChapter(**chapter) for chapter in chapters],
+    )
+
+
+def segment_context(segments: List[dict]) -> List[str]:
+    return [
+        f"[{format_timestamp(segment['start_seconds'])}] {segment['title']}: {segment['summary']}"
+        for segment in segments
+    ]
+
+
+def segment_embed_url(video_id: str, start_seconds: int) -> Optional[str]:
+    # Only YouTube videos can be embedded; uploads live in the Files API
+    if video_id.startswith("youtube:"):
+        return youtube_embed_url(video_id.split(":", 1)[1], start_seconds)
+    return None
+
+
+@video_router.post("/ask", response_model=VideoQAResponse)
+async def ask_video(request: VideoQARequest, user=Depends(get_current_user)):
+    """
+    Answer a follow-up question about a processed video from its indexed segments.
+
+    The chapters and, when indexed, transcript windows closest to the
+    question are retrieved and given to the model with their timestamps;
+    the matching segments come back with embed URLs that start playback
+    at each of them.
+    """
+    logger.info(f"Received video QA request from user {user.id} for video {request.video_id}")
+    segments = await asyncio.to_thread(video_chapter_store.search, request.video_id, request.question, request.k)
+    if not segments:
+        raise HTTPException(status_code=404, detail="No segment index for this video")
+    _chapter_owner_check(segments, user.id)
 
-        raise HTTPException(status_code=500, detail=f"Error processing video file: {str(e)}")
-    finally:
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-                logger.debug(f"Cleaned up temporary file: {temp_path}")
-            except Exception as e:
-                logger.warning(f"Failed to remove temporary file: {str(e)}")
\ No newline at end of file
+    try:
+        contexts = segment_context(segments)
+        cached = await asyncio.to_thread(semantic_cache.lookup, request.video_id, request.question, contexts)
+        if cached is not None:
+            answer = cached["answer"]
+        else:
+            answer = await chain_registry.get("video_qa").ainvoke({
+                "question": request.question,
+                "context": "\n".join(contexts)
+            })
+            await asyncio.to_thread(semantic_cache.store, request.video_id, request.question, contexts, answer)
+
+        return VideoQAResponse(
+            answer=answer,
+            video_id=request.video_id,
+            segments=[
+                VideoSegmentMatch(
+                    kind=segment.get("kind", "chapter"),
+                    start_seconds=segment["start_seconds"],
+                    end_seconds=segment.get("end_seconds"),
+                    timestamp=format_timestamp(segment["start_seconds"]),
+                    title=segment["title"],
+                    summary=segment["summary"],
+                    score=segment["score"],
+                    embed_url=segment_embed_url(request.video_id, segment["start_seconds"]),
+                )
+                for segment in segments
+            ],
+            cached=cached is not None
+        )
+    except Exception as e:
+        logger.exception(f"Error answering question for video {request.video_id}: {e}")
+        raise HTTPException(status_code=500, detail=f"Error answering question: {str(e)}")
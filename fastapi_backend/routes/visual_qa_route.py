@@ -1,38 +1,40 @@
+import asyncio
 import os
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Body, Depends, Request
-from supabase import create_client, Client
+from fastapi import APIRouter, UploadFile, File, Form, HTTPException, status, Body, Depends, Request
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
-from typing import Optional
-import base64
+from typing import BinaryIO, Optional, Tuple
 import httpx
-import mimetypes
 from uuid import uuid4
 from io import BytesIO
 from datetime import datetime
 
 from langchain.schema import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_community.docstore import InMemoryDocstore
-from langchain.schema import StrOutputParser
-from langchain.prompts import ChatPromptTemplate
-from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_core.messages import HumanMessage
 from langchain_google_genai import ChatGoogleGenerativeAI
-import faiss
-from google import genai
+from google.genai import types
 from loguru import logger
 
+from auth.jwt_auth import get_current_user
+from config.settings import app_settings
+from databases.qdrant.image_store import ImageVectorStore
+from databases.redis.redis_cache import image_description_cache, semantic_cache
+from databases.supabase.supabase_client import supabase
+from Models.model_registry import MPNET, model_registry
+from services.audit_log import qa_audit_log
+from services.chain_registry import IMAGE_QA_PROMPT, chain_registry
+from services.genai_client import genai_client
+from services.image_hash import image_fingerprint
+from services.resources import resources
+from services.streaming import sse_event, sse_response
+from services.uploads import receive_upload
+
 image_router = APIRouter(
     prefix="/image-qa",
     tags=["Image Question Answering"]
 )
 
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_PRIVATE")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-logger.info(f"Supabase initialized with URL: {SUPABASE_URL}")
 
 # Pydantic models
 class ImageUploadResponse(BaseModel):
@@ -48,59 +50,83 @@ class ImageQAResponse(BaseModel):
     answer: str
     context: Optional[list[str]] = None
     qa_id: str
+    cached: bool = False
+
+class ImageBatchItem(BaseModel):
+    source: str
+    status: str
+    image_id: Optional[str] = None
+    description: Optional[str] = None
+    error: Optional[str] = None
+
+class ImageBatchUploadResponse(BaseModel):
+    images: list[ImageBatchItem]
+    processed: int
+    failed: int
 
 # Initialize models and stores
-model_name = "sentence-transformers/all-mpnet-base-v2"
-embeddings = HuggingFaceEmbeddings(
-    model_name=model_name,
-    model_kwargs={'device': 'cpu'},
-    encode_kwargs={'normalize_embeddings': False}
+embeddings = model_registry.embeddings(MPNET, normalize=False)
+
+llm = resources.register(
+    "image_chat_model",
+    lambda: ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        temperature=0.8,
+        verbose=True,
+        api_key=os.getenv("GOOGLE_API_KEY")
+    ),
 )
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.8,
-    verbose=True,
-    api_key=os.getenv("GOOGLE_API_KEY")
-)
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png"}
+IMAGE_BATCH_MAX_ITEMS = int(os.getenv("IMAGE_BATCH_MAX_ITEMS", "20"))
+IMAGE_DESCRIBE_CONCURRENCY = int(os.getenv("IMAGE_DESCRIBE_CONCURRENCY", "4"))
+
+image_vector_store = ImageVectorStore(embeddings)
+chain_registry.register(IMAGE_QA_PROMPT, llm.get)
+description_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
 
-image_stores = {}
+# Bounds concurrent image downloads and Gemini description calls across all batch uploads
+_describe_slots = asyncio.Semaphore(IMAGE_DESCRIBE_CONCURRENCY)
 
-def process_image(image_data: str, mime_type: str = "image/jpeg") -> str:
+def _image_part(client, image_file: BinaryIO, mime_type: str):
+    """Small images go inline with the request; larger ones through the Files API."""
+    image_file.seek(0, os.SEEK_END)
+    size = image_file.tell()
+    image_file.seek(0)
+    if size <= app_settings.IMAGE_INLINE_MAX_BYTES:
+        logger.debug(f"Sending {size} byte image inline")
+        return types.Part.from_bytes(data=image_file.read(), mime_type=mime_type)
+
+    # Stream the upload's file handle straight to the Files API, no temp copy
+    uploaded = client.files.upload(file=image_file, config={"mime_type": mime_type})
+    logger.info(f"Uploaded {size} byte image to Google GenAI")
+    return uploaded
+
+
+def process_image(image_file: BinaryIO, mime_type: str = "image/jpeg", user_id: Optional[str] = None) -> str:
     logger.info(f"Starting image processing with mime type: {mime_type}")
     try:
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        if not os.getenv("GOOGLE_API_KEY"):
             logger.error("GOOGLE_API_KEY not set for image processing")
             raise HTTPException(status_code=500, detail="GOOGLE_API_KEY not set")
-        
-        client = genai.Client(api_key=api_key)
-        image_bytes = base64.b64decode(image_data)
-        logger.info("Decoded image data")
-        
-        # Create a temporary file from the bytes
-        import tempfile
-        
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-            temp_file.write(image_bytes)
-            temp_file_path = temp_file.name
-        logger.info(f"Created temporary file: {temp_file_path}")
-        
-        # Upload the file directly as shown in the example
-        my_file = client.files.upload(file=temp_file_path)
-        logger.info(f"Uploaded file to Google GenAI: {temp_file_path}")
-        
-        # Generate content using the uploaded file
+
+        # Copies and verified near-duplicates of an image this user had described reuse its description
+        fingerprint = image_fingerprint(image_file) if user_id else None
+        if fingerprint is not None:
+            description = image_description_cache.lookup(user_id, fingerprint)
+            if description is not None:
+                logger.info(f"Reusing description of a previously described image (sha256 {fingerprint.sha256[:12]})")
+                return description
+
+        client = genai_client.get()
         response = client.models.generate_content(
             model="gemini-2.0-flash",
-            contents=[my_file, "Describe this image in detail."]
+            contents=[_image_part(client, image_file, mime_type), "Describe this image in detail."]
         )
         logger.info("Generated content description from image")
-        
-        # Clean up the temporary file
-        os.unlink(temp_file_path)
-        logger.info(f"Removed temporary file: {temp_file_path}")
-        
+
+        if fingerprint is not None and response.text:
+            image_description_cache.store(user_id, fingerprint, response.text)
         logger.info("Image processing completed successfully")
         return response.text
     except Exception as e:
@@ -110,17 +136,39 @@ def process_image(image_data: str, mime_type: str = "image/jpeg") -> str:
             detail=f"Gemini processing error: {str(e)}"
         )
 
-async def get_current_user(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Missing or invalid Authorization header")
-    jwt_token = auth_header.split(" ")[1]
-    user_response = supabase.auth.get_user(jwt_token)
-    print(user_response)
-    logger.info(f"The user response is : {user_response}")
-    if user_response.user is None:
-        raise HTTPException(status_code=401, detail="Invalid or expired token")
-    return user_response.user
+
+async def _download_image(client: httpx.AsyncClient, url: str) -> Tuple[BytesIO, str]:
+    """Stream an image from ``url`` into memory, giving up as soon as it passes the upload limit."""
+    too_large = HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail="Image at URL exceeds the upload limit"
+    )
+    buffer = BytesIO()
+    async with client.stream("GET", url) as response:
+        response.raise_for_status()
+        declared = response.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > app_settings.MAX_UPLOAD_SIZE:
+            raise too_large
+        async for chunk in response.aiter_bytes():
+            if buffer.tell() + len(chunk) > app_settings.MAX_UPLOAD_SIZE:
+                raise too_large
+            buffer.write(chunk)
+        mime_type = response.headers.get("content-type", "image/jpeg")
+    if ";" in mime_type:  # Handle cases like "image/jpeg;charset=UTF-8"
+        mime_type = mime_type.split(";")[0]
+    buffer.seek(0)
+    return buffer, mime_type
+
+
+def _image_record(image_id: str, user_id: str, description: str, message: Optional[str] = None) -> dict:
+    return {
+        "id": image_id,
+        "user_id": user_id,
+        "description": description,
+        "message": message or "Image processed successfully",
+        "uploaded_at": datetime.now().isoformat()
+    }
+
 
 @image_router.post("/upload", response_model=ImageUploadResponse)
 async def upload_image(
@@ -141,69 +189,37 @@ async def upload_image(
         )
 
     try:
-        image_data = None
+        image_file = None
         mime_type = "image/jpeg"
 
         if file:
-            contents = await file.read()
-            mime_type = file.content_type or mimetypes.guess_type(file.filename)[0] or "image/jpeg"
-            image_data = base64.b64encode(contents).decode("utf-8")
-            logger.info(f"Read and encoded image file: {file.filename}")
+            upload = await receive_upload(file, extensions=IMAGE_EXTENSIONS)
+            mime_type = upload.content_type
+            image_file = upload.file
+            logger.info(f"Received image file: {upload.filename} ({upload.size} bytes)")
         elif url:
             async with httpx.AsyncClient() as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                mime_type = response.headers.get("content-type", "image/jpeg")
-                if ";" in mime_type:  # Handle cases like "image/jpeg;charset=UTF-8"
-                    mime_type = mime_type.split(";")[0]
-                image_data = base64.b64encode(response.content).decode("utf-8")
-            logger.info(f"Downloaded and encoded image from URL: {url}")
+                image_file, mime_type = await _download_image(client, url)
+            logger.info(f"Downloaded image from URL: {url}")
 
         # Process image if description not provided
         if not description:
-            description = process_image(image_data, mime_type)
+            description = await asyncio.to_thread(process_image, image_file, mime_type, user.id)
             logger.info("Obtained image description from process_image")
 
         # Create vector store from description
         knowledge = [Document(page_content=description)]
-        text_splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=200)
-        chunks = text_splitter.split_documents(knowledge)
+        chunks = description_splitter.split_documents(knowledge)
         logger.info(f"Split image description into {len(chunks)} chunks")
 
-        dim = len(embeddings.embed_query("hello world"))
-        index = faiss.IndexFlatL2(dim)
-        logger.info("Initialized FAISS index")
-
-        vector_store = FAISS(
-            embedding_function=embeddings,
-            index=index,
-            docstore=InMemoryDocstore(),
-            index_to_docstore_id={},
-        )
-
-        ids = [str(uuid4()) for _ in chunks]
-        docs_with_ids = [
-            Document(page_content=chunk.page_content, metadata={"id": doc_id})
-            for chunk, doc_id in zip(chunks, ids)
-        ]
-
-        vector_store.add_documents(docs_with_ids)
-        logger.info(f"Added {len(docs_with_ids)} documents to vector store")
-
         image_id = str(uuid4())
-        image_stores[image_id] = vector_store
-        logger.info(f"Created image store with ID: {image_id}")
+        added = await asyncio.to_thread(image_vector_store.add, image_id, chunks, user.id)
+        logger.info(f"Added {added} documents to image vector store for ID: {image_id}")
 
         # Store in database
-        image_record = {
-            "id": image_id,
-            "user_id": user.id,
-            "description": description,
-            "message": message or "Image processed successfully",
-            "uploaded_at": datetime.now().isoformat()
-        }
+        image_record = _image_record(image_id, user.id, description, message)
         
-        result = supabase.table("images").insert(image_record).execute()
+        result = supabase.get().table("images").insert(image_record).execute()
         if hasattr(result, 'error') and result.error:
             raise HTTPException(status_code=500, detail=f"Database error: {result.error.message}")
         
@@ -226,78 +242,164 @@ async def upload_image(
             detail=f"Error processing image: {str(e)}"
         )
 
-@image_router.post("/ask", response_model=ImageQAResponse)
-async def ask_image(
-    request: Request,
-    qa_request: ImageQARequest = Body(...)
+@image_router.post("/upload-batch", response_model=ImageBatchUploadResponse)
+async def upload_image_batch(
+    files: list[UploadFile] = File(None),
+    urls: list[str] = Form(None),
+    user=Depends(get_current_user)
 ):
-    user = await get_current_user(request)
-    logger.info(f"Received image QA request from user {user.id} for image ID: {qa_request.image_id}")
-    
+    """
+    Describe a set of images (files and/or URLs) concurrently and index them together.
+
+    Descriptions run on the shared GenAI client, at most
+    IMAGE_DESCRIBE_CONCURRENCY at a time across requests; the successful
+    ones are embedded in one batch and stored with one insert. Every image
+    gets its own status, so one bad file does not fail the rest.
+    """
+    files = files or []
+    urls = urls or []
+    total = len(files) + len(urls)
+    logger.info(f"Received batch image upload from user {user.id}: {len(files)} files, {len(urls)} URLs")
+    if not total:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="At least one file or URL must be provided"
+        )
+    if total > IMAGE_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {IMAGE_BATCH_MAX_ITEMS} images can be uploaded per batch"
+        )
+
+    async def describe(source: str, load) -> ImageBatchItem:
+        try:
+            # Loading inside the slot keeps at most IMAGE_DESCRIBE_CONCURRENCY images in memory
+            async with _describe_slots:
+                image_file, mime_type = await load()
+                description = await asyncio.to_thread(process_image, image_file, mime_type, user.id)
+            return ImageBatchItem(source=source, status="processed", image_id=str(uuid4()), description=description)
+        except HTTPException as e:
+            return ImageBatchItem(source=source, status="failed", error=str(e.detail))
+        except Exception as e:
+            logger.warning(f"Failed to process batch image {source}: {e}")
+            return ImageBatchItem(source=source, status="failed", error=str(e))
+
+    async def load_file(file: UploadFile):
+        upload = await receive_upload(file, extensions=IMAGE_EXTENSIONS)
+        return upload.file, upload.content_type
+
+    async with httpx.AsyncClient() as client:
+        items = await asyncio.gather(
+            *(describe(file.filename or "upload", lambda file=file: load_file(file)) for file in files),
+            *(describe(url, lambda url=url: _download_image(client, url)) for url in urls),
+        )
+
+    processed = [item for item in items if item.status == "processed"]
+    if processed:
+        batch = [
+            (item.image_id, description_splitter.split_documents([Document(page_content=item.description)]), user.id)
+            for item in processed
+        ]
+        records = [_image_record(item.image_id, user.id, item.description) for item in processed]
+        try:
+            added = await asyncio.to_thread(image_vector_store.add_many, batch)
+            logger.info(f"Added {added} documents to image vector store for {len(processed)} images")
+            await asyncio.to_thread(lambda: supabase.get().table("images").insert(records).execute())
+        except Exception as e:
+            logger.exception(f"Error storing batch of {len(processed)} images: {e}")
+            for item in processed:
+                try:
+                    await asyncio.to_thread(image_vector_store.delete, item.image_id)
+                except Exception:
+                    logger.warning(f"Could not remove vectors of unsaved image {item.image_id}")
+                item.status, item.image_id, item.error = "failed", None, f"Error storing image: {str(e)}"
+
+    processed_count = sum(item.status == "processed" for item in items)
+    logger.info(f"Batch image upload finished: {processed_count} processed, {len(items) - processed_count} failed")
+    return ImageBatchUploadResponse(
+        images=items,
+        processed=processed_count,
+        failed=len(items) - processed_count
+    )
+
+
+async def _load_image_store(image_id: str):
     # Verify image exists in database
-    image_result = supabase.table("images").select("*").eq("id", qa_request.image_id).execute()
+    image_result = await asyncio.to_thread(
+        lambda: supabase.get().table("images").select("*").eq("id", image_id).execute()
+    )
     if not image_result.data or len(image_result.data) == 0:
-        logger.warning(f"Image ID not found in database: {qa_request.image_id}")
+        logger.warning(f"Image ID not found in database: {image_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Image ID not found"
         )
-    
-    if qa_request.image_id not in image_stores:
-        logger.warning(f"Image ID not found in memory stores: {qa_request.image_id}")
+
+    vector_store = await asyncio.to_thread(image_vector_store.get, image_id)
+    if vector_store is None:
+        logger.warning(f"Image ID not found in vector store: {image_id}")
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
-            detail="Image data not loaded in memory"
+            detail="Image data not found in vector store"
         )
+    return vector_store
+
+
+def _image_qa_record(qa_request: ImageQARequest, user_id: str, answer: str, context: str) -> dict:
+    return {
+        "id": str(uuid4()),
+        "user_id": user_id,
+        "image_id": qa_request.image_id,
+        "question": qa_request.question,
+        "answer": answer,
+        "context": [context],
+        "created_at": datetime.now().isoformat()
+    }
+
+
+async def _retrieve_image_context(vector_store, question: str) -> list:
+    # Search the per-image index directly; a retriever wrapper per request adds nothing
+    retrieved_docs = await vector_store.asimilarity_search(question, k=6)
+    logger.info(f"Retrieved {len(retrieved_docs)} documents for question")
+    return retrieved_docs
+
+
+@image_router.post("/ask", response_model=ImageQAResponse)
+async def ask_image(
+    request: Request,
+    qa_request: ImageQARequest = Body(...)
+):
+    user = await get_current_user(request)
+    logger.info(f"Received image QA request from user {user.id} for image ID: {qa_request.image_id}")
+
+    vector_store = await _load_image_store(qa_request.image_id)
 
     try:
-        vector_store = image_stores[qa_request.image_id]
-        retriever = vector_store.as_retriever(
-            search_type="similarity",
-            search_kwargs={"k": 6}
-        )
-        logger.info("Initialized vector store retriever")
-
-        retrieved_docs = retriever.invoke(qa_request.question)
-        context = "\n".join(doc.page_content for doc in retrieved_docs)
-        logger.info(f"Retrieved {len(retrieved_docs)} documents for question")
-
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are an expert image analyst. Use this context: {context}"),
-            ("human", "{question}")
-        ])
-        chain = prompt | llm | StrOutputParser()
-        logger.info("Created prompt and chain for LLM")
-
-        response = chain.invoke({
-            "question": qa_request.question,
-            "context": context
-        })
-        logger.info("Invoked LLM chain to get answer")
-
-        # Store QA in database
-        qa_id = str(uuid4())
-        qa_record = {
-            "id": qa_id,
-            "user_id": user.id,
-            "image_id": qa_request.image_id,
-            "question": qa_request.question,
-            "answer": response,
-            "context": [context],
-            "created_at": datetime.now().isoformat()
-        }
-        
-        result = supabase.table("image_qa").insert(qa_record).execute()
-        if hasattr(result, 'error') and result.error:
-            raise HTTPException(status_code=500, detail=f"Database error: {result.error.message}")
-        
-        logger.info(f"Stored QA record in database with ID: {qa_id}")
+        retrieved_docs = await _retrieve_image_context(vector_store, qa_request.question)
+        contexts = [doc.page_content for doc in retrieved_docs]
+        context = "\n".join(contexts)
+
+        cached = await asyncio.to_thread(semantic_cache.lookup, qa_request.image_id, qa_request.question, contexts)
+        if cached is not None:
+            response = cached["answer"]
+        else:
+            response = await chain_registry.get("image_qa").ainvoke({
+                "question": qa_request.question,
+                "context": context
+            })
+            logger.info("Invoked LLM chain to get answer")
+            await asyncio.to_thread(semantic_cache.store, qa_request.image_id, qa_request.question, contexts, response)
+
+        # Queue the QA record for the batched Supabase writer
+        qa_record = _image_qa_record(qa_request, user.id, response, context)
+        await qa_audit_log.submit("image_qa", qa_record)
 
         logger.info(f"Image QA request successful for image ID: {qa_request.image_id}")
         return ImageQAResponse(
             answer=response,
-            context=[doc.page_content for doc in retrieved_docs],
-            qa_id=qa_id
+            context=contexts,
+            qa_id=qa_record["id"],
+            cached=cached is not None
         )
 
     except Exception as e:
@@ -305,4 +407,47 @@ async def ask_image(
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error answering question: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+@image_router.post("/ask/stream")
+async def ask_image_stream(
+    request: Request,
+    qa_request: ImageQARequest = Body(...)
+):
+    """Server-Sent Events variant of /ask; the QA record is stored once the stream completes."""
+    user = await get_current_user(request)
+    logger.info(f"Received streaming image QA request from user {user.id} for image ID: {qa_request.image_id}")
+
+    vector_store = await _load_image_store(qa_request.image_id)
+    retrieved_docs = await _retrieve_image_context(vector_store, qa_request.question)
+    contexts = [doc.page_content for doc in retrieved_docs]
+    context = "\n".join(contexts)
+    cached = await asyncio.to_thread(semantic_cache.lookup, qa_request.image_id, qa_request.question, contexts)
+
+    async def event_stream():
+        yield sse_event({"type": "context", "context": contexts})
+        if cached is not None:
+            answer = cached["answer"]
+            yield sse_event({"type": "token", "content": answer})
+        else:
+            parts = []
+            try:
+                async for token in chain_registry.get("image_qa").astream({
+                    "question": qa_request.question,
+                    "context": context
+                }):
+                    parts.append(token)
+                    yield sse_event({"type": "token", "content": token})
+            except Exception as e:
+                logger.exception(f"Error streaming answer for image ID {qa_request.image_id}: {e}")
+                yield sse_event({"type": "error", "detail": f"Error answering question: {str(e)}"})
+                return
+            answer = "".join(parts)
+            await asyncio.to_thread(semantic_cache.store, qa_request.image_id, qa_request.question, contexts, answer)
+
+        qa_record = _image_qa_record(qa_request, user.id, answer, context)
+        await qa_audit_log.submit("image_qa", qa_record)
+        yield sse_event({"type": "done", "qa_id": qa_record["id"], "cached": cached is not None})
+
+    return sse_response(event_stream())
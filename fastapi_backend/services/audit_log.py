@@ -0,0 +1,229 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from databases.supabase.supabase_client import supabase
+
+_STOP = object()
+
+
+def _pid_alive(pid: int) -> bool:
+    if os.name == "nt":
+        # os.kill(pid, 0) terminates the process on Windows; treat other workers as alive
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBehindLogger:
+    """
+    Write-behind logger that batches Supabase inserts off the request path.
+
+    Records are queued in a bounded ``asyncio.Queue`` and flushed as bulk
+    inserts, grouped by table, whenever ``batch_size`` records are pending or
+    ``flush_interval`` seconds have passed. When the queue is full, ``submit``
+    waits up to ``put_timeout`` (backpressure) and then spills the record to
+    the local JSONL file instead of dropping it. Failed inserts are spilled
+    too, and the spill file is replayed on the next start and after every
+    fully successful flush. ``stop`` drains and flushes everything still queued.
+
+    Each process spills to its own file (the pid is added to ``spill_path``),
+    so uvicorn workers never append to or rename each other's spill. Replay
+    also claims the files of workers that are no longer running.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 2.0,
+        max_queue: int = 5000,
+        put_timeout: float = 0.5,
+        spill_path: str = ".cache/audit_spill.jsonl",
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.put_timeout = put_timeout
+        self.spill_base = Path(spill_path)
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._spill_lock = threading.Lock()
+        self.flushed = 0
+        self.spilled = 0
+        self.failed_flushes = 0
+
+    @property
+    def spill_path(self) -> Path:
+        # Resolved per call, so workers forked after import each get their own file
+        return self._spill_file(os.getpid())
+
+    def _spill_file(self, pid: int) -> Path:
+        return self.spill_base.with_name(f"{self.spill_base.stem}.{pid}{self.spill_base.suffix}")
+
+    def _claimable_spills(self) -> List[Path]:
+        """This process's spill file plus those left behind by workers that have exited."""
+        own_pid = os.getpid()
+        paths = []
+        for path in self.spill_base.parent.glob(f"{self.spill_base.stem}.*{self.spill_base.suffix}"):
+            pid = path.name[len(self.spill_base.stem) + 1:len(path.name) - len(self.spill_base.suffix)]
+            if pid.isdigit() and (int(pid) == own_pid or not _pid_alive(int(pid))):
+                paths.append(path)
+        return paths
+
+    def start(self) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._closing = False
+        self._task = asyncio.create_task(self._run())
+        logger.info("Audit write-behind logger started")
+
+    async def submit(self, table: str, record: Dict[str, Any]) -> None:
+        if self._task is None or self._task.done():
+            self.start()
+        try:
+            await asyncio.wait_for(self._queue.put((table, record)), timeout=self.put_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Audit queue full ({self.max_queue}), spilling {table} record to disk")
+            await asyncio.to_thread(self._spill, [(table, record)])
+
+    async def _run(self) -> None:
+        await asyncio.to_thread(self._replay_spill)
+        while not self._closing:
+            batch = await self._collect()
+            if not batch:
+                continue
+            try:
+                await self._flush(batch)
+            except Exception:
+                # Never let one bad batch stop the writer; the rows are lost only if spilling failed too
+                logger.exception(f"Audit flush of {len(batch)} rows failed")
+
+    async def _collect(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Wait for the first record, then gather more until the batch is full or the interval ends."""
+        batch = []
+        deadline = None
+        while len(batch) < self.batch_size:
+            if deadline is None:
+                item = await self._queue.get()
+                deadline = time.monotonic() + self.flush_interval
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                self._closing = True
+                break
+            batch.append(item)
+        return batch
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for table, record in batch:
+            by_table[table].append(record)
+
+        all_inserted = True
+        for table, rows in by_table.items():
+            try:
+                await asyncio.to_thread(self._insert, table, rows)
+                self.flushed += len(rows)
+                logger.debug(f"Flushed {len(rows)} audit rows into {table}")
+            except Exception as e:
+                all_inserted = False
+                self.failed_flushes += 1
+                logger.error(f"Bulk insert into {table} failed, spilling {len(rows)} rows: {e}")
+                await asyncio.to_thread(self._spill, [(table, row) for row in rows])
+        # Replaying right after a failure would only move the rows back into the spill
+        if all_inserted and self._claimable_spills():
+            await asyncio.to_thread(self._replay_spill)
+
+    @staticmethod
+    def _insert(table: str, rows: List[Dict[str, Any]]) -> None:
+        supabase.get().table(table).insert(rows).execute()
+
+    def _spill(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        with self._spill_lock:
+            self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.spill_path, "a", encoding="utf-8") as f:
+                for table, record in items:
+                    f.write(json.dumps({"table": table, "record": record}) + "\n")
+        self.spilled += len(items)
+
+    def _replay_spill(self) -> None:
+        """Re-insert spilled rows; anything that still fails stays in this process's spill file."""
+        replay_paths = []
+        with self._spill_lock:
+            for spill_path in self._claimable_spills():
+                replay_path = spill_path.with_name(f"{spill_path.name}.{os.getpid()}.replay")
+                try:
+                    # Atomic claim: when two workers race for an orphaned file only one rename succeeds
+                    os.replace(spill_path, replay_path)
+                except FileNotFoundError:
+                    continue
+                replay_paths.append(replay_path)
+        if not replay_paths:
+            return
+
+        by_table: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for replay_path in replay_paths:
+            with open(replay_path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        item = json.loads(line)
+                        by_table[item["table"]].append(item["record"])
+
+        for table, rows in by_table.items():
+            for start in range(0, len(rows), self.batch_size):
+                chunk = rows[start:start + self.batch_size]
+                try:
+                    self._insert(table, chunk)
+                    self.flushed += len(chunk)
+                except Exception as e:
+                    logger.warning(f"Replay of spilled {table} rows failed, keeping them on disk: {e}")
+                    self._spill([(table, row) for row in chunk])
+        for replay_path in replay_paths:
+            replay_path.unlink(missing_ok=True)
+        logger.info(f"Replayed spilled audit rows from {len(replay_paths)} files")
+
+    async def stop(self) -> None:
+        """Flush everything queued so far, then stop the background task."""
+        if self._task is None or self._task.done():
+            return
+        # The sentinel is queued behind every pending record, so all of them are flushed first
+        await self._queue.put(_STOP)
+        await self._task
+        logger.info(f"Audit write-behind logger stopped, {self.flushed} rows flushed in total")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "flushed": self.flushed,
+            "spilled": self.spilled,
+            "failed_flushes": self.failed_flushes,
+        }
+
+
+qa_audit_log = WriteBehindLogger(
+    batch_size=int(os.getenv("AUDIT_BATCH_SIZE", "50")),
+    flush_interval=float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0")),
+    max_queue=int(os.getenv("AUDIT_MAX_QUEUE", "5000")),
+    spill_path=os.getenv("AUDIT_SPILL_PATH", ".cache/audit_spill.jsonl"),
+)
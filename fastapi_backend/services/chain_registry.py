@@ -0,0 +1,117 @@
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain.schema import StrOutputParser
+from langchain_core.runnables import Runnable
+from loguru import logger
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    """A named, versioned prompt; ``messages`` is what ``ChatPromptTemplate.from_messages`` takes."""
+
+    name: str
+    version: str
+    messages: Tuple[Any, ...]
+
+    def template(self) -> ChatPromptTemplate:
+        return ChatPromptTemplate.from_messages(list(self.messages))
+
+
+DOCUMENT_QA_PROMPT = PromptSpec(
+    name="document_qa",
+    version="v1",
+    messages=(
+        ("system", "Answer the following question on the given context : {context} "
+                   "as well as from your base cut-off knowledge. "
+                   "While answering the queries, also provide URL links to the documentation wherever necessary."),
+        MessagesPlaceholder(variable_name="chat_history"),
+        ("human", "{question}"),
+    ),
+)
+
+IMAGE_QA_PROMPT = PromptSpec(
+    name="image_qa",
+    version="v1",
+    messages=(
+        ("system", "You are an expert image analyst. Use this context: {context}"),
+        ("human", "{question}"),
+    ),
+)
+
+VIDEO_QA_PROMPT = PromptSpec(
+    name="video_qa",
+    version="v1",
+    messages=(
+        ("system", "You answer questions about a lecture video using only these timestamped segments "
+                   "of it: {context} "
+                   "Cite the timestamps (m:ss) of the segments your answer relies on. If the segments "
+                   "do not cover the question, say so."),
+        ("human", "{question}"),
+    ),
+)
+
+
+class ChainRegistry:
+    """
+    Compiles each ``prompt | model | StrOutputParser()`` chain once and hands it out.
+
+    Chains are keyed by prompt name and version; several versions can be
+    registered side by side and ``default`` selects the one handlers get
+    when they do not ask for a version. Compilation is lazy and locked, and
+    ``compile_all`` does it eagerly at startup. Runnables are immutable, so
+    one instance is shared by all concurrent requests.
+    """
+
+    def __init__(self):
+        self._specs: Dict[Tuple[str, str], Tuple[PromptSpec, Callable[[], Any]]] = {}
+        self._defaults: Dict[str, str] = {}
+        self._chains: Dict[Tuple[str, str], Runnable] = {}
+        self._lock = threading.Lock()
+
+    def register(self, spec: PromptSpec, model_factory: Callable[[], Any], default: bool = True) -> None:
+        with self._lock:
+            key = (spec.name, spec.version)
+            self._specs[key] = (spec, model_factory)
+            self._chains.pop(key, None)
+            if default or spec.name not in self._defaults:
+                self._defaults[spec.name] = spec.version
+
+    def get(self, name: str, version: Optional[str] = None) -> Runnable:
+        key = (name, version or self._defaults.get(name, ""))
+        chain = self._chains.get(key)
+        if chain is not None:
+            return chain
+        if key not in self._specs:
+            raise KeyError(f"Chain '{name}' version '{key[1]}' is not registered")
+
+        with self._lock:
+            chain = self._chains.get(key)
+            if chain is None:
+                spec, model_factory = self._specs[key]
+                chain = spec.template() | model_factory() | StrOutputParser()
+                self._chains[key] = chain
+                logger.debug(f"Compiled chain {spec.name}@{spec.version}")
+            return chain
+
+    def compile_all(self) -> None:
+        for name, version in list(self._specs):
+            try:
+                self.get(name, version)
+            except Exception as e:
+                # The model client is unavailable; the chain compiles on first use instead
+                logger.warning(f"Could not compile chain {name}@{version} at startup: {e}")
+
+    def versions(self) -> Dict[str, Any]:
+        return {
+            name: {
+                "default": default,
+                "versions": sorted(version for spec_name, version in self._specs if spec_name == name),
+            }
+            for name, default in self._defaults.items()
+        }
+
+
+chain_registry = ChainRegistry()
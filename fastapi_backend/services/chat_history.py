@@ -0,0 +1,272 @@
+import asyncio
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from langchain.schema import StrOutputParser
+from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_neo4j import Neo4jGraph
+from loguru import logger
+
+from config.settings import app_settings
+from databases.neo4j.neo4j_client import graph
+from services.cache import BoundedTTLCache
+from services.genai_client import document_chat_model
+
+SUMMARY_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You maintain a running summary of a conversation between a user and an assistant "
+               "about one document. Fold the new exchanges into the existing summary. Keep facts, "
+               "decisions, open questions and any URLs the assistant gave; drop small talk. "
+               "Answer with the updated summary only, in at most {max_words} words."),
+    ("human", "Existing summary:\n{summary}\n\nNew exchanges:\n{turns}"),
+])
+
+_APPEND_TURN = """
+MERGE (s:ChatSession {id: $session_id})
+ON CREATE SET s.user_id = $user_id, s.document_id = $document_id,
+              s.turns = 0, s.summarized_turns = 0, s.summary = ''
+SET s.turns = s.turns + 1
+WITH s
+CREATE (s)-[:HAS_TURN]->(:ChatTurn {index: s.turns - 1, question: $question, answer: $answer, created_at: datetime()})
+RETURN s.turns AS turns, s.summarized_turns AS summarized_turns
+"""
+
+_LOAD_RECENT = """
+MATCH (s:ChatSession {id: $session_id})
+OPTIONAL MATCH (s)-[:HAS_TURN]->(t:ChatTurn)
+WHERE t.index >= s.turns - $window
+WITH s, t ORDER BY t.index
+RETURN s.summary AS summary, s.turns AS turns, s.summarized_turns AS summarized_turns,
+       collect([t.question, t.answer]) AS recent
+"""
+
+_LOAD_RANGE = """
+MATCH (s:ChatSession {id: $session_id})-[:HAS_TURN]->(t:ChatTurn)
+WHERE $start <= t.index < $end
+RETURN t.question AS question, t.answer AS answer ORDER BY t.index
+"""
+
+# Guarded on the previous watermark so two replicas never fold the same turns twice
+_SAVE_SUMMARY = """
+MATCH (s:ChatSession {id: $session_id})
+WHERE s.summarized_turns = $previous
+SET s.summary = $summary, s.summarized_turns = $summarized_turns
+RETURN s.summarized_turns AS summarized_turns
+"""
+
+
+def history_session_id(user_id: str, document_id: str) -> str:
+    return f"{user_id}:{document_id}"
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token is close enough for budgeting English prompts
+    return len(text) // 4 + 1
+
+
+@dataclass
+class SessionHistory:
+    summary: str = ""
+    turns: List[Tuple[str, str]] = field(default_factory=list)
+    total_turns: int = 0
+    summarized_turns: int = 0
+
+    def to_messages(self, max_tokens: Optional[int] = None) -> List[BaseMessage]:
+        """Summary (if any) followed by the newest turns that fit in ``max_tokens``."""
+        budget = max_tokens if max_tokens is not None else float("inf")
+        if self.summary:
+            budget -= estimate_tokens(self.summary)
+
+        kept: List[Tuple[str, str]] = []
+        for question, answer in reversed(self.turns):
+            cost = estimate_tokens(question) + estimate_tokens(answer)
+            if cost > budget and kept:
+                break
+            budget -= cost
+            kept.append((question, answer))
+
+        messages: List[BaseMessage] = []
+        if self.summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation: {self.summary}"))
+        for question, answer in reversed(kept):
+            messages.extend([HumanMessage(content=question), AIMessage(content=answer)])
+        return messages
+
+
+class ChatHistoryManager:
+    """
+    Bounded chat history in Neo4j, scoped per (user, document) session.
+
+    Each session is a ``ChatSession`` node with indexed ``ChatTurn`` nodes, a
+    turn counter and a rolling ``summary``. Only the last ``window`` turns
+    are read back, trimmed further to ``max_tokens``; turns that fall out of
+    the window are folded into the summary by the LLM in the background once
+    ``summary_batch`` of them have accumulated. Recent history is cached
+    in-process for ``cache_ttl`` seconds and updated on every append.
+    """
+
+    def __init__(
+        self,
+        graph_factory: Callable[[], Neo4jGraph],
+        llm_factory: Callable[[], Any],
+        window: int = 6,
+        max_tokens: int = 2000,
+        summary_batch: int = 6,
+        summary_max_words: int = 200,
+        cache_ttl: float = 300,
+        max_cached_sessions: int = 2048,
+    ):
+        self.graph_factory = graph_factory
+        self.llm_factory = llm_factory
+        self.window = window
+        self.max_tokens = max_tokens
+        self.summary_batch = summary_batch
+        self.summary_max_words = summary_max_words
+        self.cache: BoundedTTLCache[SessionHistory] = BoundedTTLCache(max_entries=max_cached_sessions, ttl=cache_ttl)
+        self._compacting: Set[str] = set()
+        self._compacting_lock = threading.Lock()
+        self._tasks: Set[asyncio.Task] = set()
+        self._schema_ready = False
+        self.compactions = 0
+
+    def _ensure_schema(self) -> None:
+        if self._schema_ready:
+            return
+        self.graph_factory().query(
+            "CREATE CONSTRAINT chat_session_id IF NOT EXISTS FOR (s:ChatSession) REQUIRE s.id IS UNIQUE"
+        )
+        self._schema_ready = True
+
+    def load(self, user_id: str, document_id: str) -> SessionHistory:
+        session_id = history_session_id(user_id, document_id)
+        history = self.cache.get(session_id)
+        if history is not None:
+            return history
+
+        self._ensure_schema()
+        rows = self.graph_factory().query(_LOAD_RECENT, {"session_id": session_id, "window": self.window})
+        if not rows:
+            history = SessionHistory()
+        else:
+            row = rows[0]
+            history = SessionHistory(
+                summary=row["summary"] or "",
+                turns=[(question, answer) for question, answer in row["recent"] if question is not None],
+                total_turns=row["turns"],
+                summarized_turns=row["summarized_turns"],
+            )
+        self.cache.set(session_id, history)
+        return history
+
+    def messages(self, user_id: str, document_id: str) -> List[BaseMessage]:
+        return self.load(user_id, document_id).to_messages(self.max_tokens)
+
+    def _append(self, user_id: str, document_id: str, question: str, answer: str) -> SessionHistory:
+        session_id = history_session_id(user_id, document_id)
+        self._ensure_schema()
+        row = self.graph_factory().query(_APPEND_TURN, {
+            "session_id": session_id,
+            "user_id": user_id,
+            "document_id": document_id,
+            "question": question,
+            "answer": answer,
+        })[0]
+
+        cached = self.cache.get(session_id)
+        if cached is not None and cached.total_turns == row["turns"] - 1:
+            history = SessionHistory(
+                summary=cached.summary,
+                turns=(cached.turns + [(question, answer)])[-self.window:],
+                total_turns=row["turns"],
+                summarized_turns=row["summarized_turns"],
+            )
+            self.cache.set(session_id, history)
+        else:
+            # Another replica appended in between; reload on next read
+            self.cache.pop(session_id)
+            history = SessionHistory(total_turns=row["turns"], summarized_turns=row["summarized_turns"])
+        return history
+
+    def _needs_compaction(self, history: SessionHistory) -> bool:
+        return history.total_turns - self.window - history.summarized_turns >= self.summary_batch
+
+    async def append(self, user_id: str, document_id: str, question: str, answer: str) -> None:
+        """Persist one turn; schedules summary compaction without blocking the caller."""
+        history = await asyncio.to_thread(self._append, user_id, document_id, question, answer)
+        if not self._needs_compaction(history):
+            return
+
+        session_id = history_session_id(user_id, document_id)
+        with self._compacting_lock:
+            if session_id in self._compacting:
+                return
+            self._compacting.add(session_id)
+        task = asyncio.create_task(self._compact(session_id, history.total_turns))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _compact(self, session_id: str, total_turns: int) -> None:
+        try:
+            await asyncio.to_thread(self.compact, session_id, total_turns)
+        except Exception as e:
+            logger.warning(f"History compaction failed for session {session_id}: {e}")
+        finally:
+            with self._compacting_lock:
+                self._compacting.discard(session_id)
+
+    def compact(self, session_id: str, total_turns: int) -> None:
+        """Fold every turn older than the window into the session summary."""
+        graph = self.graph_factory()
+        rows = graph.query(
+            "MATCH (s:ChatSession {id: $session_id}) RETURN s.summary AS summary, s.summarized_turns AS summarized_turns",
+            {"session_id": session_id},
+        )
+        if not rows:
+            return
+        previous = rows[0]["summarized_turns"]
+        end = total_turns - self.window
+        if end <= previous:
+            return
+
+        turns = graph.query(_LOAD_RANGE, {"session_id": session_id, "start": previous, "end": end})
+        transcript = "\n".join(f"User: {turn['question']}\nAssistant: {turn['answer']}" for turn in turns)
+        summary = (SUMMARY_PROMPT | self.llm_factory() | StrOutputParser()).invoke({
+            "summary": rows[0]["summary"] or "(none)",
+            "turns": transcript,
+            "max_words": self.summary_max_words,
+        })
+
+        saved = graph.query(_SAVE_SUMMARY, {
+            "session_id": session_id,
+            "previous": previous,
+            "summary": summary,
+            "summarized_turns": end,
+        })
+        if not saved:
+            logger.debug(f"History for session {session_id} was compacted elsewhere, discarding")
+            return
+
+        cached = self.cache.get(session_id)
+        if cached is not None:
+            self.cache.set(session_id, SessionHistory(
+                summary=summary,
+                turns=cached.turns,
+                total_turns=cached.total_turns,
+                summarized_turns=end,
+            ))
+        self.compactions += 1
+        logger.info(f"Compacted {end - previous} turns of session {session_id} into its summary")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"compactions": self.compactions, "pending": len(self._tasks), **self.cache.stats()}
+
+
+chat_history = ChatHistoryManager(
+    graph_factory=graph.get,
+    llm_factory=document_chat_model.get,
+    window=app_settings.HISTORY_WINDOW_TURNS,
+    max_tokens=app_settings.HISTORY_MAX_TOKENS,
+    summary_batch=app_settings.HISTORY_SUMMARY_BATCH,
+    cache_ttl=app_settings.HISTORY_CACHE_TTL,
+)
@@ -0,0 +1,72 @@
+import hashlib
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from langchain.schema import Document
+from pydantic import BaseModel
+
+# Fixed namespace so chunk ids are identical across processes and deployments
+CHUNK_NAMESPACE = uuid.UUID("6f4a1c52-8d0e-4b7a-9a3e-2f5c1b9d7e60")
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def assign_chunk_ids(document_id: str, docs: List[Document]) -> List[str]:
+    """
+    Deterministic point id per chunk: uuid5 over the document lineage and the chunk content.
+
+    Repeated identical chunks within one document are told apart by their
+    occurrence number, so every id in the result is unique. Each chunk's
+    hash is also written to ``metadata["chunk_hash"]``.
+    """
+    seen: Dict[str, int] = {}
+    ids = []
+    for doc in docs:
+        digest = chunk_hash(doc.page_content)
+        occurrence = seen.get(digest, 0)
+        seen[digest] = occurrence + 1
+        doc.metadata["chunk_hash"] = digest
+        ids.append(str(uuid.uuid5(CHUNK_NAMESPACE, f"{document_id}:{digest}:{occurrence}")))
+    return ids
+
+
+class ChunkDiff(BaseModel):
+    """What a (re-)ingestion changed, at chunk level."""
+
+    added: int = 0
+    removed: int = 0
+    moved: int = 0
+    unchanged: int = 0
+    revision: bool = False
+
+
+def diff_chunks(
+    existing_pages: Dict[str, Optional[int]],
+    ids: List[str],
+    docs: List[Document],
+) -> Tuple[ChunkDiff, List[int], List[str], Dict[str, int]]:
+    """
+    Compare the new chunk ids with the points already stored for the document.
+
+    ``existing_pages`` maps stored point ids to their page. Returns the
+    report, the positions of chunks that must be embedded, the ids to
+    delete, and unchanged chunks whose page number moved (id -> new page).
+    """
+    new_ids = set(ids)
+    to_embed = [i for i, point_id in enumerate(ids) if point_id not in existing_pages]
+    to_delete = [point_id for point_id in existing_pages if point_id not in new_ids]
+    moved = {
+        point_id: doc.metadata.get("page")
+        for point_id, doc in zip(ids, docs)
+        if point_id in existing_pages and existing_pages[point_id] != doc.metadata.get("page")
+    }
+    report = ChunkDiff(
+        added=len(to_embed),
+        removed=len(to_delete),
+        moved=len(moved),
+        unchanged=len(ids) - len(to_embed) - len(moved),
+        revision=bool(existing_pages),
+    )
+    return report, to_embed, to_delete, moved
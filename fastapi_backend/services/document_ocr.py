@@ -0,0 +1,143 @@
+import gzip
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import fitz
+from loguru import logger
+
+# Pages with fewer extractable characters than this are treated as scanned images
+MIN_TEXT_LAYER_CHARS = int(os.getenv("OCR_MIN_TEXT_LAYER_CHARS", "50"))
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+def ocr_cache_key(file_hash: str, include_images: bool) -> str:
+    return f"ocr:{file_hash}:{'images' if include_images else 'text'}"
+
+
+class FileOCRCache:
+    """Extracted pages stored as one gzipped JSON file per key under a local directory."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key.replace(':', '_')}.json.gz"
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def set(self, key: str, pages: List[dict]) -> None:
+        path = self._path(key)
+        tmp_path = path.with_suffix(".tmp")
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(pages, f)
+        os.replace(tmp_path, path)
+
+
+class RedisOCRCache:
+    """Extracted pages stored in Redis as gzipped JSON, with an optional TTL."""
+
+    def __init__(self, redis_url: str, ttl: Optional[int] = None):
+        import redis
+
+        self._client = redis.Redis.from_url(redis_url)
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        value = self._client.get(key)
+        return json.loads(gzip.decompress(value)) if value is not None else None
+
+    def set(self, key: str, pages: List[dict]) -> None:
+        self._client.set(key, gzip.compress(json.dumps(pages).encode("utf-8")), ex=self.ttl)
+
+
+def build_ocr_cache():
+    """
+    Build the OCR result cache configured through the environment.
+
+    OCR_CACHE_BACKEND selects ``file`` (default), ``redis`` or ``none``.
+    """
+    backend = os.getenv("OCR_CACHE_BACKEND", "file").lower()
+    if backend == "none":
+        return None
+    try:
+        if backend == "redis":
+            ttl = os.getenv("OCR_CACHE_TTL")
+            return RedisOCRCache(
+                os.getenv("REDIS_URL", "redis://localhost:6379"),
+                ttl=int(ttl) if ttl else None,
+            )
+        return FileOCRCache(os.getenv("OCR_CACHE_DIR", ".cache/ocr"))
+    except Exception as e:
+        logger.warning(f"OCR cache '{backend}' unavailable, every upload will be extracted again: {e}")
+        return None
+
+
+@lru_cache()
+def get_ocr_cache():
+    return build_ocr_cache()
+
+
+@dataclass
+class TextLayerScan:
+    """Result of reading a PDF's embedded text layer before OCR."""
+
+    page_count: int
+    text_pages: Dict[int, str] = field(default_factory=dict)
+    image_pages: List[int] = field(default_factory=list)
+    # Only the image-only pages, in order, ready to send to OCR
+    ocr_pdf: Optional[bytes] = None
+
+
+def scan_text_layer(content: bytes, min_chars: int = MIN_TEXT_LAYER_CHARS) -> TextLayerScan:
+    """Split pages into those with usable embedded text and those that need OCR."""
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        scan = TextLayerScan(page_count=pdf.page_count)
+        for page_no in range(pdf.page_count):
+            text = pdf[page_no].get_text()
+            if len(text.strip()) >= min_chars:
+                scan.text_pages[page_no] = text
+            else:
+                scan.image_pages.append(page_no)
+
+        if scan.image_pages and scan.text_pages:
+            with fitz.open() as ocr_pdf:
+                for page_no in scan.image_pages:
+                    ocr_pdf.insert_pdf(pdf, from_page=page_no, to_page=page_no)
+                scan.ocr_pdf = ocr_pdf.tobytes(garbage=3, deflate=True)
+        elif scan.image_pages:
+            # Fully scanned document: send the original bytes untouched
+            scan.ocr_pdf = content
+    return scan
+
+
+def merge_pages(scan: TextLayerScan, ocr_pages: List[dict]) -> List[dict]:
+    """
+    Combine text-layer pages with OCR output into one list in page order.
+
+    OCR ran on a PDF made of ``scan.image_pages`` only, so its page indices
+    are mapped back to the original page numbers.
+    """
+    pages = [
+        {"index": page_no, "markdown": text, "source": "text_layer"}
+        for page_no, text in scan.text_pages.items()
+    ]
+    for ocr_page in ocr_pages:
+        position = ocr_page.get("index", 0)
+        if position >= len(scan.image_pages):
+            continue
+        pages.append({**ocr_page, "index": scan.image_pages[position], "source": "ocr"})
+    return sorted(pages, key=lambda page: page["index"])
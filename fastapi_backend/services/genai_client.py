@@ -0,0 +1,27 @@
+import os
+
+from google import genai
+from langchain_google_genai import ChatGoogleGenerativeAI
+from loguru import logger
+
+from services.resources import resources
+
+
+def _create_genai_client() -> genai.Client:
+    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+    logger.success("Google GenAI client initialized successfully")
+    return client
+
+
+# One client (and its connection pool) shared by the image and video routes
+genai_client = resources.register("genai", _create_genai_client)
+
+# Answers document questions and folds chat history into summaries
+document_chat_model = resources.register(
+    "document_chat_model",
+    lambda: ChatGoogleGenerativeAI(
+        model="gemini-2.0-flash",
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=0.4
+    ),
+)
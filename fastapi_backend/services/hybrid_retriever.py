@@ -0,0 +1,82 @@
+import asyncio
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from langchain.schema import Document
+from langchain_qdrant import QdrantVectorStore
+from loguru import logger
+from qdrant_client.http.models import Filter
+
+from databases.qdrant.sparse_index import BM25SparseIndex
+
+
+def reciprocal_rank_fusion(
+    ranked_lists: Sequence[List[Document]],
+    weights: Sequence[float],
+    rrf_k: int = 60,
+) -> List[Tuple[Document, float]]:
+    """
+    Fuse ranked result lists: score(d) = sum_i w_i / (rrf_k + rank_i(d)).
+
+    Documents are identified by their Qdrant point id (``metadata["_id"]``),
+    falling back to their content.
+    """
+    scores: Dict[str, float] = {}
+    docs: Dict[str, Document] = {}
+    for results, weight in zip(ranked_lists, weights):
+        for rank, doc in enumerate(results, start=1):
+            key = str(doc.metadata.get("_id") or doc.page_content)
+            scores[key] = scores.get(key, 0.0) + weight / (rrf_k + rank)
+            docs.setdefault(key, doc)
+    fused = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    return [(docs[key], score) for key, score in fused]
+
+
+class HybridRetriever:
+    """
+    Dense (Qdrant HNSW) + sparse (BM25) retrieval fused with reciprocal rank fusion.
+
+    Both searches fetch ``candidates`` results each and run concurrently in
+    worker threads; the fused list is cut to ``k``.
+    """
+
+    def __init__(
+        self,
+        vector_store: QdrantVectorStore,
+        sparse_index: BM25SparseIndex,
+        k: int = 4,
+        candidates: int = 20,
+        dense_weight: float = 1.0,
+        sparse_weight: float = 1.0,
+        rrf_k: int = 60,
+    ):
+        self.vector_store = vector_store
+        self.sparse_index = sparse_index
+        self.k = k
+        self.candidates = candidates
+        self.dense_weight = dense_weight
+        self.sparse_weight = sparse_weight
+        self.rrf_k = rrf_k
+
+    def _dense(self, query: str, query_filter: Optional[Filter]) -> List[Document]:
+        return self.vector_store.similarity_search(query, k=self.candidates, filter=query_filter)
+
+    def _sparse(self, query: str, query_filter: Optional[Filter]) -> List[Document]:
+        return [doc for doc, _score in self.sparse_index.search(query, k=self.candidates, query_filter=query_filter)]
+
+    async def ainvoke(self, query: str, query_filter: Optional[Filter] = None, k: Optional[int] = None) -> List[Document]:
+        dense_task = asyncio.to_thread(self._dense, query, query_filter)
+        sparse_task = asyncio.to_thread(self._sparse, query, query_filter)
+        dense, sparse = await asyncio.gather(dense_task, sparse_task, return_exceptions=True)
+
+        ranked_lists, weights = [], []
+        for name, results, weight in (("dense", dense, self.dense_weight), ("sparse", sparse, self.sparse_weight)):
+            if isinstance(results, BaseException):
+                logger.warning(f"Hybrid retrieval: {name} search failed, continuing without it: {results}")
+                continue
+            ranked_lists.append(results)
+            weights.append(weight)
+        if not ranked_lists:
+            raise RuntimeError("Both dense and sparse retrieval failed")
+
+        fused = reciprocal_rank_fusion(ranked_lists, weights, rrf_k=self.rrf_k)
+        return [doc for doc, _score in fused[: k or self.k]]
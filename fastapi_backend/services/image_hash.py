@@ -0,0 +1,80 @@
+import hashlib
+from dataclasses import dataclass
+from typing import BinaryIO, List, Optional
+
+from loguru import logger
+from PIL import Image, UnidentifiedImageError
+
+HASH_SIZE = 8
+# The coarse hash finds candidates; the fine one tells apart slides that share a template
+FINE_HASH_SIZE = 16
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class ImageFingerprint:
+    """Exact and perceptual identity of an image, used to reuse earlier descriptions."""
+
+    sha256: str
+    dhash: Optional[str] = None
+    fine_dhash: Optional[str] = None
+
+
+def perceptual_hash(image_file: BinaryIO, hash_size: int = HASH_SIZE) -> Optional[str]:
+    """
+    Difference hash (dHash) of an image, ``hash_size ** 2`` bits as hex.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale
+    thumbnail and each bit records whether a pixel is brighter than its
+    right neighbour, so re-encodes and resizes of the same picture land a
+    few bits apart. Returns ``None`` for data Pillow cannot decode. The file
+    position is restored afterwards.
+    """
+    position = image_file.tell()
+    try:
+        with Image.open(image_file) as image:
+            image.draft("L", (hash_size * 4, hash_size * 4))
+            # One byte per pixel in mode "L", row by row
+            pixels = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS).tobytes()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, ValueError) as e:
+        logger.debug(f"Could not compute perceptual hash: {e}")
+        return None
+    finally:
+        image_file.seek(position)
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return f"{value:0{hash_size * hash_size // 4}x}"
+
+
+def image_fingerprint(image_file: BinaryIO) -> ImageFingerprint:
+    position = image_file.tell()
+    digest = hashlib.sha256()
+    image_file.seek(0)
+    while chunk := image_file.read(HASH_CHUNK_SIZE):
+        digest.update(chunk)
+    image_file.seek(position)
+    return ImageFingerprint(
+        sha256=digest.hexdigest(),
+        dhash=perceptual_hash(image_file),
+        fine_dhash=perceptual_hash(image_file, FINE_HASH_SIZE),
+    )
+
+
+def hamming_distance(a: str, b: str) -> int:
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def hash_bands(image_hash: str, bands: int) -> List[str]:
+    """
+    Split a hash into ``bands`` equal hex slices.
+
+    Two hashes within ``bands - 1`` bits of each other share at least one
+    slice exactly, so the slices serve as exact-match keys for near
+    duplicate lookup.
+    """
+    width = len(image_hash) // bands
+    return [image_hash[i * width:(i + 1) * width] for i in range(bands)]
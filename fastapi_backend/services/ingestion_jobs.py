@@ -0,0 +1,259 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from uuid import uuid4
+
+from loguru import logger
+from pydantic import BaseModel
+
+from databases.redis.redis_client import r
+
+
+class StageStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+
+class JobStage(BaseModel):
+    name: str
+    status: StageStatus = StageStatus.PENDING
+    progress: float = 0.0
+    started_at: Optional[str] = None
+    finished_at: Optional[str] = None
+    error: Optional[str] = None
+
+
+class IngestionJob(BaseModel):
+    job_id: str
+    document_id: str
+    user_id: str
+    filename: Optional[str] = None
+    status: StageStatus = StageStatus.PENDING
+    stages: List[JobStage] = []
+    page_count: Optional[int] = None
+    chunk_count: Optional[int] = None
+    # Chunk-level changes against the previous revision of the document
+    diff: Optional[Dict[str, Any]] = None
+    # Output of pipelines that produce something other than indexed chunks
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: str
+    updated_at: str
+
+    def stage(self, name: str) -> JobStage:
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f"Unknown stage '{name}' for job {self.job_id}")
+
+
+class IngestionJobManager:
+    """
+    Runs ingestion pipelines as background jobs.
+
+    Every blocking stage (network calls to OCR providers, embedding, vector
+    store writes) is executed in a dedicated thread pool so the event loop
+    keeps serving other requests. Finished jobs are retained up to
+    ``max_jobs`` entries for status polling, oldest first out; pending and
+    running jobs are never evicted.
+
+    A job runs in the process that accepted the upload, but its state is
+    written to Redis on every lifecycle change (kept ``ttl`` seconds), so a
+    status poll answered by another worker or replica still finds it. Without
+    Redis, polling only works against the process that owns the job.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        max_jobs: int = 1000,
+        store: Optional[Any] = None,
+        prefix: str = "ingestion_job:",
+        ttl: int = 86400,
+    ):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingestion")
+        self.max_jobs = max_jobs
+        self.store = store
+        self.prefix = prefix
+        self.ttl = ttl
+        self._publisher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ingestion-state")
+        self._jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._tasks: set = set()
+
+    def create_job(self, document_id: str, user_id: str, stages: List[str], filename: Optional[str] = None) -> IngestionJob:
+        now = datetime.now().isoformat()
+        job = IngestionJob(
+            job_id=str(uuid4()),
+            document_id=document_id,
+            user_id=user_id,
+            filename=filename,
+            stages=[JobStage(name=name) for name in stages],
+            created_at=now,
+            updated_at=now,
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished()
+        self._save(job)
+        logger.info(f"Created ingestion job {job.job_id} for document {document_id}")
+        return job
+
+    def _save(self, job: IngestionJob) -> None:
+        """Publish a snapshot of the job; writes go through one thread so they land in order, off the event loop."""
+        if self.store is None:
+            return
+        with self._lock:
+            payload = job.model_dump_json()
+        self._publisher.submit(self._write, job.job_id, payload)
+
+    def _write(self, job_id: str, payload: str) -> None:
+        try:
+            self.store.get().set(f"{self.prefix}{job_id}", payload, ex=self.ttl)
+        except Exception as e:
+            # Only costs visibility from other processes; the owning process still has the job
+            logger.warning(f"Could not persist ingestion job {job_id}: {e}")
+
+    def _load(self, job_id: str) -> Optional[IngestionJob]:
+        if self.store is None:
+            return None
+        try:
+            payload = self.store.get().get(f"{self.prefix}{job_id}")
+        except Exception as e:
+            logger.warning(f"Could not load ingestion job {job_id}: {e}")
+            return None
+        return IngestionJob.model_validate_json(payload) if payload else None
+
+    def _evict_finished(self) -> None:
+        """Drop the oldest finished jobs beyond ``max_jobs``; caller holds the lock."""
+        excess = len(self._jobs) - self.max_jobs
+        if excess <= 0:
+            return
+        finished = (StageStatus.COMPLETED, StageStatus.FAILED)
+        evicted = [job_id for job_id, job in self._jobs.items() if job.status in finished][:excess]
+        for job_id in evicted:
+            del self._jobs[job_id]
+            logger.debug(f"Evicted ingestion job {job_id} from job registry")
+
+    def get_job(self, job_id: str) -> Optional[IngestionJob]:
+        """
+        The job if this process runs it, otherwise its last state published
+        by the process that does. The fallback reads Redis, so call it off
+        the event loop.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        return job if job is not None else self._load(job_id)
+
+    def set_progress(self, job: IngestionJob, stage_name: str, progress: float) -> None:
+        """Thread-safe progress update, callable from inside a running stage."""
+        with self._lock:
+            job.stage(stage_name).progress = round(min(max(progress, 0.0), 1.0), 4)
+            job.updated_at = datetime.now().isoformat()
+        self._save(job)
+
+    async def run_stage(
+        self,
+        job: IngestionJob,
+        stage_name: str,
+        fn: Callable[..., Any],
+        *args,
+        executor: Optional[Executor] = None,
+        **kwargs,
+    ) -> Any:
+        """
+        Run a blocking stage function in the worker pool and record its lifecycle on the job.
+
+        ``executor`` overrides the pool, for stages that must not queue
+        behind long-running ones (e.g. work done inside the request handler).
+        """
+        stage = job.stage(stage_name)
+        with self._lock:
+            stage.status = StageStatus.RUNNING
+            stage.started_at = datetime.now().isoformat()
+            job.status = StageStatus.RUNNING
+            job.updated_at = stage.started_at
+        self._save(job)
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(executor or self.executor, partial(fn, *args, **kwargs))
+        except Exception as e:
+            with self._lock:
+                stage.status = StageStatus.FAILED
+                stage.error = str(e)
+                stage.finished_at = datetime.now().isoformat()
+                job.updated_at = stage.finished_at
+            self._save(job)
+            logger.error(f"Ingestion job {job.job_id} failed at stage '{stage_name}': {e}")
+            raise
+
+        with self._lock:
+            stage.status = StageStatus.COMPLETED
+            stage.progress = 1.0
+            stage.finished_at = datetime.now().isoformat()
+            job.updated_at = stage.finished_at
+        self._save(job)
+        logger.debug(f"Ingestion job {job.job_id} completed stage '{stage_name}'")
+        return result
+
+    def skip_stage(self, job: IngestionJob, stage_name: str) -> None:
+        """Mark a stage as not needed for this job, e.g. when its result was reused."""
+        with self._lock:
+            stage = job.stage(stage_name)
+            stage.status = StageStatus.SKIPPED
+            stage.finished_at = datetime.now().isoformat()
+            job.updated_at = stage.finished_at
+        self._save(job)
+        logger.debug(f"Ingestion job {job.job_id} skipped stage '{stage_name}'")
+
+    def submit(self, job: IngestionJob, pipeline: Callable[[IngestionJob], Awaitable[None]]) -> None:
+        """Schedule ``pipeline(job)`` on the running loop without awaiting it."""
+
+        async def _runner():
+            try:
+                await pipeline(job)
+            except Exception as e:
+                self.fail(job, e)
+                logger.exception(f"Ingestion job {job.job_id} failed")
+                return
+            with self._lock:
+                job.status = StageStatus.COMPLETED
+                job.updated_at = datetime.now().isoformat()
+            self._save(job)
+            logger.success(f"Ingestion job {job.job_id} completed")
+
+        task = asyncio.create_task(_runner())
+        # Keep a strong reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def fail(self, job: IngestionJob, error: Exception) -> None:
+        """Mark the whole job failed, e.g. when a stage run outside ``submit`` raised."""
+        with self._lock:
+            job.status = StageStatus.FAILED
+            job.error = str(error)
+            job.updated_at = datetime.now().isoformat()
+        self._save(job)
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            counts: Dict[str, int] = {}
+            for job in self._jobs.values():
+                counts[job.status.value] = counts.get(job.status.value, 0) + 1
+            return counts
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+        self._publisher.shutdown(wait=wait)
+
+
+ingestion_jobs = IngestionJobManager(store=r)
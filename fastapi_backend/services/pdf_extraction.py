@@ -0,0 +1,92 @@
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+import fitz
+from langchain.schema import Document
+from loguru import logger
+
+PageText = Tuple[int, str]
+
+
+def _extract_range(content: bytes, start: int, end: int) -> List[PageText]:
+    """Runs in a worker process: open the PDF from memory and extract pages [start, end)."""
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        return [(page_no, pdf[page_no].get_text()) for page_no in range(start, end)]
+
+
+def page_count(content: bytes) -> int:
+    with fitz.open(stream=content, filetype="pdf") as pdf:
+        return pdf.page_count
+
+
+class PDFExtractor:
+    """
+    Page-level PDF text extraction spread over a process pool.
+
+    The PDF is opened straight from the uploaded bytes (no temp file) and
+    its pages are split into contiguous ranges, one task per range, so
+    extraction is not serialized behind the GIL. ``aiter_pages`` yields each
+    range's pages as soon as its task finishes, which lets the caller split
+    and embed early pages while later ones are still being extracted. The
+    pool is shared across uploads and created on first use.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_task: int = 32):
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.pages_per_task = pages_per_task
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+                logger.info(f"Started PDF extraction pool with {self.max_workers} workers")
+            return self._pool
+
+    def _ranges(self, total_pages: int) -> List[Tuple[int, int]]:
+        # Every task pickles the whole PDF, so cap the task count at a few per worker
+        size = max(self.pages_per_task, -(-total_pages // (self.max_workers * 4)))
+        return [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+    async def aiter_pages(self, content: bytes, source: str) -> AsyncIterator[List[Document]]:
+        """Yield batches of page Documents (PyMuPDFLoader metadata) in completion order."""
+        loop = asyncio.get_running_loop()
+        total_pages = await asyncio.to_thread(page_count, content)
+        pool = self._get_pool()
+
+        tasks = [
+            loop.run_in_executor(pool, _extract_range, content, start, end)
+            for start, end in self._ranges(total_pages)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                pages = await next_done
+                yield [
+                    Document(
+                        page_content=text,
+                        metadata={"source": source, "page": page_no, "total_pages": total_pages},
+                    )
+                    for page_no, text in pages
+                    if text.strip()
+                ]
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+pdf_extractor = PDFExtractor(
+    max_workers=int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or None,
+    pages_per_task=int(os.getenv("PDF_EXTRACT_PAGES_PER_TASK", "32")),
+)
+atexit.register(pdf_extractor.shutdown)
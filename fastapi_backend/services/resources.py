@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from loguru import logger
+
+
+class Resource:
+    """
+    A backend client or model that is built on first use instead of at import.
+
+    ``factory`` builds the object, ``check`` (optional) probes it for
+    readiness and ``close`` (optional) releases it on shutdown. Non-critical
+    resources are reported by readiness but do not make the service unready.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        check: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None,
+        critical: bool = True,
+    ):
+        self.name = name
+        self.factory = factory
+        self.check = check
+        self.close = close
+        self.critical = critical
+        self.init_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self._value: Any = None
+        self._ready = False
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._ready
+
+    def get(self) -> Any:
+        if self._ready:
+            return self._value
+        with self._lock:
+            if self._ready:
+                return self._value
+            started = time.perf_counter()
+            try:
+                self._value = self.factory()
+            except Exception as e:
+                self.error = str(e)
+                logger.error(f"Failed to initialize resource '{self.name}': {e}")
+                raise
+            self.init_seconds = round(time.perf_counter() - started, 3)
+            self.error = None
+            self._ready = True
+            logger.info(f"Initialized resource '{self.name}' in {self.init_seconds}s")
+            return self._value
+
+    def probe(self) -> Dict[str, Any]:
+        """Build the resource if needed and run its check; never raises."""
+        started = time.perf_counter()
+        try:
+            value = self.get()
+            if self.check is not None:
+                self.check(value)
+            status = "ok"
+            error = None
+        except Exception as e:
+            status = "error"
+            error = str(e)
+        return {
+            "status": status,
+            "critical": self.critical,
+            "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+            "init_seconds": self.init_seconds,
+            "error": error,
+        }
+
+    def release(self) -> None:
+        if not self._ready or self.close is None:
+            return
+        try:
+            self.close(self._value)
+            logger.info(f"Closed resource '{self.name}'")
+        except Exception as e:
+            logger.warning(f"Failed to close resource '{self.name}': {e}")
+
+
+class ResourceManager:
+    """Registry of lazily built resources, warmed concurrently during the FastAPI lifespan."""
+
+    def __init__(self):
+        self._resources: Dict[str, Resource] = {}
+        self.metrics: Dict[str, Any] = {}
+
+    def register(
+        self,
+        name: str,
+        factory: Callable[[], Any],
+        check: Optional[Callable[[Any], Any]] = None,
+        close: Optional[Callable[[Any], Any]] = None,
+        critical: bool = True,
+    ) -> Resource:
+        if name in self._resources:
+            return self._resources[name]
+        resource = Resource(name, factory, check=check, close=close, critical=critical)
+        self._resources[name] = resource
+        return resource
+
+    def get(self, name: str) -> Resource:
+        return self._resources[name]
+
+    async def warmup(self, names: Optional[List[str]] = None, timeout: float = 60.0) -> Dict[str, bool]:
+        """
+        Build resources concurrently off the event loop.
+
+        Failures are logged and surfaced through readiness instead of
+        aborting startup, so the pod comes up even if a backend is down.
+        """
+        selected = [self._resources[name] for name in names] if names else list(self._resources.values())
+        started = time.perf_counter()
+
+        async def _init(resource: Resource) -> bool:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(resource.get), timeout=timeout)
+                return True
+            except Exception as e:
+                resource.error = resource.error or str(e) or type(e).__name__
+                return False
+
+        results = await asyncio.gather(*(_init(resource) for resource in selected))
+        self.metrics["warmup_seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(f"Resource warmup finished in {self.metrics['warmup_seconds']}s")
+        return {resource.name: ok for resource, ok in zip(selected, results)}
+
+    async def readiness(self, timeout: float = 5.0) -> Dict[str, Any]:
+        async def _probe(resource: Resource) -> Dict[str, Any]:
+            try:
+                return await asyncio.wait_for(asyncio.to_thread(resource.probe), timeout=timeout)
+            except asyncio.TimeoutError:
+                return {"status": "timeout", "critical": resource.critical, "error": f"probe exceeded {timeout}s"}
+
+        resources = list(self._resources.values())
+        results = await asyncio.gather(*(_probe(resource) for resource in resources))
+        checks = {resource.name: result for resource, result in zip(resources, results)}
+        ready = all(result["status"] == "ok" for result in checks.values() if result["critical"])
+        return {"ready": ready, "dependencies": checks, "metrics": self.metrics}
+
+    def shutdown(self) -> None:
+        for resource in self._resources.values():
+            resource.release()
+
+
+resources = ResourceManager()
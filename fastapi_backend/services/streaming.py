@@ -0,0 +1,20 @@
+import json
+from typing import Any, AsyncIterator, Dict
+
+from fastapi.responses import StreamingResponse
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    # Stop nginx / ingress from buffering the event stream
+    "X-Accel-Buffering": "no",
+}
+
+
+def sse_event(payload: Dict[str, Any]) -> str:
+    """Encode one Server-Sent Events message carrying a JSON payload."""
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    return StreamingResponse(events, media_type="text/event-stream", headers=SSE_HEADERS)
@@ -0,0 +1,134 @@
+import hashlib
+import mimetypes
+import os
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Optional
+
+from fastapi import HTTPException, UploadFile, status
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from config.settings import app_settings
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+def file_extension(filename: Optional[str]) -> str:
+    return os.path.splitext(filename or "")[1].lower().lstrip(".")
+
+
+@dataclass
+class ReceivedUpload:
+    """
+    A validated upload, still backed by the request's spooled temp file.
+
+    Starlette already spools multipart bodies to a ``SpooledTemporaryFile``
+    (memory for small files, disk beyond that); ``receive_upload`` streams
+    over it once in fixed-size chunks to hash and size-check it, then
+    rewinds it. Later stages read from ``file`` instead of holding their
+    own copy of the bytes.
+    """
+
+    filename: str
+    content_type: str
+    extension: str
+    size: int
+    sha256: str
+    file: BinaryIO
+
+    def read_bytes(self) -> bytes:
+        """One owned copy, for stages that outlive the request (the spooled file is closed with it)."""
+        self.file.seek(0)
+        data = self.file.read()
+        self.file.seek(0)
+        return data
+
+
+async def receive_upload(
+    file: UploadFile,
+    extensions: Optional[Iterable[str]] = None,
+    max_size: Optional[int] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> ReceivedUpload:
+    """
+    Validate an upload's extension and size while hashing it, without loading it into memory.
+
+    ``extensions`` narrows ``ALLOWED_EXTENSIONS`` to what the endpoint
+    accepts; ``max_size`` defaults to ``MAX_UPLOAD_SIZE``.
+    """
+    allowed = set(app_settings.ALLOWED_EXTENSIONS)
+    if extensions is not None:
+        allowed &= {ext.lower().lstrip(".") for ext in extensions}
+    max_size = max_size or app_settings.MAX_UPLOAD_SIZE
+
+    extension = file_extension(file.filename)
+    if extension not in allowed:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported file format '.{extension}'. Allowed: {sorted(allowed)}"
+        )
+
+    digest = hashlib.sha256()
+    size = 0
+    await file.seek(0)
+    while chunk := await file.read(chunk_size):
+        size += len(chunk)
+        if size > max_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File exceeds the {max_size // (1024 * 1024)} MB upload limit"
+            )
+        digest.update(chunk)
+    await file.seek(0)
+
+    content_type = file.content_type
+    if not content_type or content_type == "application/octet-stream":
+        content_type = mimetypes.guess_type(file.filename or "")[0] or "application/octet-stream"
+
+    logger.debug(f"Received upload {file.filename}: {size} bytes, sha256 {digest.hexdigest()[:12]}")
+    return ReceivedUpload(
+        filename=file.filename or f"upload.{extension}",
+        content_type=content_type,
+        extension=extension,
+        size=size,
+        sha256=digest.hexdigest(),
+        file=file.file,
+    )
+
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject requests whose declared Content-Length exceeds the limit for
+    their path before the multipart parser spools them. ``path_limits``
+    maps route prefixes to their own cap (the longest matching prefix
+    wins); every other path gets ``max_body_size``. Bodies without a length
+    are still capped per file by ``receive_upload``.
+    """
+
+    def __init__(self, app, max_body_size: int, path_limits: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.max_body_size = max_body_size
+        # Longest prefix first, so nested prefixes override their parents
+        self.path_limits = sorted((path_limits or {}).items(), key=lambda item: len(item[0]), reverse=True)
+
+    def limit_for(self, path: str) -> int:
+        for prefix, limit in self.path_limits:
+            prefix = prefix.rstrip("/")
+            if path == prefix or path.startswith(prefix + "/"):
+                return limit
+        return self.max_body_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            max_body_size = self.limit_for(scope.get("path", ""))
+            for name, value in scope.get("headers", []):
+                if name == b"content-length" and value.isdigit() and int(value) > max_body_size:
+                    response = JSONResponse(
+                        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                        content={"detail": "Request body too large"},
+                    )
+                    await response(scope, receive, send)
+                    return
+        await self.app(scope, receive, send)
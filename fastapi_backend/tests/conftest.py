@@ -0,0 +1,6 @@
+import os
+
+# Unit tests never reach real backends: no on-disk embedding cache, placeholder API keys
+os.environ.setdefault("EMBEDDING_CACHE_BACKEND", "none")
+os.environ.setdefault("OCR_CACHE_BACKEND", "none")
+os.environ.setdefault("GOOGLE_API_KEY", "test-key")
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+
+from services import audit_log
+from services.audit_log import WriteBehindLogger
+
+
+class FakeSupabase:
+    """Records bulk inserts; tables listed in ``failing`` raise instead."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.inserted = {}
+
+    def insert(self, table, rows):
+        if table in self.failing:
+            raise ConnectionError(f"{table} unavailable")
+        self.inserted.setdefault(table, []).extend(rows)
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeSupabase()
+    monkeypatch.setattr(WriteBehindLogger, "_insert", staticmethod(db.insert))
+    return db
+
+
+def spilled_rows(writer):
+    if not writer.spill_path.exists():
+        return []
+    return [json.loads(line) for line in writer.spill_path.read_text().splitlines()]
+
+
+def test_spill_path_is_per_process(tmp_path):
+    writer = WriteBehindLogger(spill_path=str(tmp_path / "audit_spill.jsonl"))
+    assert writer.spill_path.name == f"audit_spill.{audit_log.os.getpid()}.jsonl"
+
+
+def test_failed_table_is_spilled_and_other_tables_still_inserted(tmp_path, fake_db):
+    fake_db.failing = {"image_qa"}
+    writer = WriteBehindLogger(spill_path=str(tmp_path / "audit_spill.jsonl"))
+    batch = [("image_qa", {"id": "i1"}), ("document_qa", {"id": "d1"}), ("document_qa", {"id": "d2"})]
+
+    asyncio.run(writer._flush(batch))
+
+    assert fake_db.inserted == {"document_qa": [{"id": "d1"}, {"id": "d2"}]}
+    assert spilled_rows(writer) == [{"table": "image_qa", "record": {"id": "i1"}}]
+    assert writer.failed_flushes == 1
+    assert writer.flushed == 2
+
+
+def test_successful_flush_replays_spill(tmp_path, fake_db):
+    writer = WriteBehindLogger(spill_path=str(tmp_path / "audit_spill.jsonl"))
+    writer._spill([("document_qa", {"id": "old"})])
+
+    asyncio.run(writer._flush([("document_qa", {"id": "new"})]))
+
+    assert fake_db.inserted["document_qa"] == [{"id": "new"}, {"id": "old"}]
+    assert not writer.spill_path.exists()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_replay_keeps_rows_that_still_fail(tmp_path, fake_db):
+    fake_db.failing = {"image_qa"}
+    writer = WriteBehindLogger(spill_path=str(tmp_path / "audit_spill.jsonl"))
+    writer._spill([("image_qa", {"id": "i1"}), ("document_qa", {"id": "d1"})])
+
+    writer._replay_spill()
+
+    assert fake_db.inserted == {"document_qa": [{"id": "d1"}]}
+    assert spilled_rows(writer) == [{"table": "image_qa", "record": {"id": "i1"}}]
+
+
+def test_replay_claims_spills_of_exited_workers_only(tmp_path, fake_db, monkeypatch):
+    monkeypatch.setattr(audit_log, "_pid_alive", lambda pid: pid != 111)
+    writer = WriteBehindLogger(spill_path=str(tmp_path / "audit_spill.jsonl"))
+    (tmp_path / "audit_spill.111.jsonl").write_text(json.dumps({"table": "t", "record": {"id": "dead"}}) + "\n")
+    (tmp_path / "audit_spill.222.jsonl").write_text(json.dumps({"table": "t", "record": {"id": "alive"}}) + "\n")
+
+    writer._replay_spill()
+
+    assert fake_db.inserted == {"t": [{"id": "dead"}]}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["audit_spill.222.jsonl"]
+
+
+def test_stop_flushes_everything_queued(tmp_path, fake_db):
+    async def scenario():
+        writer = WriteBehindLogger(batch_size=2, flush_interval=10, spill_path=str(tmp_path / "audit_spill.jsonl"))
+        for i in range(5):
+            await writer.submit("document_qa", {"id": i})
+        await writer.stop()
+        return writer
+
+    writer = asyncio.run(scenario())
+    assert [row["id"] for row in fake_db.inserted["document_qa"]] == [0, 1, 2, 3, 4]
+    assert writer.stats()["queued"] == 0
@@ -0,0 +1,78 @@
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from services.chain_registry import DOCUMENT_QA_PROMPT, ChainRegistry, PromptSpec
+
+INPUTS = {"question": "What is mmap?", "context": "mmap maps files into memory.", "chat_history": []}
+
+
+class CountingModelFactory:
+    def __init__(self, response="ok"):
+        self.response = response
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return FakeListChatModel(responses=[self.response])
+
+
+def test_each_chain_is_compiled_once_and_shared():
+    factory = CountingModelFactory()
+    registry = ChainRegistry()
+    registry.register(DOCUMENT_QA_PROMPT, factory)
+
+    first = registry.get("document_qa")
+    second = registry.get("document_qa", DOCUMENT_QA_PROMPT.version)
+
+    assert first is second
+    assert factory.calls == 1
+    assert first.invoke(INPUTS) == "ok"
+
+
+def test_version_bump_serves_the_new_chain_and_keeps_the_old_one():
+    old_factory, new_factory = CountingModelFactory("v1"), CountingModelFactory("v2")
+    registry = ChainRegistry()
+    registry.register(DOCUMENT_QA_PROMPT, old_factory)
+    old_chain = registry.get("document_qa")
+
+    bumped = PromptSpec(name="document_qa", version="v2", messages=DOCUMENT_QA_PROMPT.messages)
+    registry.register(bumped, new_factory)
+
+    assert registry.get("document_qa").invoke(INPUTS) == "v2"
+    assert registry.get("document_qa", "v1") is old_chain
+    assert registry.versions() == {"document_qa": {"default": "v2", "versions": ["v1", "v2"]}}
+    assert (old_factory.calls, new_factory.calls) == (1, 1)
+
+
+def test_non_default_registration_keeps_the_current_default():
+    registry = ChainRegistry()
+    registry.register(DOCUMENT_QA_PROMPT, CountingModelFactory("v1"))
+    candidate = PromptSpec(name="document_qa", version="v2-candidate", messages=DOCUMENT_QA_PROMPT.messages)
+    registry.register(candidate, CountingModelFactory("candidate"), default=False)
+
+    assert registry.get("document_qa").invoke(INPUTS) == "v1"
+    assert registry.get("document_qa", "v2-candidate").invoke(INPUTS) == "candidate"
+
+
+def test_reregistering_a_version_recompiles_it():
+    first, second = CountingModelFactory("first"), CountingModelFactory("second")
+    registry = ChainRegistry()
+    registry.register(DOCUMENT_QA_PROMPT, first)
+    registry.get("document_qa")
+    registry.register(DOCUMENT_QA_PROMPT, second)
+
+    assert registry.get("document_qa").invoke(INPUTS) == "second"
+
+
+def test_unknown_chain_raises_key_error():
+    with pytest.raises(KeyError, match="missing"):
+        ChainRegistry().get("missing")
+
+
+def test_compile_all_tolerates_unavailable_models():
+    def broken_factory():
+        raise RuntimeError("no API key")
+
+    registry = ChainRegistry()
+    registry.register(DOCUMENT_QA_PROMPT, broken_factory)
+    registry.compile_all()
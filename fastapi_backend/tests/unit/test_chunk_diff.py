@@ -0,0 +1,92 @@
+import uuid
+
+from langchain.schema import Document
+
+from services.chunk_diff import CHUNK_NAMESPACE, assign_chunk_ids, chunk_hash, diff_chunks
+
+
+def chunks(*pages_and_texts):
+    return [Document(page_content=text, metadata={"page": page}) for page, text in pages_and_texts]
+
+
+def ingest(document_id, docs):
+    """Ids of a first upload and the page map the vector store would hold for them."""
+    ids = assign_chunk_ids(document_id, docs)
+    return ids, {point_id: doc.metadata["page"] for point_id, doc in zip(ids, docs)}
+
+
+def test_ids_are_deterministic_uuid5():
+    docs = chunks((1, "intro"), (2, "body"))
+    ids = assign_chunk_ids("doc-1", docs)
+
+    assert ids == assign_chunk_ids("doc-1", chunks((1, "intro"), (2, "body")))
+    # Pinned: changing the namespace or key format would orphan every indexed vector
+    assert ids[0] == str(uuid.uuid5(CHUNK_NAMESPACE, f"doc-1:{chunk_hash('intro')}:0"))
+    assert uuid.UUID(ids[0]).version == 5
+    assert docs[0].metadata["chunk_hash"] == chunk_hash("intro")
+
+
+def test_ids_depend_on_document_and_occurrence():
+    same_text = chunks((1, "repeated"), (2, "repeated"))
+    ids = assign_chunk_ids("doc-1", same_text)
+
+    assert len(set(ids)) == 2
+    assert set(ids).isdisjoint(assign_chunk_ids("doc-2", chunks((1, "repeated"), (2, "repeated"))))
+
+
+def test_first_upload_embeds_everything():
+    docs = chunks((1, "a"), (1, "b"))
+    ids = assign_chunk_ids("doc-1", docs)
+
+    report, to_embed, to_delete, moved = diff_chunks({}, ids, docs)
+
+    assert (report.added, report.removed, report.unchanged, report.revision) == (2, 0, 0, False)
+    assert to_embed == [0, 1]
+    assert to_delete == [] and moved == {}
+
+
+def test_unchanged_reupload_touches_nothing():
+    _, existing = ingest("doc-1", chunks((1, "a"), (2, "b")))
+    docs = chunks((1, "a"), (2, "b"))
+
+    report, to_embed, to_delete, moved = diff_chunks(existing, assign_chunk_ids("doc-1", docs), docs)
+
+    assert (report.added, report.removed, report.moved, report.unchanged, report.revision) == (0, 0, 0, 2, True)
+    assert to_embed == [] and to_delete == [] and moved == {}
+
+
+def test_edited_chunk_is_replaced():
+    old_ids, existing = ingest("doc-1", chunks((1, "a"), (2, "b"), (3, "c")))
+    docs = chunks((1, "a"), (2, "b, revised"), (3, "c"))
+
+    report, to_embed, to_delete, moved = diff_chunks(existing, assign_chunk_ids("doc-1", docs), docs)
+
+    assert to_embed == [1]
+    assert to_delete == [old_ids[1]]
+    assert moved == {}
+    assert (report.added, report.removed, report.unchanged) == (1, 1, 2)
+
+
+def test_reordered_chunks_keep_their_vectors_and_move_pages():
+    old_ids, existing = ingest("doc-1", chunks((1, "a"), (2, "b")))
+    docs = chunks((1, "b"), (2, "a"))
+    ids = assign_chunk_ids("doc-1", docs)
+
+    report, to_embed, to_delete, moved = diff_chunks(existing, ids, docs)
+
+    assert set(ids) == set(old_ids)
+    assert to_embed == [] and to_delete == []
+    assert moved == {old_ids[1]: 1, old_ids[0]: 2}
+    assert (report.moved, report.unchanged) == (2, 0)
+
+
+def test_removed_chunks_are_pruned():
+    old_ids, existing = ingest("doc-1", chunks((1, "a"), (2, "b"), (2, "b")))
+    docs = chunks((1, "a"), (2, "b"))
+
+    report, to_embed, to_delete, moved = diff_chunks(existing, assign_chunk_ids("doc-1", docs), docs)
+
+    # The second copy of a duplicated chunk is the one that disappears
+    assert to_delete == [old_ids[2]]
+    assert to_embed == [] and moved == {}
+    assert (report.removed, report.unchanged) == (1, 2)
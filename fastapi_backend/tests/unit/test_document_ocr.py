@@ -0,0 +1,79 @@
+import fitz
+
+from services.document_ocr import FileOCRCache, TextLayerScan, content_hash, merge_pages, ocr_cache_key, scan_text_layer
+
+TEXT = "This page carries an embedded text layer long enough to skip OCR entirely."
+
+
+def make_pdf(*pages: str) -> bytes:
+    """One page per entry; an empty string stands in for a scanned page without a text layer."""
+    with fitz.open() as pdf:
+        for text in pages:
+            page = pdf.new_page()
+            if text:
+                page.insert_text((72, 72), text)
+        return pdf.tobytes()
+
+
+def test_mixed_document_sends_only_scanned_pages_to_ocr():
+    scan = scan_text_layer(make_pdf(f"one {TEXT}", "", f"three {TEXT}", "short", ""))
+
+    assert scan.page_count == 5
+    assert sorted(scan.text_pages) == [0, 2]
+    assert scan.text_pages[2].startswith("three")
+    # A sliver of text below the threshold still counts as a scanned page
+    assert scan.image_pages == [1, 3, 4]
+    with fitz.open(stream=scan.ocr_pdf, filetype="pdf") as ocr_pdf:
+        assert ocr_pdf.page_count == 3
+        assert ocr_pdf[1].get_text().strip() == "short"
+
+
+def test_text_only_document_needs_no_ocr():
+    scan = scan_text_layer(make_pdf(TEXT, TEXT))
+    assert scan.image_pages == []
+    assert scan.ocr_pdf is None
+
+
+def test_fully_scanned_document_is_sent_untouched():
+    content = make_pdf("", "")
+    scan = scan_text_layer(content)
+    assert scan.text_pages == {}
+    assert scan.ocr_pdf is content
+
+
+def test_merge_maps_ocr_pages_back_to_page_order():
+    scan = TextLayerScan(page_count=5, text_pages={0: "first", 2: "third"}, image_pages=[1, 3, 4])
+    ocr_pages = [
+        {"index": 2, "markdown": "fifth"},
+        {"index": 0, "markdown": "second"},
+        {"index": 1, "markdown": "fourth"},
+        # OCR output for a page that was never sent is dropped
+        {"index": 3, "markdown": "bogus"},
+    ]
+
+    merged = merge_pages(scan, ocr_pages)
+
+    assert [(page["index"], page["markdown"], page["source"]) for page in merged] == [
+        (0, "first", "text_layer"),
+        (1, "second", "ocr"),
+        (2, "third", "text_layer"),
+        (3, "fourth", "ocr"),
+        (4, "fifth", "ocr"),
+    ]
+
+
+def test_ocr_cache_key_separates_image_extraction():
+    file_hash = content_hash(b"%PDF-1.7 example")
+    assert file_hash == content_hash(b"%PDF-1.7 example")
+    assert ocr_cache_key(file_hash, include_images=False) == f"ocr:{file_hash}:text"
+    assert ocr_cache_key(file_hash, include_images=True) == f"ocr:{file_hash}:images"
+
+
+def test_file_cache_round_trip(tmp_path):
+    cache = FileOCRCache(str(tmp_path))
+    key = ocr_cache_key(content_hash(b"pdf"), include_images=False)
+    pages = [{"index": 0, "markdown": "first"}]
+
+    assert cache.get(key) is None
+    cache.set(key, pages)
+    assert cache.get(key) == pages
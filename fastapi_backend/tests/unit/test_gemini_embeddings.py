@@ -0,0 +1,102 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from tenacity import wait_none
+
+from Models.Embedding_model import text_embedding
+from Models.Embedding_model.text_embedding import GeminiEmbeddings
+
+
+def vector_for(text):
+    return [float(len(text)), float(sum(map(ord, text)) % 997)]
+
+
+class FakeGenAIClient:
+    """Stands in for ``google.generativeai``: deterministic vectors, optional failures and delays."""
+
+    def __init__(self, failures=0, delay_for=None):
+        self.failures = failures
+        self.delay_for = delay_for or (lambda batch: 0)
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def embed_content(self, model, content, task_type):
+        with self._lock:
+            self.calls.append((task_type, content))
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError("transient")
+        time.sleep(self.delay_for(content))
+        if isinstance(content, str):
+            return {"embedding": vector_for(content)}
+        return {"embedding": [vector_for(text) for text in content]}
+
+
+@pytest.fixture(autouse=True)
+def no_retry_wait(monkeypatch):
+    monkeypatch.setattr(text_embedding, "wait_exponential", lambda **kwargs: wait_none())
+
+
+def test_batches_are_bounded_by_count_and_characters():
+    embedder = GeminiEmbeddings(client=FakeGenAIClient(), batch_size=3, max_batch_chars=10)
+    batches = embedder._make_batches(["aaaa", "bbbb", "cc", "d", "e", "f", "gggggggggggg"])
+    assert batches == [["aaaa", "bbbb", "cc"], ["d", "e", "f"], ["gggggggggggg"]]
+
+
+def test_embed_documents_splits_into_batches():
+    client = FakeGenAIClient()
+    embedder = GeminiEmbeddings(client=client, batch_size=2)
+    texts = [f"text {i}" for i in range(5)]
+
+    vectors = embedder.embed_documents(texts)
+
+    assert vectors == [vector_for(text) for text in texts]
+    assert sorted(len(content) for _, content in client.calls) == [1, 2, 2]
+    assert all(task_type == "retrieval_document" for task_type, _ in client.calls)
+
+
+def test_results_keep_input_order_when_batches_finish_out_of_order():
+    # The first batch is the slowest, so later batches complete before it
+    client = FakeGenAIClient(delay_for=lambda batch: 0.05 if batch[0] == "t0" else 0)
+    embedder = GeminiEmbeddings(client=client, batch_size=1, max_concurrency=4)
+    texts = [f"t{i}" for i in range(6)]
+
+    assert embedder.embed_documents(texts) == [vector_for(text) for text in texts]
+
+
+def test_transient_error_is_retried():
+    client = FakeGenAIClient(failures=1)
+    embedder = GeminiEmbeddings(client=client, max_retries=3)
+
+    assert embedder.embed_documents(["hello"]) == [vector_for("hello")]
+    assert len(client.calls) == 2
+
+
+def test_persistent_error_is_raised_after_max_retries():
+    client = FakeGenAIClient(failures=5)
+    embedder = GeminiEmbeddings(client=client, max_retries=2)
+
+    with pytest.raises(ConnectionError):
+        embedder.embed_documents(["hello"])
+    assert len(client.calls) == 2
+
+
+def test_aembed_documents_matches_sync_results():
+    client = FakeGenAIClient(delay_for=lambda batch: 0.02 if batch[0] == "t0" else 0)
+    embedder = GeminiEmbeddings(client=client, batch_size=2, max_concurrency=2)
+    texts = [f"t{i}" for i in range(7)]
+
+    vectors = asyncio.run(embedder.aembed_documents(texts))
+
+    assert vectors == [vector_for(text) for text in texts]
+    assert asyncio.run(embedder.aembed_documents([])) == []
+
+
+def test_embed_query_uses_query_task_type():
+    client = FakeGenAIClient()
+    embedder = GeminiEmbeddings(client=client)
+
+    assert embedder.embed_query("what is rrf?") == vector_for("what is rrf?")
+    assert client.calls == [("retrieval_query", "what is rrf?")]
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from langchain.schema import Document
+
+from databases.qdrant.sparse_index import BM25SparseIndex, term_id, tokenize
+from services.hybrid_retriever import HybridRetriever, reciprocal_rank_fusion
+
+
+def doc(point_id: str, text: str = "") -> Document:
+    return Document(page_content=text or point_id, metadata={"_id": point_id})
+
+
+def test_tokenize_keeps_identifiers_whole():
+    assert tokenize("Call sys_open() on Linux 3.2, then mmap; O(n)") == [
+        "call", "sys_open", "on", "linux", "3.2", "then", "mmap", "o", "n",
+    ]
+
+
+def test_term_ids_are_stable_32_bit_crc():
+    # crc32("mmap"), fixed so ids stay valid for points indexed by earlier processes
+    assert term_id("mmap") == 0x84E4836B
+    assert term_id("mmap") == term_id("mmap")
+    assert term_id("mmap") != term_id("munmap")
+    assert 0 <= term_id("a-very-long-token") < 2 ** 32
+
+
+def test_document_encoding_saturates_term_frequency():
+    index = BM25SparseIndex("test", k1=1.2, b=0.75, avg_doc_len=4)
+    vector = index.encode_document("cache cache cache miss")
+    weights = dict(zip(vector.indices, vector.values))
+
+    # doc_len == avg_doc_len, so norm == k1 and weight = tf * (k1 + 1) / (tf + k1)
+    assert weights[term_id("cache")] == pytest.approx(3 * 2.2 / (3 + 1.2))
+    assert weights[term_id("miss")] == pytest.approx(2.2 / (1 + 1.2))
+    assert weights[term_id("cache")] < 3 * weights[term_id("miss")]
+    assert all(value < index.k1 + 1 for value in vector.values)
+
+
+def test_longer_documents_get_lower_term_weights():
+    index = BM25SparseIndex("test", avg_doc_len=4)
+    short = index.encode_document("mmap pages")
+    long = index.encode_document("mmap " + "filler " * 20)
+    assert dict(zip(short.indices, short.values))[term_id("mmap")] > dict(zip(long.indices, long.values))[term_id("mmap")]
+
+
+def test_query_encoding_is_deduplicated_and_unweighted():
+    vector = BM25SparseIndex("test").encode_query("mmap MMAP page")
+    assert vector.indices == sorted({term_id("mmap"), term_id("page")})
+    assert vector.values == [1.0, 1.0]
+    assert BM25SparseIndex("test").encode_query("?!").indices == []
+
+
+def test_rrf_rewards_documents_found_by_both_searches():
+    dense = [doc("a"), doc("b"), doc("c")]
+    sparse = [doc("c"), doc("d")]
+
+    fused = reciprocal_rank_fusion([dense, sparse], [1.0, 1.0], rrf_k=60)
+
+    # b and d tie on 1/62; the earlier list wins ties
+    assert [d.metadata["_id"] for d, _ in fused] == ["c", "a", "b", "d"]
+    assert fused[0][1] == pytest.approx(1 / 63 + 1 / 61)
+    assert fused[1][1] == pytest.approx(1 / 61)
+
+
+def test_rrf_weights_and_content_fallback():
+    dense = [Document(page_content="same chunk")]
+    sparse = [Document(page_content="other chunk"), Document(page_content="same chunk")]
+
+    fused = reciprocal_rank_fusion([dense, sparse], [0.5, 2.0], rrf_k=0)
+
+    assert [(d.page_content, score) for d, score in fused] == [
+        ("other chunk", pytest.approx(2.0)),
+        ("same chunk", pytest.approx(0.5 + 1.0)),
+    ]
+
+
+class StubVectorStore:
+    def __init__(self, results=None, error=None):
+        self.results = results or []
+        self.error = error
+
+    def similarity_search(self, query, k, filter=None):
+        if self.error:
+            raise self.error
+        return self.results[:k]
+
+
+class StubSparseIndex:
+    def __init__(self, results=None, error=None):
+        self.results = results or []
+        self.error = error
+
+    def search(self, query, k, query_filter=None):
+        if self.error:
+            raise self.error
+        return [(d, 1.0) for d in self.results[:k]]
+
+
+def test_hybrid_retriever_fuses_and_cuts_to_k():
+    retriever = HybridRetriever(
+        StubVectorStore([doc("a"), doc("b")]),
+        StubSparseIndex([doc("b"), doc("c")]),
+        k=2,
+    )
+    results = asyncio.run(retriever.ainvoke("query"))
+    assert [d.metadata["_id"] for d in results] == ["b", "a"]
+
+
+def test_hybrid_retriever_survives_one_failed_search():
+    retriever = HybridRetriever(StubVectorStore(error=ConnectionError("down")), StubSparseIndex([doc("c")]))
+    assert [d.metadata["_id"] for d in asyncio.run(retriever.ainvoke("query"))] == ["c"]
+
+
+def test_hybrid_retriever_raises_when_both_searches_fail():
+    retriever = HybridRetriever(StubVectorStore(error=ConnectionError()), StubSparseIndex(error=ConnectionError()))
+    with pytest.raises(RuntimeError):
+        asyncio.run(retriever.ainvoke("query"))
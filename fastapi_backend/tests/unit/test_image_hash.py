@@ -0,0 +1,82 @@
+from io import BytesIO
+
+import pytest
+from PIL import Image, ImageDraw
+
+from services.image_hash import (
+    hamming_distance,
+    hash_bands,
+    image_fingerprint,
+    perceptual_hash,
+)
+
+
+def encode(image, fmt="PNG", **params):
+    buffer = BytesIO()
+    image.save(buffer, fmt, **params)
+    buffer.seek(0)
+    return buffer
+
+
+def gradient(width=320, height=240):
+    image = Image.new("RGB", (width, height))
+    image.putdata([(x % 256, y % 256, (x * y) % 256) for y in range(height) for x in range(width)])
+    return image
+
+
+def slide(lines):
+    """White slide with the same header bar; only the body text blocks differ."""
+    image = Image.new("RGB", (640, 480), "white")
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 640, 70), fill=(30, 60, 140))
+    for row, (indent, length) in enumerate(lines):
+        top = 110 + row * 60
+        draw.rectangle((40 + indent, top, 40 + indent + length, top + 24), fill="black")
+    return image
+
+
+def test_hamming_distance():
+    assert hamming_distance("00", "00") == 0
+    assert hamming_distance("0f", "00") == 4
+    assert hamming_distance("ffffffffffffffff", "0000000000000000") == 64
+
+
+@pytest.mark.parametrize("bands", [1, 2, 4, 8, 16])
+def test_hash_bands_split_evenly(bands):
+    image_hash = "0123456789abcdef"
+    parts = hash_bands(image_hash, bands)
+    assert len(parts) == bands
+    assert "".join(parts) == image_hash
+
+
+def test_hashes_within_band_count_minus_one_bits_share_a_band():
+    a = "0123456789abcdef"
+    # Flip three bits, each in a different band
+    b = f"{int(a, 16) ^ (1 << 63) ^ (1 << 40) ^ (1 << 20):016x}"
+    assert hamming_distance(a, b) == 3
+    assert any(x == y for x, y in zip(hash_bands(a, 4), hash_bands(b, 4)))
+
+
+def test_reencoded_and_resized_copy_is_a_near_duplicate():
+    original = gradient()
+    png = perceptual_hash(encode(original))
+    jpeg = perceptual_hash(encode(original.resize((160, 120)), "JPEG", quality=70))
+    assert len(png) == 16
+    assert hamming_distance(png, jpeg) <= 3
+
+
+def test_fine_hash_separates_slides_sharing_a_template():
+    first = image_fingerprint(encode(slide([(0, 420), (40, 300), (40, 360), (0, 200)])))
+    second = image_fingerprint(encode(slide([(0, 250), (0, 480), (80, 180), (40, 400)])))
+    assert len(first.fine_dhash) == 64
+    assert first.sha256 != second.sha256
+    assert hamming_distance(first.fine_dhash, second.fine_dhash) > 8
+
+
+def test_fingerprint_restores_file_position_and_handles_non_images():
+    buffer = BytesIO(b"not an image")
+    buffer.seek(4)
+    fingerprint = image_fingerprint(buffer)
+    assert buffer.tell() == 4
+    assert fingerprint.dhash is None and fingerprint.fine_dhash is None
+    assert len(fingerprint.sha256) == 64
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from services.ingestion_jobs import IngestionJobManager, StageStatus
+
+
+def test_eviction_keeps_running_jobs():
+    manager = IngestionJobManager(max_workers=1, max_jobs=2)
+    running = manager.create_job("doc-1", "user", ["work"])
+    running.status = StageStatus.RUNNING
+    finished = manager.create_job("doc-2", "user", ["work"])
+    finished.status = StageStatus.COMPLETED
+
+    newest = manager.create_job("doc-3", "user", ["work"])
+
+    assert manager.get_job(running.job_id) is running
+    assert manager.get_job(finished.job_id) is None
+    assert manager.get_job(newest.job_id) is newest
+
+
+def test_registry_grows_past_max_jobs_while_nothing_has_finished():
+    manager = IngestionJobManager(max_workers=1, max_jobs=1)
+    jobs = [manager.create_job(f"doc-{i}", "user", ["work"]) for i in range(3)]
+    assert all(manager.get_job(job.job_id) is job for job in jobs)
+
+
+def test_run_stage_on_separate_executor_does_not_wait_for_busy_pool():
+    manager = IngestionJobManager(max_workers=1)
+    release = threading.Event()
+    side_pool = ThreadPoolExecutor(max_workers=1)
+
+    async def scenario():
+        blocked = manager.create_job("doc-1", "user", ["slow"])
+        quick = manager.create_job("doc-2", "user", ["spool"])
+        slow_stage = asyncio.create_task(manager.run_stage(blocked, "slow", release.wait))
+        await asyncio.sleep(0)
+        result = await asyncio.wait_for(manager.run_stage(quick, "spool", lambda: "done", executor=side_pool), 2)
+        release.set()
+        await slow_stage
+        return quick, result
+
+    try:
+        quick, result = asyncio.run(scenario())
+    finally:
+        release.set()
+        side_pool.shutdown()
+        manager.shutdown()
+    assert result == "done"
+    assert quick.stage("spool").status == StageStatus.COMPLETED
+
+
+def test_fail_marks_job_failed():
+    manager = IngestionJobManager(max_workers=1)
+    job = manager.create_job("doc-1", "user", ["spool"])
+
+    async def scenario():
+        with pytest.raises(OSError):
+            await manager.run_stage(job, "spool", _raise_disk_full)
+        manager.fail(job, OSError("disk full"))
+
+    asyncio.run(scenario())
+    manager.shutdown()
+    assert job.status == StageStatus.FAILED
+    assert job.error == "disk full"
+    assert job.stage("spool").status == StageStatus.FAILED
+
+
+def _raise_disk_full():
+    raise OSError("disk full")
+
+
+class FakeRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.values[key] = value
+
+
+class FakeStore:
+    def __init__(self):
+        self.client = FakeRedis()
+
+    def get(self):
+        return self.client
+
+
+def test_job_state_is_visible_to_other_processes():
+    store = FakeStore()
+    owner = IngestionJobManager(max_workers=1, store=store)
+    # A second worker process sharing the same Redis
+    other = IngestionJobManager(max_workers=1, store=store)
+
+    async def scenario():
+        job = owner.create_job("doc-1", "user", ["work"])
+        owner.submit(job, lambda job: owner.run_stage(job, "work", lambda: None))
+        await asyncio.sleep(0.1)
+        return job
+
+    job = asyncio.run(scenario())
+    owner.shutdown()
+    seen = other.get_job(job.job_id)
+    assert seen is not job
+    assert seen.status == StageStatus.COMPLETED
+    assert seen.stage("work").status == StageStatus.COMPLETED
+    assert other.get_job("unknown") is None
+    other.shutdown()
+
+
+def test_unreachable_store_does_not_break_jobs():
+    class DownStore:
+        def get(self):
+            raise ConnectionError("redis down")
+
+    manager = IngestionJobManager(max_workers=1, store=DownStore())
+    job = manager.create_job("doc-1", "user", ["work"])
+    assert manager.get_job(job.job_id) is job
+    assert manager.get_job("unknown") is None
+    manager.shutdown()
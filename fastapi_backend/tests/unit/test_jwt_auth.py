@@ -0,0 +1,129 @@
+import base64
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import HTTPException
+from supabase import AuthApiError
+from tenacity import wait_none
+
+from auth import jwt_auth
+from auth.jwt_auth import SupabaseJWTVerifier
+
+SECRET = "test-secret-" + "x" * 64
+SUPABASE_URL = "https://project.supabase.co"
+ISSUER = f"{SUPABASE_URL}/auth/v1"
+
+
+def claims(**overrides):
+    return {
+        "sub": "user-1",
+        "aud": "authenticated",
+        "iss": ISSUER,
+        "exp": int(time.time()) + 600,
+        "email": "student@example.com",
+        **overrides,
+    }
+
+
+class FakeJWKSClient:
+    def __init__(self, key, algorithm="RS256"):
+        self.signing_key = jwt.PyJWK.from_dict({**jwt.algorithms.RSAAlgorithm.to_jwk(key, as_dict=True), "alg": algorithm})
+
+    def get_signing_key_from_jwt(self, token):
+        return self.signing_key
+
+
+@pytest.fixture
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def verifier(rsa_key):
+    verifier = SupabaseJWTVerifier(secret=SECRET, supabase_url=SUPABASE_URL)
+    verifier.jwks_client = FakeJWKSClient(rsa_key.public_key())
+    return verifier
+
+
+def test_hs256_token_is_verified_locally(verifier):
+    user = verifier.verify_uncached(jwt.encode(claims(), SECRET, algorithm="HS256"))
+    assert user.id == "user-1"
+    assert verifier.local_verifications == 1
+
+
+def test_rs256_token_is_verified_against_jwks(verifier, rsa_key):
+    user = verifier.verify_uncached(jwt.encode(claims(), rsa_key, algorithm="RS256"))
+    assert user.email == "student@example.com"
+
+
+@pytest.mark.parametrize("algorithm", ["HS384", "HS512", "none"])
+def test_algorithms_outside_the_allowlist_are_rejected(verifier, algorithm):
+    key = None if algorithm == "none" else SECRET
+    token = jwt.encode(claims(), key, algorithm=algorithm)
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify_uncached(token)
+    assert exc_info.value.status_code == 401
+
+
+def test_token_header_cannot_switch_jwks_key_to_another_algorithm(verifier, rsa_key):
+    # An RS256 signature relabelled as ES256 must not reach the EC verifier with an RSA key
+    _, payload, signature = jwt.encode(claims(), rsa_key, algorithm="RS256").split(".")
+    header = base64.urlsafe_b64encode(json.dumps({"alg": "ES256", "typ": "JWT"}).encode()).rstrip(b"=").decode()
+    token = f"{header}.{payload}.{signature}"
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify_uncached(token)
+    assert exc_info.value.status_code == 401
+
+
+def test_wrong_issuer_is_rejected(verifier):
+    token = jwt.encode(claims(iss="https://attacker.example/auth/v1"), SECRET, algorithm="HS256")
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify_uncached(token)
+    assert exc_info.value.status_code == 401
+
+
+class FakeAuth:
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get_user(self, token):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+@pytest.fixture
+def remote_auth(monkeypatch):
+    def install(*outcomes):
+        auth = FakeAuth(*outcomes)
+        client = SimpleNamespace(auth=auth)
+        monkeypatch.setattr(jwt_auth, "supabase", SimpleNamespace(get=lambda: client))
+        monkeypatch.setattr(SupabaseJWTVerifier._verify_remote.retry, "wait", wait_none())
+        return auth
+    return install
+
+
+def test_remote_rejection_is_a_401_without_retries(remote_auth):
+    auth = remote_auth(AuthApiError("invalid JWT", 403, "bad_jwt"))
+    # No secret or JWKS configured, so verification goes to Supabase
+    verifier = SupabaseJWTVerifier()
+    with pytest.raises(HTTPException) as exc_info:
+        verifier.verify_uncached(jwt.encode(claims(), SECRET, algorithm="HS256"))
+    assert exc_info.value.status_code == 401
+    assert auth.calls == 1
+
+
+def test_remote_transport_errors_are_retried(remote_auth):
+    user = SimpleNamespace(id="user-1", email="student@example.com", role="authenticated")
+    auth = remote_auth(httpx.ConnectTimeout("timed out"), SimpleNamespace(user=user))
+    verified = SupabaseJWTVerifier().verify_uncached(jwt.encode(claims(), SECRET, algorithm="HS256"))
+    assert verified.id == "user-1"
+    assert auth.calls == 2
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from Models.Embedding_model.reranking_model import maxsim_scores
+
+
+def reference_maxsim(query: np.ndarray, doc: np.ndarray) -> float:
+    return float(sum(max(float(q @ d) for d in doc) for q in query))
+
+
+def test_matches_per_document_loop_for_ragged_documents():
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal((5, 16)).astype(np.float32)
+    docs = [rng.standard_normal((length, 16)).astype(np.float32) for length in (3, 12, 1, 7)]
+
+    scores = maxsim_scores(query, docs)
+
+    assert scores.shape == (4,)
+    assert scores == pytest.approx([reference_maxsim(query, doc) for doc in docs], rel=1e-5)
+
+
+def test_padding_never_wins_over_negative_similarities():
+    # Every real token scores negatively, so a zero-padded row would win if it were not masked
+    query = np.array([[1.0, 0.0]], dtype=np.float32)
+    short = np.array([[-1.0, 0.0]], dtype=np.float32)
+    long = np.array([[-2.0, 0.0], [-3.0, 0.0], [-4.0, 0.0]], dtype=np.float32)
+
+    assert maxsim_scores(query, [short, long]).tolist() == [-1.0, -2.0]
+
+
+def test_best_token_per_query_token_is_summed():
+    query = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    doc = np.array([[0.9, 0.1], [0.2, 0.8]], dtype=np.float32)
+
+    assert maxsim_scores(query, [doc])[0] == pytest.approx(0.9 + 0.8)
+
+
+def test_no_documents():
+    assert maxsim_scores(np.ones((2, 4), dtype=np.float32), []).shape == (0,)
@@ -0,0 +1,83 @@
+import asyncio
+
+from services.single_flight import SingleFlight
+
+
+class SlowCall:
+    def __init__(self, result="summary", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def _start(flight, call, key, callers):
+    call.release = asyncio.Event()
+    tasks = [asyncio.create_task(flight.do(key, call)) for _ in range(callers)]
+    await asyncio.sleep(0)
+    return tasks
+
+
+def test_concurrent_callers_share_one_call():
+    async def scenario():
+        flight, call = SingleFlight(), SlowCall()
+        tasks = await _start(flight, call, "video-1", callers=5)
+        assert flight.stats() == {"in_flight": 1, "leaders": 1, "followers": 4}
+        call.release.set()
+        return call, await asyncio.gather(*tasks), flight
+
+    call, results, flight = asyncio.run(scenario())
+    assert call.calls == 1
+    assert results == ["summary"] * 5
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_run_independently():
+    async def scenario():
+        flight, first, second = SingleFlight(), SlowCall("a"), SlowCall("b")
+        tasks = await _start(flight, first, "a", callers=2) + await _start(flight, second, "b", callers=2)
+        first.release.set()
+        second.release.set()
+        return await asyncio.gather(*tasks)
+
+    assert asyncio.run(scenario()) == ["a", "a", "b", "b"]
+
+
+def test_error_reaches_every_caller_and_releases_the_key():
+    async def scenario():
+        flight, call = SingleFlight(), SlowCall(error=ValueError("boom"))
+        tasks = await _start(flight, call, "k", callers=3)
+        call.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # A later call starts fresh work instead of replaying the failure
+        retry = SlowCall("ok")
+        retry.release = asyncio.Event()
+        retry.release.set()
+        return results, await flight.do("k", retry), flight
+
+    results, retried, flight = asyncio.run(scenario())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert retried == "ok"
+    assert flight.stats() == {"in_flight": 0, "leaders": 2, "followers": 2}
+
+
+def test_cancelled_caller_does_not_cancel_shared_work():
+    async def scenario():
+        flight, call = SingleFlight(), SlowCall()
+        leader, follower = await _start(flight, call, "k", callers=2)
+        leader.cancel()
+        await asyncio.sleep(0)
+        call.release.set()
+        return leader, await follower
+
+    leader, result = asyncio.run(scenario())
+    assert leader.cancelled()
+    assert result == "summary"
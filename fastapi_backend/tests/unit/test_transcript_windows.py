@@ -0,0 +1,41 @@
+from routes.video_qa_route import TranscriptSegment, format_timestamp, transcript_windows
+
+
+def segment(start: int, end: int, text: str = "words") -> TranscriptSegment:
+    return TranscriptSegment(start_seconds=start, end_seconds=end, text=text)
+
+
+def test_segments_merge_until_the_window_is_full():
+    windows = transcript_windows(
+        [segment(0, 20, "intro"), segment(20, 40, "setup"), segment(40, 70, "first demo"), segment(70, 90, "wrap up")],
+        window_seconds=60,
+    )
+
+    assert windows == [
+        {"start_seconds": 0, "end_seconds": 40, "title": "Transcript 0:00", "summary": "intro setup"},
+        {"start_seconds": 40, "end_seconds": 90, "title": "Transcript 0:40", "summary": "first demo wrap up"},
+    ]
+
+
+def test_out_of_order_blank_and_negative_segments():
+    windows = transcript_windows(
+        [segment(30, 45, " later "), segment(-5, 0, "bogus"), segment(0, 15, "first"), segment(15, 30, "   ")],
+        window_seconds=60,
+    )
+
+    assert windows == [{"start_seconds": 0, "end_seconds": 45, "title": "Transcript 0:00", "summary": "first later"}]
+
+
+def test_overlong_segment_gets_its_own_window():
+    windows = transcript_windows([segment(0, 10), segment(10, 200), segment(200, 210)], window_seconds=60)
+    assert [(w["start_seconds"], w["end_seconds"]) for w in windows] == [(0, 10), (10, 200), (200, 210)]
+
+
+def test_empty_transcript():
+    assert transcript_windows([]) == []
+
+
+def test_long_videos_use_hour_timestamps():
+    assert format_timestamp(59) == "0:59"
+    assert format_timestamp(3725) == "1:02:05"
+    assert transcript_windows([segment(3725, 3740)])[0]["title"] == "Transcript 1:02:05"
@@ -0,0 +1,52 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from services.uploads import UploadSizeLimitMiddleware
+
+DOCUMENT_LIMIT = 100
+VIDEO_LIMIT = 1000
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+
+    @app.post("/api/v1/upload")
+    async def upload_document():
+        return {"ok": True}
+
+    @app.post("/video-qa/upload")
+    async def upload_video():
+        return {"ok": True}
+
+    @app.post("/video-qa-legacy/upload")
+    async def upload_legacy():
+        return {"ok": True}
+
+    app.add_middleware(UploadSizeLimitMiddleware, max_body_size=DOCUMENT_LIMIT, path_limits={"/video-qa": VIDEO_LIMIT})
+    return TestClient(app)
+
+
+def test_document_routes_get_the_default_limit():
+    client = make_client()
+    assert client.post("/api/v1/upload", content=b"x" * DOCUMENT_LIMIT).status_code == 200
+    assert client.post("/api/v1/upload", content=b"x" * (DOCUMENT_LIMIT + 1)).status_code == 413
+
+
+def test_video_routes_get_their_own_limit():
+    client = make_client()
+    assert client.post("/video-qa/upload", content=b"x" * VIDEO_LIMIT).status_code == 200
+    assert client.post("/video-qa/upload", content=b"x" * (VIDEO_LIMIT + 1)).status_code == 413
+
+
+def test_prefix_matches_whole_path_segments():
+    middleware = UploadSizeLimitMiddleware(None, max_body_size=DOCUMENT_LIMIT, path_limits={"/video-qa": VIDEO_LIMIT})
+    assert middleware.limit_for("/video-qa") == VIDEO_LIMIT
+    assert middleware.limit_for("/video-qa/jobs/1") == VIDEO_LIMIT
+    assert middleware.limit_for("/video-qa-legacy/upload") == DOCUMENT_LIMIT
+    assert make_client().post("/video-qa-legacy/upload", content=b"x" * (DOCUMENT_LIMIT + 1)).status_code == 413
+
+
+def test_longest_prefix_wins():
+    middleware = UploadSizeLimitMiddleware(None, max_body_size=10, path_limits={"/video-qa": 1000, "/video-qa/youtube": 50})
+    assert middleware.limit_for("/video-qa/youtube/summary") == 50
+    assert middleware.limit_for("/video-qa/upload") == 1000